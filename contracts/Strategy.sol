@@ -30,14 +30,41 @@ contract Strategy is BaseStrategy {
         uint256 pools;
     }
 
+    // Pool state read once per call path, amounts are in want
+    struct PoolSnapshot {
+        address pool;
+        uint256 pps;
+        uint256 totalSupplied;
+        uint256 liquidity;
+        uint256 bBalance;
+        uint256 balance;
+        //Stuck pools are only withdrawn from,never deposited to
+        bool stuck;
+    }
+
+    //Registry entry of a pool,index is its position in pools
+    struct PoolInfo {
+        uint128 index;
+        bool listed;
+        //Dropped by changeAllocs but couldn't be fully redeemed,kept until a later call empties it
+        bool stuck;
+    }
+
     uint256 private constant BASIS_PRECISION = 10000;
     uint256 internal constant TAROT_MIN_TARGET_UTIL = 7e17; // 70%
     uint256 internal constant TAROT_MAX_TARGET_UTIL = 8e17; // 80%
     uint256 internal constant UTIL_PRECISION = 1e18;
+    uint256 internal constant NO_POOL = type(uint256).max;
     bool internal isOriginal = true;
 
     uint256 public minProfit;
     uint256 public minCredit;
+    //Split deposits across pools instead of sending them all to the highest pair
+    bool public splitDeposits;
+    //Share of estimatedTotalAssets kept idle in BASIS_PRECISION,withdrawals up to it skip the pools
+    uint256 public bufferRatio;
+    //Band around bufferTarget in BASIS_PRECISION of the target,idle want inside it is left alone
+    uint256 public bufferTolerance;
 
     //Spookyswap as default
     IUniswapV2Router02 internal router;
@@ -45,8 +72,22 @@ contract Strategy is BaseStrategy {
 
     //This records the current pools and allocs
     address[] public pools;
+    mapping(address => PoolInfo) public poolInfo;
+    //Number of pools flagged stuck,lets harvests skip the retry when there are none
+    uint256 public stuckPools;
 
     event Cloned(address indexed clone);
+    event UpdatedMinProfit(uint256 minProfit);
+    event UpdatedMinCredit(uint256 minCredit);
+    event UpdatedSplitDeposits(bool splitDeposits);
+    event UpdatedBufferRatio(uint256 bufferRatio);
+    event UpdatedBufferTolerance(uint256 bufferTolerance);
+    //Pool level movements,amount in want and bTokens minted or redeemed
+    event PoolDeposit(address indexed pool, uint256 amount, uint256 bTokens);
+    event PoolWithdraw(address indexed pool, uint256 amount, uint256 bTokens);
+    event PoolAdded(address indexed pool);
+    event PoolRemoved(address indexed pool);
+    event PoolStuck(address indexed pool);
 
     constructor(address _vault, address[] memory _pools) public BaseStrategy(_vault) {
         _initializeStrat(_pools);
@@ -61,8 +102,9 @@ contract Strategy is BaseStrategy {
         //Spookyswap router
         router = IUniswapV2Router02(0xF491e7B69E4244ad4002BC14e878a34207E38c29);
         weth = router.WETH();
-        _setPools(_pools);
-        addApprovals();
+        for (uint256 i = 0; i < _pools.length; i++) {
+            _addPool(_pools[i]);
+        }
     }
 
     function initialize(
@@ -89,6 +131,36 @@ contract Strategy is BaseStrategy {
         address[] memory _pools
     ) external returns (address newStrategy) {
         require(isOriginal,"!original");
+        newStrategy = _clone(_vault, _strategist, _rewards, _keeper, _pools);
+    }
+
+    //Clones and initializes one strategy per vault in a single tx,every array is indexed by clone
+    function cloneStrategies(
+        address[] memory _vaults,
+        address[] memory _strategists,
+        address[] memory _rewards,
+        address[] memory _keepers,
+        address[][] memory _pools
+    ) external returns (address[] memory newStrategies) {
+        require(isOriginal,"!original");
+        uint256 count = _vaults.length;
+        require(
+            _strategists.length == count && _rewards.length == count && _keepers.length == count && _pools.length == count,
+            "!length"
+        );
+        newStrategies = new address[](count);
+        for (uint256 i = 0; i < count; i++) {
+            newStrategies[i] = _clone(_vaults[i], _strategists[i], _rewards[i], _keepers[i], _pools[i]);
+        }
+    }
+
+    function _clone(
+        address _vault,
+        address _strategist,
+        address _rewards,
+        address _keeper,
+        address[] memory _pools
+    ) internal returns (address newStrategy) {
         // Copied from https://github.com/optionality/clone-factory/blob/master/contracts/CloneFactory.sol
         bytes20 addressBytes = bytes20(address(this));
 
@@ -110,31 +182,53 @@ contract Strategy is BaseStrategy {
         return "StrategyTarotLender";
     }
 
+    function _wantTobToken(uint256 _requiredWant, uint256 _pps) internal pure returns (uint256 _amount) {
+        if (_requiredWant == 0) return _requiredWant;
+        _amount = _requiredWant.mul(1e18).div(_pps);
+    }
+
+    function _bTokenToWant(uint256 _bBal, uint256 _pps) internal pure returns (uint256 _amount) {
+        if (_bBal == 0) return _bBal;
+        _amount = (_bBal.mul(_pps)).div(1e18);
+    }
+
     function wantTobToken(address _pool, uint256 _requiredWant) internal view returns (uint256 _amount) {
         if (_requiredWant == 0) return _requiredWant;
         // This gives us the price per share of xToken
-        uint256 pps = ILendingPool(_pool).exchangeRateLast();
-        //Now calculate based on pps
-        _amount = _requiredWant.mul(1e18).div(pps);
+        _amount = _wantTobToken(_requiredWant, ILendingPool(_pool).exchangeRateLast());
     }
 
     function bTokenToWant(address _pool, uint256 _bBal) public view returns (uint256 _amount) {
         if (_bBal == 0) return _bBal;
         // This gives us the price per share of xToken
-        uint256 pps = ILendingPool(_pool).exchangeRateLast();
-        _amount = (_bBal.mul(pps)).div(1e18);
+        _amount = _bTokenToWant(_bBal, ILendingPool(_pool).exchangeRateLast());
     }
 
     function balanceInPool(address _pool) internal view returns (uint256 bal) {
         bal = bTokenToWant(_pool, ILendingPoolToken(_pool).balanceOf(address(this)));
     }
 
-    function _getTotalSuppliedInPool(address _pool) internal view returns (uint256 tSupply) {
-        tSupply = bTokenToWant(_pool, ILendingPoolToken(_pool).totalSupply());
+    // Reads everything the routing logic needs from a pool in one go
+    function _snapshotPool(address _pool) internal view returns (PoolSnapshot memory snap) {
+        snap.pool = _pool;
+        snap.pps = ILendingPool(_pool).exchangeRateLast();
+        snap.totalSupplied = _bTokenToWant(ILendingPoolToken(_pool).totalSupply(), snap.pps);
+        snap.liquidity = want.balanceOf(_pool);
+        snap.bBalance = ILendingPoolToken(_pool).balanceOf(address(this));
+        snap.balance = _bTokenToWant(snap.bBalance, snap.pps);
+        snap.stuck = poolInfo[_pool].stuck;
+    }
+
+    function _snapshotPools() internal view returns (PoolSnapshot[] memory snaps) {
+        snaps = new PoolSnapshot[](pools.length);
+        for (uint256 i = 0; i < pools.length; i++) {
+            snaps[i] = _snapshotPool(pools[i]);
+        }
     }
 
-    function _getBorrowedInPair(address _pool) internal view returns (uint256 tBorrow) {
-        tBorrow = _getTotalSuppliedInPool(_pool).sub(want.balanceOf(_pool));
+    function _utilization(PoolSnapshot memory _snap) internal pure returns (uint256) {
+        uint256 totalBorrowAmount = _snap.totalSupplied.sub(_snap.liquidity);
+        return totalBorrowAmount.mul(UTIL_PRECISION).div(_snap.totalSupplied);
     }
 
     function balanceOfWant() public view returns (uint256) {
@@ -162,8 +256,22 @@ contract Strategy is BaseStrategy {
         return balanceOfWant().add(balanceOfStake());
     }
 
+    function bufferTarget() public view returns (uint256) {
+        //Skips reading every pool when there is no buffer
+        if (bufferRatio == 0) return 0;
+        return estimatedTotalAssets().mul(bufferRatio).div(BASIS_PRECISION);
+    }
+
+    function _bufferBand(uint256 _target) internal view returns (uint256) {
+        return _target.mul(bufferTolerance).div(BASIS_PRECISION);
+    }
+
     function tendTrigger(uint256 callCostInWei) public view virtual override returns (bool) {
-        return super.tendTrigger(callCostInWei) || balanceOfWant() > minCredit;
+        uint256 idle = balanceOfWant();
+        uint256 target = bufferTarget();
+        uint256 band = _bufferBand(target);
+        //More idle want than the buffer needs and worth depositing,or the buffer has run low
+        return super.tendTrigger(callCostInWei) || idle > target.add(Math.max(band, minCredit)) || target > idle.add(band);
     }
 
     function harvestTrigger(uint256 callCostInWei) public view virtual override returns (bool) {
@@ -174,12 +282,19 @@ contract Strategy is BaseStrategy {
         return pools.length;
     }
 
+    function isPool(address _pool) public view returns (bool) {
+        return poolInfo[_pool].listed;
+    }
+
+    function _withdrawable(PoolSnapshot memory _snap) internal pure returns (uint256) {
+        return Math.min(_snap.balance, _snap.liquidity);
+    }
+
     function getWithdrawableFromPools() public view returns (uint256[] memory availableAmounts) {
-        availableAmounts = new uint256[](pools.length);
-        for (uint256 i = 0; i < pools.length; i++) {
-            uint256 liqAvail = want.balanceOf(pools[i]);
-            uint256 deposited = balanceInPool(pools[i]);
-            availableAmounts[i] = Math.min(deposited, liqAvail);
+        PoolSnapshot[] memory snaps = _snapshotPools();
+        availableAmounts = new uint256[](snaps.length);
+        for (uint256 i = 0; i < snaps.length; i++) {
+            availableAmounts[i] = _withdrawable(snaps[i]);
         }
     }
 
@@ -192,18 +307,18 @@ contract Strategy is BaseStrategy {
 
     // The following utilization helper functions are taken from kashi lending strat,rewritten to support tarot/impermax lending
     function lendPairUtilization(address _lendingPair, uint256 assetsToDeposit) public view returns (uint256) {
-        uint256 totalAssets = _getTotalSuppliedInPool(_lendingPair);
-        uint256 totalBorrowAmount = _getBorrowedInPair(_lendingPair);
-        return uint256(totalBorrowAmount).mul(UTIL_PRECISION).div(totalAssets);
+        return _utilization(_snapshotPool(_lendingPair));
     }
 
     // highestInterestIndex finds the best pair to invest the given deposit
-    function highestInterestPair(uint256 assetsToDeposit) public view returns (address _highestPair) {
-        uint256 highestInterest = 0;
+    function _highestInterestIndex(PoolSnapshot[] memory _snaps) internal pure returns (uint256 _highest) {
         uint256 highestUtilization = 0;
+        _highest = NO_POOL;
 
-        for (uint256 i = 0; i < pools.length; i++) {
-            uint256 utilization = lendPairUtilization(pools[i], assetsToDeposit);
+        for (uint256 i = 0; i < _snaps.length; i++) {
+            //A drained pool looks fully utilized,but it is being left
+            if (_snaps[i].stuck) continue;
+            uint256 utilization = _utilization(_snaps[i]);
 
             // A pair is highest (really best) if either
             //   - It's utilization is higher, and either
@@ -218,16 +333,17 @@ contract Strategy is BaseStrategy {
                     highestUtilization > TAROT_MIN_TARGET_UTIL)
             ) {
                 highestUtilization = utilization;
-                _highestPair = pools[i];
+                _highest = i;
             }
         }
     }
 
-    function lowestInterestPair(uint256 minLiquidShares) public view returns (address _lowestPair) {
+    function _lowestInterestIndex(PoolSnapshot[] memory _snaps, uint256 minLiquidShares) internal pure returns (uint256 _lowest) {
         uint256 lowestUtilization = UTIL_PRECISION;
+        _lowest = NO_POOL;
 
-        for (uint256 i = 0; i < pools.length; i++) {
-            uint256 utilization = lendPairUtilization(pools[i], 0);
+        for (uint256 i = 0; i < _snaps.length; i++) {
+            uint256 utilization = _utilization(_snaps[i]);
 
             // A pair is lowest if either
             //   - It's utilization is lower, and either
@@ -240,18 +356,30 @@ contract Strategy is BaseStrategy {
                         utilization > TAROT_MIN_TARGET_UTIL &&
                         lowestUtilization < TAROT_MAX_TARGET_UTIL &&
                         lowestUtilization > TAROT_MIN_TARGET_UTIL)) &&
-                want.balanceOf(pools[i]) >= minLiquidShares &&
-                balanceInPool(pools[i]) > 0
+                _snaps[i].liquidity >= minLiquidShares &&
+                _snaps[i].balance > 0
             ) {
-                _lowestPair = pools[i];
+                _lowest = i;
             }
         }
     }
 
+    function highestInterestPair(uint256 assetsToDeposit) public view returns (address _highestPair) {
+        uint256 index = _highestInterestIndex(_snapshotPools());
+        if (index != NO_POOL) _highestPair = pools[index];
+    }
+
+    function lowestInterestPair(uint256 minLiquidShares) public view returns (address _lowestPair) {
+        uint256 index = _lowestInterestIndex(_snapshotPools(), minLiquidShares);
+        if (index != NO_POOL) _lowestPair = pools[index];
+    }
+
     function _depositToPool(address _pool, uint256 _amount) internal {
         if (_amount > 0) {
             want.safeTransfer(_pool, _amount);
-            require(ILendingPoolToken(_pool).mint(address(this)) >= 0, "No lend tokens minted");
+            uint256 minted = ILendingPoolToken(_pool).mint(address(this));
+            require(minted >= 0, "No lend tokens minted");
+            emit PoolDeposit(_pool, _amount, minted);
         }
     }
 
@@ -262,14 +390,6 @@ contract Strategy is BaseStrategy {
         }
     }
 
-    function calculatePTAmount(address _pool, uint256 _amount) internal returns (uint256 pAmount) {
-        uint256 pBal = ILendingPoolToken(_pool).balanceOf(address(this));
-        //Reduce _amount if avail liq is < _amount
-        _amount = Math.min(_amount, want.balanceOf(_pool));
-        //Reduce pAmount if pAmount > pBal
-        pAmount = Math.min(pBal, wantTobToken(_pool, _amount));
-    }
-
     function adjustToLiq(address _pool) internal returns (uint256) {
         uint256 pBal = ILendingPoolToken(_pool).balanceOf(address(this));
         //Reduce _amount if avail liq is < _amount
@@ -278,68 +398,166 @@ contract Strategy is BaseStrategy {
         return Math.min(pBal, wantTobToken(_pool, _amount));
     }
 
-    function _withdrawFrom(address _pool) internal returns (uint256 returnAmt) {
-        uint256 pAmount = adjustToLiq(_pool);
-        if (pAmount > 0) {
-            ILendingPoolToken(_pool).safeTransfer(_pool, pAmount);
+    function _redeem(address _pool, uint256 _pAmount) internal returns (uint256 returnAmt) {
+        if (_pAmount > 0) {
+            ILendingPoolToken(_pool).safeTransfer(_pool, _pAmount);
             returnAmt = ILendingPoolToken(_pool).redeem(address(this));
+            emit PoolWithdraw(_pool, returnAmt, _pAmount);
         }
     }
 
+    function _withdrawFrom(address _pool) internal returns (uint256 returnAmt) {
+        returnAmt = _redeem(_pool, adjustToLiq(_pool));
+    }
+
     function _withdrawFromPool(address _pool, uint256 _amount) internal returns (uint256 returnedAmount) {
-        uint256 liqAvail = want.balanceOf(_pool);
-        _amount = Math.min(_amount, liqAvail);
-        uint256 pAmount = calculatePTAmount(_pool, _amount);
-        uint256 balWant = balanceOfWant();
-        if (pAmount > 0) {
-            //Extra addition on liquidate position to cover edge cases of a few wei defecit
-            ILendingPoolToken(_pool).safeTransfer(_pool, pAmount);
-            returnedAmount = ILendingPoolToken(_pool).redeem(address(this));
-        }
-        if (returnedAmount < _amount) {
-            //Withdraw all and reinvest remaining
-            uint256 toCover = _amount.sub(returnedAmount);
-            pAmount = calculatePTAmount(_pool, _amount);
-            if (pAmount > 0) {
-                ILendingPoolToken(_pool).safeTransfer(_pool, pAmount);
-                require(ILendingPoolToken(_pool).redeem(address(this)) >= 0, "Not enough returned");
+        returnedAmount = _withdrawFromPool(_snapshotPool(_pool), _amount);
+    }
+
+    function _withdrawFromPool(PoolSnapshot memory _snap, uint256 _amount) internal returns (uint256 returnedAmount) {
+        _amount = Math.min(_amount, _withdrawable(_snap));
+        if (_amount == 0) return 0;
+        //Round up so a single redeem covers the few wei lost converting to bTokens
+        uint256 pAmount = _amount.mul(1e18).add(_snap.pps.sub(1)).div(_snap.pps);
+        //Unless that would ask the pool for more than its liquidity
+        if (_bTokenToWant(pAmount, _snap.pps) > _snap.liquidity) {
+            pAmount = _wantTobToken(_snap.liquidity, _snap.pps);
+        }
+        returnedAmount = _redeem(_snap.pool, Math.min(pAmount, _snap.bBalance));
+    }
+
+    // Sort key for _withdrawOrder, lower goes first:
+    //   - Pools that can cover the whole amount on their own, lowest utilization first
+    //   - Then the rest, largest withdrawable amount first, so fewer pools get touched
+    //   - Pools we can't withdraw anything from last
+    function _withdrawKey(PoolSnapshot memory _snap, uint256 _amount) internal pure returns (uint256) {
+        uint256 available = _withdrawable(_snap);
+        if (available == 0) return type(uint256).max;
+        if (available >= _amount) return _utilization(_snap);
+        return type(uint256).max.sub(available);
+    }
+
+    // Indexes of _keys in ascending key order, ties keep their original order
+    function _sortedIndexes(uint256[] memory _keys) internal pure returns (uint256[] memory order) {
+        order = new uint256[](_keys.length);
+        uint256[] memory sorted = new uint256[](_keys.length);
+        //Insertion sort, pool lists are short
+        for (uint256 i = 0; i < _keys.length; i++) {
+            uint256 j = i;
+            for (; j > 0 && sorted[j - 1] > _keys[i]; j--) {
+                sorted[j] = sorted[j - 1];
+                order[j] = order[j - 1];
             }
+            sorted[j] = _keys[i];
+            order[j] = i;
         }
-        //Set true returned amount here
-        returnedAmount = balanceOfWant().sub(balWant);
     }
 
-    function _withdrawLowUtil(uint256 _amount) internal returns (uint256 remainingAmount) {
-        address lowestPair = lowestInterestPair(_amount);
-        if (lowestPair != address(0)) {
-            uint256 returnedAmount = _withdrawFromPool(lowestPair, _amount);
-            remainingAmount = returnedAmount >= _amount ? 0 : _amount.sub(returnedAmount);
+    function _withdrawOrder(PoolSnapshot[] memory _snaps, uint256 _amount) internal pure returns (uint256[] memory order) {
+        uint256[] memory keys = new uint256[](_snaps.length);
+        for (uint256 i = 0; i < _snaps.length; i++) {
+            keys[i] = _withdrawKey(_snaps[i], _amount);
         }
+        order = _sortedIndexes(keys);
     }
 
+    // Plans the whole withdrawal from one snapshot and redeems at most once per pool
     function _withdrawOptimal(uint256 _amount) internal {
-        //First try to withdraw from lowest liq pair
-        uint256 _remainingToWithdraw = _withdrawLowUtil(_amount);
-
-        for (uint256 i = 0; i < pools.length && _remainingToWithdraw > 0; i++) {
-            uint256 balInPool = balanceInPool(pools[i]);
-            uint256 liq = want.balanceOf(pools[i]);
-            //Withdraw from pool if there is enough liq
-            if (liq >= _remainingToWithdraw && balInPool > 0) {
-                uint256 _amountReturned = _withdrawFromPool(pools[i], _remainingToWithdraw);
-                _remainingToWithdraw = _amountReturned < _remainingToWithdraw ? _remainingToWithdraw.sub(_amountReturned) : 0;
-            }
-            //Otherwise withdraw all from current pool
-            else if (balInPool > 0) {
-                _remainingToWithdraw = _remainingToWithdraw.sub(_withdrawFrom(pools[i]));
+        if (_amount == 0) return;
+        PoolSnapshot[] memory snaps = _snapshotPools();
+        uint256[] memory order = _withdrawOrder(snaps, _amount);
+        uint256 _remainingToWithdraw = _amount;
+
+        for (uint256 i = 0; i < order.length && _remainingToWithdraw > 0; i++) {
+            uint256 _amountReturned = _withdrawFromPool(snaps[order[i]], _remainingToWithdraw);
+            _remainingToWithdraw = _amountReturned < _remainingToWithdraw ? _remainingToWithdraw.sub(_amountReturned) : 0;
+        }
+    }
+
+    // Utilization level the first `active` pools of _order end up at when _amount is spread over them,
+    // the set grows until the next pool is already at or below the level
+    function _fillLevel(
+        PoolSnapshot[] memory _snaps,
+        uint256[] memory _order,
+        uint256[] memory _utils,
+        uint256 _amount
+    ) internal pure returns (uint256 level, uint256 active) {
+        uint256 sumSupplied = _amount;
+        uint256 sumBorrowed;
+        while (active < _order.length) {
+            PoolSnapshot memory snap = _snaps[_order[active]];
+            sumSupplied = sumSupplied.add(snap.totalSupplied);
+            sumBorrowed = sumBorrowed.add(snap.totalSupplied.sub(snap.liquidity));
+            level = sumBorrowed.mul(UTIL_PRECISION).div(sumSupplied);
+            active++;
+            if (active == _order.length || level >= _utils[_order[active]]) break;
+        }
+    }
+
+    // Pool indexes by utilization, highest first, stuck pools are left out
+    function _depositOrder(PoolSnapshot[] memory _snaps, uint256[] memory _utils) internal pure returns (uint256[] memory order) {
+        uint256[] memory keys = new uint256[](_snaps.length);
+        uint256 eligible;
+        for (uint256 i = 0; i < _snaps.length; i++) {
+            if (_snaps[i].stuck) {
+                keys[i] = type(uint256).max;
+            } else {
+                keys[i] = UTIL_PRECISION.sub(_utils[i]);
+                eligible++;
             }
         }
+        //Stuck pools sort last,so the order is the first `eligible` indexes
+        uint256[] memory sorted = _sortedIndexes(keys);
+        order = new uint256[](eligible);
+        for (uint256 i = 0; i < eligible; i++) {
+            order[i] = sorted[i];
+        }
+    }
+
+    // Water-filling split of _amount: the most utilized pools are topped up to one common
+    // utilization level, pools already at or below that level get nothing
+    function _depositSplit(PoolSnapshot[] memory _snaps, uint256 _amount) internal pure returns (uint256[] memory amounts) {
+        amounts = new uint256[](_snaps.length);
+        uint256[] memory utils = new uint256[](_snaps.length);
+        for (uint256 i = 0; i < _snaps.length; i++) {
+            utils[i] = _utilization(_snaps[i]);
+        }
+        uint256[] memory order = _depositOrder(_snaps, utils);
+        (uint256 level, uint256 active) = _fillLevel(_snaps, order, utils, _amount);
+
+        uint256 remaining = _amount;
+        for (uint256 i = 0; i < active && level > 0; i++) {
+            PoolSnapshot memory snap = _snaps[order[i]];
+            //Supply at which this pool sits at the level
+            uint256 target = snap.totalSupplied.sub(snap.liquidity).mul(UTIL_PRECISION).div(level);
+            if (target <= snap.totalSupplied) continue;
+            uint256 chunk = Math.min(target - snap.totalSupplied, remaining);
+            //Too small to mint a single bToken
+            if (_wantTobToken(chunk, snap.pps) == 0) continue;
+            amounts[order[i]] = chunk;
+            remaining = remaining.sub(chunk);
+        }
+        //Rounding dust goes to the most utilized pool
+        if (order.length > 0) amounts[order[0]] = amounts[order[0]].add(remaining);
+    }
+
+    // Per pool amounts a split deposit of _amount would send, in the order of pools
+    function depositSplit(uint256 _amount) external view returns (uint256[] memory) {
+        return _depositSplit(_snapshotPools(), _amount);
     }
 
     function _deposit(uint256 _depositAmount) internal {
-        //Deposit to highest pair
+        if (splitDeposits) {
+            PoolSnapshot[] memory snaps = _snapshotPools();
+            uint256[] memory amounts = _depositSplit(snaps, _depositAmount);
+            for (uint256 i = 0; i < snaps.length; i++) {
+                _depositToPool(snaps[i].pool, amounts[i]);
+            }
+            return;
+        }
+        //Deposit to highest pair,funds stay idle when every pool is stuck
         address highestPair = highestInterestPair(_depositAmount);
-        _depositToPool(highestPair, _depositAmount);
+        if (highestPair != address(0)) _depositToPool(highestPair, _depositAmount);
     }
 
     function _withdrawAll() internal {
@@ -354,41 +572,95 @@ contract Strategy is BaseStrategy {
         _withdrawOptimal(_withdrawAmount);
     }
 
-    function revokeApprovals() internal {
-        for (uint256 i = 0; i < pools.length; i++) {
-            want.approve(pools[i], 0);
-        }
-    }
-
-    function addApprovals() internal {
-        for (uint256 i = 0; i < pools.length; i++) {
-            if (want.allowance(address(this), pools[i]) == 0) want.approve(pools[i], type(uint256).max);
-        }
-    }
-
     function updateMinProfit(uint256 _minProfit) external onlyAuthorized {
         minProfit = _minProfit;
+        emit UpdatedMinProfit(_minProfit);
     }
 
     function updateMinCredit(uint256 _minCredit) external onlyAuthorized {
         minCredit = _minCredit;
+        emit UpdatedMinCredit(_minCredit);
     }
 
+    function updateSplitDeposits(bool _splitDeposits) external onlyAuthorized {
+        splitDeposits = _splitDeposits;
+        emit UpdatedSplitDeposits(_splitDeposits);
+    }
+
+    function updateBufferRatio(uint256 _bufferRatio) external onlyAuthorized {
+        require(_bufferRatio <= BASIS_PRECISION, "!ratio");
+        bufferRatio = _bufferRatio;
+        emit UpdatedBufferRatio(_bufferRatio);
+    }
+
+    function updateBufferTolerance(uint256 _bufferTolerance) external onlyAuthorized {
+        require(_bufferTolerance <= BASIS_PRECISION, "!tolerance");
+        bufferTolerance = _bufferTolerance;
+        emit UpdatedBufferTolerance(_bufferTolerance);
+    }
+
+    //Only pools leaving the set are redeemed and have their approval revoked,kept pools are left as they are
     function changeAllocs(address[] memory _newPools) external onlyGovernance {
-        uint256 balStake = balanceOfStake();
-        // Withdraw from all positions currently allocated
-        if (balStake > 0 && balStake <= getMaxWithdrawable()) {
-            _withdrawAll();
-            revokeApprovals();
+        uint256 freed;
+        //Backwards so swap and pop only moves pools that were already looked at
+        for (uint256 i = pools.length; i > 0; i--) {
+            address pool = pools[i - 1];
+            if (_contains(_newPools, pool)) continue;
+            freed = freed.add(_withdrawFrom(pool));
+            //Pools that couldn't be emptied stay listed so their balance is still counted
+            if (ILendingPoolToken(pool).balanceOf(address(this)) > 0) {
+                _markStuck(pool);
+            } else {
+                _removePool(pool);
+            }
+        }
+        for (uint256 i = 0; i < _newPools.length; i++) {
+            _addPool(_newPools[i]);
         }
+        //Only the want redeemed from dropped pools goes back in,after topping up the buffer.
+        //Other idle want is left for the next harvest or tend
+        uint256 idle = balanceOfWant();
+        uint256 target = bufferTarget();
+        if (freed > 0 && idle > target) _deposit(Math.min(freed, idle.sub(target)));
+    }
+
+    function _markStuck(address _pool) internal {
+        PoolInfo storage info = poolInfo[_pool];
+        if (info.stuck) return;
+        info.stuck = true;
+        stuckPools = stuckPools.add(1);
+        emit PoolStuck(_pool);
+    }
+
+    //Redeems what the stuck pools have the liquidity for and removes the ones that are now empty
+    function _retryStuck() internal {
+        if (stuckPools == 0) return;
+        for (uint256 i = pools.length; i > 0; i--) {
+            address pool = pools[i - 1];
+            if (!poolInfo[pool].stuck) continue;
+            _withdrawFrom(pool);
+            if (ILendingPoolToken(pool).balanceOf(address(this)) == 0) _removePool(pool);
+        }
+    }
 
-        _setPools(_newPools);
-        addApprovals();
-        _deposit(balanceOfWant());
+    function _contains(address[] memory _list, address _pool) internal pure returns (bool) {
+        for (uint256 i = 0; i < _list.length; i++) {
+            if (_list[i] == _pool) return true;
+        }
+        return false;
     }
 
+    //Replaces the pool set without moving funds,dropped pools must be empty
     function setAllocManual(address[] memory _newPools) external onlyGovernance {
-        _setPools(_newPools);
+        for (uint256 i = pools.length; i > 0; i--) {
+            address pool = pools[i - 1];
+            if (_contains(_newPools, pool)) continue;
+            require(ILendingPoolToken(pool).balanceOf(address(this)) == 0, "!empty");
+            _removePool(pool);
+        }
+        for (uint256 i = 0; i < _newPools.length; i++) {
+            _addPool(_newPools[i]);
+        }
     }
 
     function withdrawFromPool(address _pool, uint256 amount) external onlyAuthorized {
@@ -400,26 +672,59 @@ contract Strategy is BaseStrategy {
         uint256 amount,
         address _newPool
     ) external onlyGovernance {
-        _withdrawFromPool(_pool, amount);
-        // Make sure the _newPool is in pools conf,otherwise withdraws will fail
-        _depositToPool(_newPool, amount);
+        //Funds outside pools wouldn't be counted or withdrawable
+        require(isPool(_pool) && isPool(_newPool), "!pool");
+        _depositToPool(_newPool, _withdrawFromPool(_pool, amount));
     }
 
     function rebalance(uint256 amountToRebalance) external onlyAuthorized {
         _withdraw(amountToRebalance);
-        _deposit(balanceOfWant());
+        _depositAboveBuffer();
+    }
+
+    //Deposits the idle want above bufferTarget,the buffer itself stays idle
+    function _depositAboveBuffer() internal {
+        uint256 idle = balanceOfWant();
+        uint256 target = bufferTarget();
+        if (idle > target) _deposit(idle.sub(target));
     }
 
     function withdrawFromLending(uint256 amount) external onlyAuthorized {
         _withdraw(amount);
     }
 
-    function _setPools(address[] memory _newPools) internal {
-        //Delete old entries
-        delete pools;
-        for (uint256 i = 0; i < _newPools.length; i++) {
-            pools.push(_newPools[i]);
+    //Appends _pool and approves it,no-op for listed pools apart from clearing stuck
+    function _addPool(address _pool) internal {
+        PoolInfo storage info = poolInfo[_pool];
+        if (info.listed) {
+            if (info.stuck) {
+                info.stuck = false;
+                stuckPools = stuckPools.sub(1);
+                emit PoolAdded(_pool);
+            }
+            return;
+        }
+        info.index = uint128(pools.length);
+        info.listed = true;
+        pools.push(_pool);
+        if (want.allowance(address(this), _pool) == 0) want.approve(_pool, type(uint256).max);
+        emit PoolAdded(_pool);
+    }
+
+    //Swap and pop,the last pool takes the removed one's slot
+    function _removePool(address _pool) internal {
+        uint256 index = poolInfo[_pool].index;
+        uint256 last = pools.length - 1;
+        if (index != last) {
+            address moved = pools[last];
+            pools[index] = moved;
+            poolInfo[moved].index = uint128(index);
         }
+        pools.pop();
+        if (poolInfo[_pool].stuck) stuckPools = stuckPools.sub(1);
+        delete poolInfo[_pool];
+        want.approve(_pool, 0);
+        emit PoolRemoved(_pool);
     }
 
     function _calculateAllocFromBal(uint256 _bal, uint256 _allocPoints) internal pure returns (uint256) {
@@ -461,16 +766,22 @@ contract Strategy is BaseStrategy {
     }
 
     function adjustPosition(uint256 _debtOutstanding) internal override {
+        //Harvests and tends keep trying to leave pools changeAllocs couldn't empty
+        _retryStuck();
         uint256 _wantAvailable = balanceOfWant();
 
         if (_debtOutstanding >= _wantAvailable) {
             return;
         }
 
-        uint256 toInvest = _wantAvailable.sub(_debtOutstanding);
+        uint256 idle = _wantAvailable.sub(_debtOutstanding);
+        uint256 target = bufferTarget();
 
-        if (toInvest > 0) {
-            _deposit(toInvest);
+        if (idle > target) {
+            _deposit(idle.sub(target));
+        } else if (target.sub(idle) > _bufferBand(target)) {
+            //Refill the buffer,gaps inside the tolerance band wait for a later harvest
+            _withdraw(target.sub(idle));
         }
     }
 
@@ -478,9 +789,9 @@ contract Strategy is BaseStrategy {
         // NOTE: Maintain invariant `want.balanceOf(this) >= _liquidatedAmount`
         // NOTE: Maintain invariant `_liquidatedAmount + _loss <= _amountNeeded`
         uint256 balanceWant = balanceOfWant();
-        uint256 balanceStaked = balanceOfStake();
+        //Served from idle want alone when it covers the amount,without reading any pool
         if (_amountNeeded > balanceWant) {
-            uint256 amountToWithdraw = (Math.min(balanceStaked, _amountNeeded.sub(balanceWant)));
+            uint256 amountToWithdraw = (Math.min(balanceOfStake(), _amountNeeded.sub(balanceWant)));
             _withdraw(amountToWithdraw);
         }
         // Since we might free more than needed, let's send back the min
@@ -0,0 +1,82 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import "../interfaces/ILendingPool.sol";
+
+interface IStrategyPools {
+    function want() external view returns (address);
+
+    function pools(uint256) external view returns (address);
+
+    function getTotalPools() external view returns (uint256);
+
+    function poolInfo(address)
+        external
+        view
+        returns (
+            uint128,
+            bool,
+            bool
+        );
+}
+
+// Read-only companion to Strategy, returns the state of every pool a strategy lends to in one eth_call
+contract StrategyLens {
+    using SafeMath for uint256;
+
+    uint256 internal constant UTIL_PRECISION = 1e18;
+
+    // Amounts are in want, utilization is scaled by 1e18 like Strategy.lendPairUtilization,
+    // stuck is Strategy.poolInfo(pool).stuck, deposits skip those pools
+    struct PoolState {
+        address pool;
+        uint256 pps;
+        uint256 totalSupplied;
+        uint256 borrowed;
+        uint256 liquidity;
+        uint256 balance;
+        uint256 utilization;
+        uint256 withdrawable;
+        bool stuck;
+    }
+
+    function poolState(
+        address _strategy,
+        address _want,
+        address _pool
+    ) public view returns (PoolState memory state) {
+        state.pool = _pool;
+        state.pps = ILendingPool(_pool).exchangeRateLast();
+        state.totalSupplied = IERC20(_pool).totalSupply().mul(state.pps).div(1e18);
+        state.liquidity = IERC20(_want).balanceOf(_pool);
+        state.balance = IERC20(_pool).balanceOf(_strategy).mul(state.pps).div(1e18);
+        // Rounding can leave a few wei more liquidity than supplied on empty pools
+        state.borrowed = state.totalSupplied > state.liquidity ? state.totalSupplied - state.liquidity : 0;
+        if (state.totalSupplied > 0) {
+            state.utilization = state.borrowed.mul(UTIL_PRECISION).div(state.totalSupplied);
+        }
+        state.withdrawable = Math.min(state.balance, state.liquidity);
+        (, , state.stuck) = IStrategyPools(_strategy).poolInfo(_pool);
+    }
+
+    function poolStates(address _strategy) public view returns (PoolState[] memory states) {
+        IStrategyPools strategy = IStrategyPools(_strategy);
+        address want = strategy.want();
+        states = new PoolState[](strategy.getTotalPools());
+        for (uint256 i = 0; i < states.length; i++) {
+            states[i] = poolState(_strategy, want, strategy.pools(i));
+        }
+    }
+
+    function poolStatesMany(address[] calldata _strategies) external view returns (PoolState[][] memory states) {
+        states = new PoolState[][](_strategies.length);
+        for (uint256 i = 0; i < _strategies.length; i++) {
+            states[i] = poolStates(_strategies[i]);
+        }
+    }
+}
@@ -0,0 +1,95 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+import "../../interfaces/ILendingPool.sol";
+
+// Local stand-in for a Tarot borrowable.
+// Same mint/redeem flow as the real pool (transfer in, then call), with utilization driven
+// by borrow/repay and interest accruing on borrows at a fixed per second rate.
+contract MockLendingPool is ILendingPool, ERC20 {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    uint256 internal constant INITIAL_EXCHANGE_RATE = 1e18;
+
+    IERC20 public underlying;
+    address public override collateral;
+
+    // Want held by the pool, kept in sync on every mint/redeem/borrow/repay
+    uint256 public totalBalance;
+    uint256 public totalBorrows;
+    // Interest per second on borrows, scaled by 1e18
+    uint256 public borrowRate;
+    uint256 public accrualTimestamp;
+    uint256 public override exchangeRateLast;
+
+    constructor(address _underlying, uint256 _borrowRate) public ERC20("Mock Tarot Borrowable", "bMOCK") {
+        underlying = IERC20(_underlying);
+        borrowRate = _borrowRate;
+        accrualTimestamp = block.timestamp;
+        exchangeRateLast = INITIAL_EXCHANGE_RATE;
+    }
+
+    function accrueInterest() public {
+        uint256 elapsed = block.timestamp.sub(accrualTimestamp);
+        if (elapsed == 0) return;
+        accrualTimestamp = block.timestamp;
+        totalBorrows = totalBorrows.add(totalBorrows.mul(borrowRate).mul(elapsed).div(1e18));
+    }
+
+    function _exchangeRate() internal view returns (uint256) {
+        uint256 supply = totalSupply();
+        if (supply == 0) return INITIAL_EXCHANGE_RATE;
+        return totalBalance.add(totalBorrows).mul(1e18).div(supply);
+    }
+
+    function exchangeRate() public override returns (uint256 rate) {
+        accrueInterest();
+        rate = _exchangeRate();
+        exchangeRateLast = rate;
+    }
+
+    function mint(address minter) external override returns (uint256 mintTokens) {
+        uint256 balance = underlying.balanceOf(address(this));
+        uint256 mintAmount = balance.sub(totalBalance);
+        mintTokens = mintAmount.mul(1e18).div(exchangeRate());
+        require(mintTokens > 0, "MockLendingPool: MINT_AMOUNT_ZERO");
+        totalBalance = balance;
+        _mint(minter, mintTokens);
+    }
+
+    function redeem(address redeemer) external override returns (uint256 redeemAmount) {
+        uint256 redeemTokens = balanceOf(address(this));
+        redeemAmount = redeemTokens.mul(exchangeRate()).div(1e18);
+        require(redeemAmount > 0, "MockLendingPool: REDEEM_AMOUNT_ZERO");
+        require(redeemAmount <= totalBalance, "MockLendingPool: INSUFFICIENT_CASH");
+        _burn(address(this), redeemTokens);
+        totalBalance = totalBalance.sub(redeemAmount);
+        underlying.safeTransfer(redeemer, redeemAmount);
+    }
+
+    // Borrower side, anyone can borrow in tests
+    function borrow(address to, uint256 amount) external {
+        accrueInterest();
+        totalBorrows = totalBorrows.add(amount);
+        totalBalance = totalBalance.sub(amount, "MockLendingPool: INSUFFICIENT_CASH");
+        underlying.safeTransfer(to, amount);
+    }
+
+    function repay(uint256 amount) external {
+        accrueInterest();
+        underlying.safeTransferFrom(msg.sender, address(this), amount);
+        totalBorrows = totalBorrows.sub(Math.min(amount, totalBorrows));
+        totalBalance = totalBalance.add(amount);
+    }
+
+    function setBorrowRate(uint256 _borrowRate) external {
+        accrueInterest();
+        borrowRate = _borrowRate;
+    }
+}
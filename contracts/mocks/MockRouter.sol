@@ -0,0 +1,24 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// Minimal stand-in for the Spookyswap router the strategy reads WETH and quotes from.
+// Tests copy its runtime code to the hardcoded router address, so state is set after deploy.
+contract MockRouter {
+    address internal weth;
+
+    function setWETH(address _weth) external {
+        weth = _weth;
+    }
+
+    function WETH() external view returns (address) {
+        return weth;
+    }
+
+    // Every hop quotes 1:1
+    function getAmountsOut(uint256 amountIn, address[] calldata path) external pure returns (uint256[] memory amounts) {
+        amounts = new uint256[](path.length);
+        for (uint256 i = 0; i < path.length; i++) {
+            amounts[i] = amountIn;
+        }
+    }
+}
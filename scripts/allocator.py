@@ -0,0 +1,71 @@
+import numpy as np
+
+BASIS_PRECISION = 10000
+# Do not lend to low utilization lending pools
+MIN_UTIL_CUTOFF = 20
+
+
+def utilizationFrom(supply, liquidity):
+    # Percent of supplied want that is borrowed, 0 for empty pools
+    supply = np.asarray(supply, dtype=np.float64)
+    liquidity = np.asarray(liquidity, dtype=np.float64)
+    borrowed = supply - liquidity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        util = np.where(supply > 0, borrowed / supply * 100, 0.0)
+    return util
+
+
+def largestRemainder(shares, precision=BASIS_PRECISION):
+    """
+    Rounds fractional basis points so every row sums to exactly `precision`.
+    Leftover points go one each to the entries with the largest fractional part.
+    Rows that are all zero are left at zero.
+    """
+    shares = np.asarray(shares, dtype=np.float64)
+    floored = np.floor(shares)
+    remainder = shares - floored
+    live = shares.sum(axis=-1, keepdims=True) > 0
+    missing = np.where(live, precision - floored.sum(axis=-1, keepdims=True), 0).astype(
+        np.int64
+    )
+    # Rank entries by remainder (stable, so ties favour the earlier pool)
+    order = np.argsort(-remainder, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(shares.shape[-1]), axis=-1)
+    return floored.astype(np.int64) + (ranks < missing)
+
+
+def allocate(
+    utilization, cutoff=MIN_UTIL_CUTOFF, precision=BASIS_PRECISION, weights=None
+):
+    """
+    Basis point allocations proportional to utilization.
+    `utilization` is (pools,) or (scenarios, pools); `cutoff` may be a scalar or
+    one value per scenario. Pools under the cutoff get nothing and are left out
+    of the total. `weights` optionally scales each pool's score, e.g. by
+    liquidity, and broadcasts like `utilization`.
+    """
+    util = np.asarray(utilization, dtype=np.float64)
+    cutoff = np.asarray(cutoff, dtype=np.float64)
+    if cutoff.ndim == 1 and util.ndim == 2:
+        cutoff = cutoff[:, None]
+    score = np.where(util >= cutoff, util, 0.0)
+    if weights is not None:
+        score = score * np.asarray(weights, dtype=np.float64)
+    total = score.sum(axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.where(total > 0, score / total * precision, 0.0)
+    return largestRemainder(shares, precision)
+
+
+def allocateFrom(supply, liquidity, cutoff=MIN_UTIL_CUTOFF, precision=BASIS_PRECISION):
+    # Same as allocate(),deriving utilization from supply and available liquidity
+    return allocate(utilizationFrom(supply, liquidity), cutoff, precision)
+
+
+def sweepCutoffs(utilization, cutoffs, precision=BASIS_PRECISION):
+    # One row of allocations per cutoff,shape (len(cutoffs), pools)
+    util = np.broadcast_to(
+        np.asarray(utilization, dtype=np.float64), (len(cutoffs), len(utilization))
+    )
+    return allocate(util, np.asarray(cutoffs, dtype=np.float64), precision)
@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import json
+import random
+
+import aiohttp
+
+from scripts.multicall import Call, decodeResult, encodeCall
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.25
+# Seconds a request may take before it is retried
+DEFAULT_TIMEOUT = 30
+# Status codes worth retrying, anything else is returned to the caller as an error
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RpcError(Exception):
+    pass
+
+
+class AsyncRpc:
+    """
+    JSON-RPC client sharing one pooled HTTP session (or one WebSocket) between
+    all coroutines. At most `concurrency` requests are in flight at a time and
+    transient failures are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        url,
+        concurrency=DEFAULT_CONCURRENCY,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        block="latest",
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.url = url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.block = block if isinstance(block, str) else hex(block)
+        self.requests = 0
+        self.ids = itertools.count(1)
+        self.session = None
+        self.ws = None
+        self.pending = {}
+        self.reader = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        if self.url.startswith("ws"):
+            self.connecting = asyncio.Lock()
+            await self._connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        await self.session.close()
+
+    async def _connect(self):
+        # Each connection has its own pending requests,failed together when it drops
+        self.ws = await self.session.ws_connect(self.url)
+        self.pending = {}
+        self.reader = asyncio.ensure_future(self._readWs(self.ws, self.pending))
+
+    async def _readWs(self, ws, pending):
+        # Route websocket responses back to the coroutine waiting on their id
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                response = json.loads(msg.data)
+                future = pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            # No response is coming for what is still waiting,fail it so it is retried
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(aiohttp.ClientError("websocket closed"))
+            pending.clear()
+
+    async def _sendWs(self, payload):
+        async with self.connecting:
+            if self.ws.closed:
+                await self._connect()
+        pending = self.pending
+        future = asyncio.get_event_loop().create_future()
+        pending[payload["id"]] = future
+        try:
+            await self.ws.send_str(json.dumps(payload))
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            pending.pop(payload["id"], None)
+
+    async def _send(self, payload):
+        if self.ws is not None:
+            return await self._sendWs(payload)
+        async with self.session.post(self.url, json=payload) as resp:
+            if resp.status in RETRY_STATUS:
+                raise aiohttp.ClientResponseError(
+                    resp.request_info, resp.history, status=resp.status
+                )
+            return await resp.json(content_type=None)
+
+    async def request(self, method, params):
+        for attempt in range(self.retries + 1):
+            payload = {
+                "jsonrpc": "2.0",
+                "id": next(self.ids),
+                "method": method,
+                "params": params,
+            }
+            try:
+                async with self.semaphore:
+                    self.requests += 1
+                    response = await self._send(payload)
+                if "error" in response:
+                    raise RpcError(response["error"])
+                return response["result"]
+            # ConnectionResetError is what writing to a websocket that just dropped raises
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionResetError):
+                if attempt == self.retries:
+                    raise
+                # Full jitter so retried requests do not hit the node in lockstep
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def call(self, target, signature, args=(), returns=("uint256",)):
+        # Same encoding and decoding as a multicall Call, but as a single eth_call
+        call = Call(target, signature, list(args), list(returns))
+        data = "0x" + encodeCall(call).hex()
+        result = await self.request(
+            "eth_call", [{"to": target, "data": data}, self.block]
+        )
+        return decodeResult(call, True, bytes.fromhex(result[2:]))
+
+    async def pinBlock(self):
+        if self.block == "latest":
+            self.block = await self.request("eth_blockNumber", [])
+        return int(self.block, 16)
@@ -0,0 +1,79 @@
+import json
+import os
+
+from brownie import Strategy, accounts, chain, web3
+
+from scripts.rpcProfile import profileFromEnv
+
+# Share of the block gas limit one cloneStrategies batch may use
+BLOCK_SHARE = 0.8
+ROLES = ["vault", "strategist", "rewards", "keeper", "pools"]
+
+
+def cloneArgs(specs):
+    # [{vault, strategist, rewards, keeper, pools}] -> cloneStrategies arguments
+    return tuple([spec[role] for spec in specs] for role in ROLES)
+
+
+def splitBatches(specs, budget, estimate):
+    """
+    Splits specs into consecutive batches that each fit in `budget` gas. Each
+    batch is the longest run that fits, found by doubling from the previous
+    batch size and then bisecting on estimate(batch).
+    """
+    batches, start, size = [], 0, 1
+    while start < len(specs):
+        remaining = len(specs) - start
+
+        def fits(n):
+            return estimate(specs[start : start + n]) <= budget
+
+        lo, hi = 0, min(size, remaining)
+        while hi <= remaining and fits(hi):
+            lo, hi = hi, hi * 2
+        hi = min(hi, remaining + 1)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid
+        if lo == 0:
+            raise ValueError(f"clone {start} alone needs more than {budget} gas")
+        batches.append(specs[start : start + lo])
+        start, size = start + lo, lo
+    return batches
+
+
+def cloneAll(original, specs, sender, budget=None):
+    # Clones every spec through cloneStrategies,returns the clone addresses in spec order
+    if budget is None:
+        budget = int(chain.block_gas_limit * BLOCK_SHARE)
+
+    def estimate(batch):
+        try:
+            return original.cloneStrategies.estimate_gas(
+                *cloneArgs(batch), {"from": sender}
+            )
+        except Exception:
+            # Over the block gas limit,or reverts
+            return float("inf")
+
+    clones = []
+    for batch in splitBatches(specs, budget, estimate):
+        tx = original.cloneStrategies(*cloneArgs(batch), {"from": sender})
+        clones += [event["clone"] for event in tx.events["Cloned"]]
+        print(f"{len(batch)} clones for {tx.gas_used} gas in {tx.txid}")
+    return clones
+
+
+def main():
+    # ORIGINAL strategy to clone,CLONE_SPECS json list of {vault, strategist, rewards,
+    # keeper, pools},CLONE_ACCOUNT brownie account id
+    profileFromEnv(web3)
+    original = Strategy.at(os.environ["ORIGINAL"])
+    with open(os.environ.get("CLONE_SPECS", "clones.json")) as f:
+        specs = json.load(f)
+    sender = accounts.load(os.environ.get("CLONE_ACCOUNT", "stratdev"))
+    for spec, clone in zip(specs, cloneAll(original, specs, sender)):
+        print(f"{spec['vault']} {clone}")
@@ -1,115 +1,176 @@
+import os
 from pathlib import Path
 
+import yaml
 from brownie import Strategy, interface, accounts, config, network, project, web3
-from brownie.network.gas.strategies import GasNowStrategy
-from brownie.network import gas_price
-from eth_utils import is_checksum_address
+from eth_account import Account
 
+from scripts.rpcProfile import profileFromEnv
+from scripts.txPipeline import TxPipeline, step
 
 API_VERSION = config["dependencies"][0].split("@")[-1]
-Vault = project.load(
-    Path.home() / ".brownie" / "packages" / config["dependencies"][0]
-).Vault
-IVaultRegistry = interface.IVaultRegistry
-ISharer = interface.ISharer
-# Config data
-WANT_TOKEN = "0x111111111117dC0aa78b770fA6A738034120C302"
-STRATEGIST_ADDR = "0x7495B77b15fCb52fbb7BCB7380335d819ce4c04B"
+DEFAULT_CONFIG = os.environ.get("DEPLOY_CONFIG", "deploy.yaml")
+DEFAULT_STATE = os.environ.get("DEPLOY_STATE", "deployState.json")
 
-VAULT_REGISTRY = "0xE15461B18EE31b7379019Dc523231C57d1Cbc18c"
-SHARER = "0x2C641e14AfEcb16b4Aa6601A40EE60c3cc792f7D"
-STRATEGIST_MULTISIG = "0x16388463d60FFE0661Cf7F1f31a7D658aC790ff7"
-TREASURY = "0x93A62dA5a14C80f265DAbC077fCEE437B1a0Efde"
-KEEP3R_MANAGER = "0x13dAda6157Fee283723c0254F43FF1FdADe4EEd6"
-DEV_MS = "0x846e211e8ba920B353FB717631C015cf04061Cc9"
-BRS_MS = "0xcF02A27199b4d2c842B442B08b55bBe27ca6Cb7C"
-# Deployer as governance
-GOVERNANCE = STRATEGIST_ADDR
-# Rewards to deployer,we can change it to yearn governance after approval
-REWARDS = STRATEGIST_ADDR
-# Set this to true if we are using a experimental deploy flow
-EXPERIMENTAL_DEPLOY = True
-BASE_GASLIMIT = 400000
-# Set gas price as fast
-gas_price(200 * 1e9)
 
+def loadVault():
+    return project.load(
+        Path.home() / ".brownie" / "packages" / config["dependencies"][0]
+    ).Vault
 
-def get_address(msg: str) -> str:
-    while True:
-        val = input(msg)
-        if is_checksum_address(val):
-            return val
-        else:
-            addr = web3.ens.address(val)
-            if addr:
-                print(f"Found ENS '{val}' [{addr}]")
-                return addr
-        print(f"I'm sorry, but '{val}' is not a checksummed address or ENS")
 
+def loadConfig(path=DEFAULT_CONFIG):
+    with open(path) as f:
+        return yaml.safe_load(f)
 
-def main():
-    print(f"You are using the '{network.show_active()}' network")
-    dev = accounts.load("stratdev")
-    print(f"You are using: 'dev' [{dev.address}]")
-    if input("Is there a Vault for this strategy already? y/[N]: ").lower() == "y":
-        vault = Vault.at(get_address("Deployed Vault: "))
-        assert vault.apiVersion() == API_VERSION
-    elif EXPERIMENTAL_DEPLOY:
-        vaultRegistry = IVaultRegistry(VAULT_REGISTRY)
-        # Deploy and get Vault deployment address
-        expVaultTx = vaultRegistry.newExperimentalVault(
-            WANT_TOKEN,
-            STRATEGIST_ADDR,
-            STRATEGIST_MULTISIG,
-            TREASURY,
+
+def deployContracts(conf, dev, pipeline, Vault):
+    """
+    Vault (unless conf names one) and strategy, one at a time since each needs
+    the address before it. Addresses are saved as soon as they exist so a rerun
+    doesn't deploy again.
+    """
+    state = pipeline.state
+    txParams = {"from": dev}
+    if pipeline.gasPrice:
+        txParams["gas_price"] = pipeline.gasPrice
+    if "vault" not in state:
+        if conf.get("vault"):
+            state["vault"] = conf["vault"]
+        elif conf.get("registry"):
+            tx = interface.IVaultRegistry(conf["registry"]).newExperimentalVault(
+                conf["want"],
+                conf["governance"],
+                conf["guardian"],
+                conf["rewards"],
+                "",
+                "",
+                txParams,
+            )
+            state["vault"] = tx.return_value
+            # The registry initializes it
+            state["vaultInitialized"] = True
+        else:
+            state["vault"] = Vault.deploy(txParams).address
+        pipeline.save()
+    vault = Vault.at(state["vault"])
+    if not conf.get("vault") and not state.get("vaultInitialized"):
+        vault.initialize(
+            conf["want"],
+            conf["governance"],
+            conf["rewards"],
             "",
             "",
-            {"from": dev},
-        )
-        vault = Vault.at(expVaultTx.return_value)
-    else:
-        # Deploy vault
-        vault = Vault.deploy({"from": dev})
-        vault.initialize(
-            WANT_TOKEN,  # OneInch token as want token
-            GOVERNANCE,  # governance
-            REWARDS,  # rewards
-            "",  # nameoverride
-            "",  # symboloverride
-            {"from": dev},
+            conf["guardian"],
+            txParams,
         )
-        print(API_VERSION)
-        assert vault.apiVersion() == API_VERSION
+        state["vaultInitialized"] = True
+        pipeline.save()
+    assert vault.apiVersion() == API_VERSION
+    if "strategy" not in state:
+        state["strategy"] = Strategy.deploy(
+            vault,
+            conf["pools"],
+            txParams,
+            publish_source=conf.get("publishSource", False),
+        ).address
+        pipeline.save()
+    return state["vault"], state["strategy"]
 
-    print(
-        f"""
-    Strategy Parameters
 
-       api: {API_VERSION}
-     token: {vault.token()}
-      name: '{vault.name()}'
-    symbol: '{vault.symbol()}'
+def planConfiguration(conf, vault, strategy, dev):
     """
-    )
-    if input("Deploy Strategy? [y]/n: ").lower() == "n":
-        strategy = Strategy.at(get_address("Deployed Strategy: "))
-    else:
-        strategy = Strategy.deploy(vault, {"from": dev}, publish_source=True)
-    # add strat to vault
-    vault.addStrategy(strategy, 9800, 0, 2 ** 256 - 1, 1000, {"from": dev})
-    # Set deposit limit to 1008 1INCH tokens,Approx 50K
-    vault.setDepositLimit(1008 * 1e18, {"from": dev})
-    # Set keeper
-    strategy.setKeeper(KEEP3R_MANAGER, {"from": dev})
-    # Set reward
-    strategy.setRewards(SHARER, {"from": dev})
-    if EXPERIMENTAL_DEPLOY:
-        vault.setGovernance(BRS_MS, {"from": dev})
-        vault.setManagementFee(0, {"from": dev})
-        # Setup rewards
-        contributors = [dev.address]
-        _numOfShares = [660]
-        sharer = ISharer(SHARER)
-        sharer.setContributors(
-            strategy, contributors, _numOfShares, {"from": dev},
+    Setup calls after deployment. They are independent of each other and all go
+    out together, only the vault governance handover waits for them.
+    """
+    calls = []
+    if "addStrategy" in conf:
+        debt = conf["addStrategy"]
+        calls.append(
+            step(
+                "addStrategy",
+                vault,
+                "addStrategy(address,uint256,uint256,uint256,uint256)",
+                [
+                    strategy,
+                    debt["debtRatio"],
+                    debt["minDebtPerHarvest"],
+                    debt["maxDebtPerHarvest"],
+                    debt["performanceFee"],
+                ],
+            )
+        )
+    if "depositLimit" in conf:
+        calls.append(
+            step(
+                "setDepositLimit",
+                vault,
+                "setDepositLimit(uint256)",
+                [conf["depositLimit"]],
+            )
         )
+    if "managementFee" in conf:
+        calls.append(
+            step(
+                "setManagementFee",
+                vault,
+                "setManagementFee(uint256)",
+                [conf["managementFee"]],
+            )
+        )
+    if "keeper" in conf:
+        calls.append(
+            step("setKeeper", strategy, "setKeeper(address)", [conf["keeper"]])
+        )
+    if "strategyRewards" in conf:
+        calls.append(
+            step(
+                "setRewards", strategy, "setRewards(address)", [conf["strategyRewards"]]
+            )
+        )
+    if "sharer" in conf:
+        sharer = conf["sharer"]
+        calls.append(
+            step(
+                "setContributors",
+                sharer["address"],
+                "setContributors(address,address[],uint256[])",
+                [strategy, sharer.get("contributors") or [dev], sharer["shares"]],
+            )
+        )
+    stages = [calls]
+    if conf.get("vaultGovernance"):
+        stages.append(
+            [
+                step(
+                    "setGovernance",
+                    vault,
+                    "setGovernance(address)",
+                    [conf["vaultGovernance"]],
+                )
+            ]
+        )
+    return [stage for stage in stages if stage]
+
+
+def deploy(conf, dev, path=DEFAULT_STATE, Vault=None, pollInterval=1.0):
+    gasPrice = int(conf["gasPrice"] * 1e9) if conf.get("gasPrice") else None
+    pipeline = TxPipeline(
+        web3, Account.from_key(dev.private_key), path, pollInterval, gasPrice
+    )
+    vault, strategy = deployContracts(conf, dev, pipeline, Vault or loadVault())
+    pipeline.plan(planConfiguration(conf, vault, strategy, dev.address))
+    pipeline.run()
+    return vault, strategy
+
+
+def main():
+    # DEPLOY_CONFIG yaml to deploy from,DEPLOY_ACCOUNT brownie account id,
+    # DEPLOY_STATE file a failed run resumes from
+    profileFromEnv(web3)
+    print(f"You are using the '{network.show_active()}' network")
+    dev = accounts.load(os.environ.get("DEPLOY_ACCOUNT", "stratdev"))
+    print(f"You are using: 'dev' [{dev.address}]")
+    vault, strategy = deploy(loadConfig(), dev)
+    print(f"Vault {vault}")
+    print(f"Strategy {strategy}")
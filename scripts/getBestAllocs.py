@@ -1,6 +1,11 @@
+import numpy as np
+
+from scripts.allocator import allocate
+
+
 def main():
-    #Paste data output from getAllFTMLendingpools script to calculate allocation
-    #TODO move this to getallftmlendingpools script
+    # Paste data output from getAllFTMLendingpools script to calculate allocation
+    # TODO move this to getallftmlendingpools script
     lendingData = [
         [
             "0x9cDED654472788a143C2285A6b2a580392510688",
@@ -63,24 +68,13 @@ def main():
             856688.8721177216,
         ],
     ]
-    totalUtil = 0
-    totalAlloc = 0
-    poolAllocConf = []
-    # First get total util points
-    for lendingPool in lendingData:
-        # Do not lend to low utilization lending pools
-        if lendingPool[1] < 20:
-            continue
-        totalUtil = totalUtil + lendingPool[1]
-    for lendingPool in lendingData:
-        allocPoints = lendingPool[1] / totalUtil
-        allocPoints = round((allocPoints * 100) * 100)
-        totalAlloc = totalAlloc + allocPoints
-        poolAllocConf.append([lendingPool[0], allocPoints])
-    print(totalAlloc)
-    if totalAlloc < 10000:
-        poolAllocConf[-1][1] = poolAllocConf[-1][1] + (10000 - totalAlloc)
+    pools = [lendingPool[0] for lendingPool in lendingData]
+    utilization = np.array([lendingPool[1] for lendingPool in lendingData])
+    allocPoints = allocate(utilization)
+    print(allocPoints.sum())
+    poolAllocConf = [[pool, int(points)] for pool, points in zip(pools, allocPoints)]
     print(poolAllocConf)
 
 
-main()
+if __name__ == "__main__":
+    main()
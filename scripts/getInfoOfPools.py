@@ -1,25 +1,121 @@
-from brownie import interface
+import os
+
+from brownie import web3
+
+from scripts.multicall import Call, CachedMulticall, Multicall
+from scripts.rpcProfile import profileFromEnv
+
+METADATA_CACHE = os.environ.get("POOL_METADATA", "poolMetadata.json")
+# Everything else on the resolve path is fixed at deploy time and gets cached
+MUTABLE = {"getReserves()"}
+
+
+def hop(multicall, targets, calls):
+    # Runs calls(target) for every target as one batch,results line up with targets
+    # and are None where the target itself is None (an earlier hop reverted)
+    batch, owners = [], []
+    for i, target in enumerate(targets):
+        if target is None:
+            continue
+        for call in calls(target):
+            batch.append(call)
+            owners.append(i)
+    results = multicall.execute(batch)
+    width = len(calls(targets[0])) if targets else 0
+    out = [None if width == 1 else [None] * width for _ in targets]
+    for n, (i, result) in enumerate(zip(owners, results)):
+        if width == 1:
+            out[i] = result
+        else:
+            out[i][n % width] = result
+    return out
+
+
+def resolvePools(pools, multicall):
+    """
+    pool -> collateral -> vault token -> pair -> tokens, advancing every pool one
+    hop at a time so the whole set takes one round per hop, not pools x hops.
+    """
+    collaterals = hop(
+        multicall, pools, lambda p: [Call(p, "collateral()", [], ["address"])]
+    )
+    vaultTokens = hop(
+        multicall, collaterals, lambda c: [Call(c, "underlying()", [], ["address"])]
+    )
+    pairs = hop(
+        multicall, vaultTokens, lambda v: [Call(v, "underlying()", [], ["address"])]
+    )
+    pairInfo = hop(
+        multicall,
+        pairs,
+        lambda p: [
+            Call(p, "token0()", [], ["address"]),
+            Call(p, "token1()", [], ["address"]),
+            Call(p, "getReserves()", [], ["uint112", "uint112", "uint32"]),
+        ],
+    )
+    # Each token is looked up once however many pairs share it
+    tokens = sorted(
+        {t for info in pairInfo if info is not None for t in info[:2] if t is not None}
+    )
+    tokenInfo = hop(
+        multicall,
+        tokens,
+        lambda t: [
+            Call(t, "symbol()", [], ["string"]),
+            Call(t, "decimals()", [], ["uint8"]),
+        ],
+    )
+    tokenInfo = dict(zip(tokens, tokenInfo))
+
+    rows = []
+    for pool, collateral, pair, info in zip(pools, collaterals, pairs, pairInfo):
+        if info is None or None in info:
+            rows.append({"pool": pool, "collateral": collateral, "pair": pair})
+            continue
+        token0, token1, reserves = info
+        (symbol0, decimals0), (symbol1, decimals1) = (
+            tokenInfo[token0],
+            tokenInfo[token1],
+        )
+        rows.append(
+            {
+                "pool": pool,
+                "collateral": collateral,
+                "pair": pair,
+                "name": f"{symbol0}-{symbol1}",
+                "reserves": (
+                    reserves[0] / 10 ** decimals0,
+                    reserves[1] / 10 ** decimals1,
+                ),
+                "symbols": (symbol0, symbol1),
+            }
+        )
+    return rows
+
+
 def main():
+    profileFromEnv(web3)
     newalloc = [
-        ["0x9cDED654472788a143C2285A6b2a580392510688", 1102],#WFTM-YFI
-        ["0xDf79EA5d777F28cAb9fD42ACda6208a228c71B59", 1095],# WFTM-LINK
-        ["0xF2D3AE45F8775bA0a729dF47210164F921Edc306", 1082],#WFTM-LINK
-        ["0x37F6Cf24bA9E781344Ae4aC8923d9A0A3910bc64", 1076],#WFTM-SUSHI
-        ["0x0c60dbD5b78d1488F9f71163E598d90f8EDE55E7", 1064],#WFTM-WOOFY
-        ["0x4e4a8AE836cBE9576113706e166ae1194A7113E6", 1053],#WFTM-MIM
-        ["0x00Fb23C7169E0378a63D9cFE50Ef40f944653c69", 1035],#WFTM-SUSHI
-        ["0xB566727F4edF30bA13939E304d828e30d4063C59", 960],#WFTM-MIM
-        ["0xD05f23002f6d09Cf7b643B69F171cc2A3EAcd0b3", 769],#WFTM-BOO
-        ["0x5dd76071F7b5F4599d4F2B7c08641843B746ace9", 764],#WFTM-TAROT
+        ["0x9cDED654472788a143C2285A6b2a580392510688", 1102],  # WFTM-YFI
+        ["0xDf79EA5d777F28cAb9fD42ACda6208a228c71B59", 1095],  # WFTM-LINK
+        ["0xF2D3AE45F8775bA0a729dF47210164F921Edc306", 1082],  # WFTM-LINK
+        ["0x37F6Cf24bA9E781344Ae4aC8923d9A0A3910bc64", 1076],  # WFTM-SUSHI
+        ["0x0c60dbD5b78d1488F9f71163E598d90f8EDE55E7", 1064],  # WFTM-WOOFY
+        ["0x4e4a8AE836cBE9576113706e166ae1194A7113E6", 1053],  # WFTM-MIM
+        ["0x00Fb23C7169E0378a63D9cFE50Ef40f944653c69", 1035],  # WFTM-SUSHI
+        ["0xB566727F4edF30bA13939E304d828e30d4063C59", 960],  # WFTM-MIM
+        ["0xD05f23002f6d09Cf7b643B69F171cc2A3EAcd0b3", 769],  # WFTM-BOO
+        ["0x5dd76071F7b5F4599d4F2B7c08641843B746ace9", 764],  # WFTM-TAROT
     ]
-    for i in range(len(newalloc)):
-        pool = newalloc[i][0]
-        print(pool)
-        collateral = interface.ICollateral(interface.ILendingPoolToken(pool).collateral())
-        print(f"collateral : {collateral}")
-        pair = interface.IUniswapV2Pair(interface.IVaultToken(collateral.underlying()).underlying())
-        token0 = interface.ERC20(pair.token0())
-        token1 = interface.ERC20(pair.token1())
-        print(f"Name : {token0.symbol()}-{token1.symbol()}")
-        reserves = pair.getReserves()
-        print(f"LPFunds : {reserves[0] / 10**token0.decimals()} {token0.symbol()} - {reserves[1] / 10**token1.decimals()} {token1.symbol()}")
\ No newline at end of file
+    multicall = CachedMulticall(Multicall(web3), METADATA_CACHE, MUTABLE)
+    for row in resolvePools([alloc[0] for alloc in newalloc], multicall):
+        print(row["pool"])
+        print(f"collateral : {row['collateral']}")
+        if "name" not in row:
+            print("Could not resolve pair")
+            continue
+        print(f"Name : {row['name']}")
+        print(
+            f"LPFunds : {row['reserves'][0]} {row['symbols'][0]} - {row['reserves'][1]} {row['symbols'][1]}"
+        )
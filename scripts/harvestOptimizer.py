@@ -0,0 +1,196 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from brownie import web3
+
+from scripts.keeper import HARVEST_GAS, STRATEGY_PARAMS, LAST_REPORT
+from scripts.migrate_toNew import strategyPools
+from scripts.multicall import Call, Multicall
+from scripts.rateModel import SECONDS_PER_YEAR, fetchRateParams, projectApr
+from scripts.rpcProfile import profileFromEnv
+from scripts.utilStore import DEFAULT_ROOT, UtilStore, summarize
+
+# Harvest intervals searched,1 hour to 30 days
+INTERVALS = np.geomspace(3600, 30 * 24 * 3600, 400)
+GAS_BASELINE = Path(__file__).parent.parent / "benchmarks" / "gas_baseline.json"
+
+
+def fitHarvestGas(baseline):
+    """
+    (base, perPool) gas of a harvest from the gas benchmark baseline, a least
+    squares line through the harvest cost at each pool count. Without
+    measurements for two pool counts every harvest is priced at HARVEST_GAS.
+    """
+    points = [(int(count), gas["harvest"]) for count, gas in baseline.items()]
+    if len(points) < 2:
+        return HARVEST_GAS, 0
+    counts, gas = np.array(points, dtype=np.float64).T
+    perPool, base = np.polyfit(counts, gas, 1)
+    return base, perPool
+
+
+def loadGasBaseline(path=GAS_BASELINE):
+    # Measured gas benchmark output,empty when none has been recorded yet
+    if not path.exists():
+        print(
+            f"WARNING: no gas baseline at {path},every harvest is priced at "
+            f"HARVEST_GAS ({HARVEST_GAS}). Record one with UPDATE_GAS_BASELINE=1 "
+            "brownie test tests/test_gas_benchmark.py --network development"
+        )
+        return {}
+    return json.loads(path.read_text())
+
+
+def aprFromGrowth(ppsGrowth, seconds):
+    # Yearly rate from exchangeRateLast growth over `seconds`,as utilStore.summarize returns it
+    return (1 + np.asarray(ppsGrowth, dtype=np.float64)) ** (
+        SECONDS_PER_YEAR / seconds
+    ) - 1
+
+
+def netYield(assets, apr, inflow, harvestCost, intervals=INTERVALS):
+    """
+    Yearly yield in want of each clone (rows) when harvested every interval
+    (columns). bToken interest compounds inside the pools whether or not we
+    harvest, so what waiting costs is the vault's new credit sitting idle until
+    the next harvest: on average inflow * interval / 2 want not earning `apr`.
+    Against that every harvest costs `harvestCost` want of gas.
+    `assets`/`inflow`/`harvestCost` are in want and want per second, `apr` is a
+    yearly fraction, `intervals` in seconds.
+    """
+    assets, apr, inflow, harvestCost = (
+        np.asarray(x, dtype=np.float64)[:, None]
+        for x in (assets, apr, inflow, harvestCost)
+    )
+    intervals = np.asarray(intervals, dtype=np.float64)[None, :]
+    idleDrag = inflow * intervals / 2 * apr
+    gas = SECONDS_PER_YEAR / intervals * harvestCost
+    return assets * apr - idleDrag - gas
+
+
+def optimize(assets, apr, inflow, harvestCost, intervals=INTERVALS):
+    """
+    Best harvest interval per clone over the grid and the trigger thresholds
+    that make harvests happen at that pace: minProfit is the interest and
+    minCredit the new credit one interval brings in. Amounts in want.
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    net = netYield(assets, apr, inflow, harvestCost, intervals)
+    best = np.argmax(net, axis=1)
+    interval = intervals[best]
+    assets = np.asarray(assets, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        netApr = np.where(assets > 0, net[np.arange(len(best)), best] / assets, 0.0)
+    return {
+        "interval": interval,
+        "minProfit": assets * np.asarray(apr) * interval / SECONDS_PER_YEAR,
+        "minCredit": np.asarray(inflow) * interval,
+        "netApr": netApr,
+    }
+
+
+def fetchClones(w3, multicall, strategies):
+    """
+    Per clone want amounts for the optimizer: estimatedTotalAssets, want per
+    ETH of gas, pool count and the credit the vault built up since the last
+    report per second as the inflow estimate.
+    """
+    vaults = multicall.execute(
+        [Call(s, "vault()", [], ["address"]) for s in strategies]
+    )
+    now = w3.eth.get_block(multicall.pinBlock())["timestamp"]
+    calls = []
+    for strategy, vault in zip(strategies, vaults):
+        calls.append(Call(strategy, "estimatedTotalAssets()", [], ["uint256"]))
+        calls.append(Call(strategy, "ethToWant(uint256)", [10 ** 18], ["uint256"]))
+        calls.append(Call(strategy, "getTotalPools()", [], ["uint256"]))
+        calls.append(Call(vault, "strategies(address)", [strategy], STRATEGY_PARAMS))
+        calls.append(Call(vault, "creditAvailable(address)", [strategy], ["uint256"]))
+    results = multicall.execute(calls)
+    clones = []
+    for i in range(len(strategies)):
+        assets, wantPerEth, poolCount, params, credit = results[5 * i : 5 * i + 5]
+        elapsed = max(now - params[LAST_REPORT], 1)
+        clones.append(
+            {
+                "assets": assets / 1e18,
+                "wantPerEth": wantPerEth / 1e18,
+                "poolCount": poolCount,
+                "inflow": credit / 1e18 / elapsed,
+            }
+        )
+    return clones
+
+
+def poolAprs(w3, multicall, pools, historyBlocks=None):
+    """
+    Supply APR of each pool, from the rate model at the multicall's block or,
+    with `historyBlocks`, from exchangeRateLast growth over that many blocks
+    of the utilStore samples.
+    """
+    latest = multicall.pinBlock()
+    now = w3.eth.get_block(latest)["timestamp"]
+    if not historyBlocks:
+        borrowed, supplied, params = fetchRateParams(multicall, pools, now)
+        return projectApr(borrowed, supplied, params, [0])[:, 0]
+    fromBlock = latest - historyBlocks
+    _, growth = summarize(UtilStore(DEFAULT_ROOT), pools, fromBlock, latest)
+    seconds = now - w3.eth.get_block(fromBlock)["timestamp"]
+    return np.nan_to_num(aprFromGrowth(growth, seconds))
+
+
+def strategyApr(multicall, strategy, pools, aprByPool):
+    # Balance weighted APR of the pools `strategy` lends to
+    calls = []
+    for pool in pools:
+        calls.append(Call(pool, "balanceOf(address)", [strategy], ["uint256"]))
+        calls.append(Call(pool, "exchangeRateLast()", [], ["uint256"]))
+    results = multicall.execute(calls)
+    balances = np.array(
+        [(results[2 * i] or 0) * (results[2 * i + 1] or 0) for i in range(len(pools))],
+        dtype=np.float64,
+    )
+    aprs = np.array([aprByPool[pool] for pool in pools])
+    return float(np.average(aprs, weights=balances)) if balances.sum() else 0.0
+
+
+def main():
+    # STRATEGIES comma separated clones,GAS_PRICE in gwei (the node's when empty),
+    # HISTORY_BLOCKS to take pool rates from the last blocks of UTIL_STORE instead of the rate model
+    profileFromEnv(web3)
+    strategies = os.environ["STRATEGIES"].split(",")
+    multicall = Multicall(web3)
+    gasPrice = (
+        float(os.environ["GAS_PRICE"]) * 1e9
+        if os.environ.get("GAS_PRICE")
+        else web3.eth.gas_price
+    )
+    base, perPool = fitHarvestGas(loadGasBaseline())
+    clones = fetchClones(web3, multicall, strategies)
+    pools = {s: strategyPools(multicall, s) for s in strategies}
+    allPools = sorted({pool for ps in pools.values() for pool in ps})
+    aprByPool = dict(
+        zip(
+            allPools,
+            poolAprs(
+                web3, multicall, allPools, int(os.environ.get("HISTORY_BLOCKS", 0))
+            ),
+        )
+    )
+    apr = [strategyApr(multicall, s, pools[s], aprByPool) for s in strategies]
+    harvestCost = [
+        (base + perPool * c["poolCount"]) * gasPrice / 1e18 * c["wantPerEth"]
+        for c in clones
+    ]
+    result = optimize(
+        [c["assets"] for c in clones], apr, [c["inflow"] for c in clones], harvestCost,
+    )
+    for i, strategy in enumerate(strategies):
+        print(
+            f"{strategy} APR {apr[i] * 100:.2f}% harvest {harvestCost[i]:.4f} want "
+            f"every {result['interval'][i] / 3600:.1f}h net {result['netApr'][i] * 100:.2f}%"
+        )
+        print(f"  updateMinProfit({int(result['minProfit'][i] * 1e18)})")
+        print(f"  updateMinCredit({int(result['minCredit'][i] * 1e18)})")
@@ -0,0 +1,355 @@
+import os
+import time
+
+from brownie import accounts, web3
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+from web3.exceptions import TransactionNotFound
+
+from scripts.multicall import DEFAULT_BATCH_SIZE, MULTICALL3, Call, Multicall
+from scripts.rpcProfile import profileFromEnv
+
+# Gas a harvest is assumed to cost when pricing callCostInWei for the triggers
+HARVEST_GAS = 1_500_000
+# Blocks a sent tx may stay unmined before it is replaced with a higher gas price
+REPLACE_AFTER = 20
+# Minimum bump nodes accept for a replacement tx, in percent
+GAS_BUMP = 125
+
+# Trigger inputs that only change through a setter, cached until the setter's event shows up
+PARAMS = [
+    ("vault", "vault()", ["address"]),
+    ("minReportDelay", "minReportDelay()", ["uint256"]),
+    ("maxReportDelay", "maxReportDelay()", ["uint256"]),
+    ("profitFactor", "profitFactor()", ["uint256"]),
+    ("debtThreshold", "debtThreshold()", ["uint256"]),
+    ("minProfit", "minProfit()", ["uint256"]),
+    ("minCredit", "minCredit()", ["uint256"]),
+    ("bufferRatio", "bufferRatio()", ["uint256"]),
+    ("bufferTolerance", "bufferTolerance()", ["uint256"]),
+]
+PARAM_EVENTS = [
+    "0x" + keccak(text=event).hex()
+    for event in (
+        "UpdatedMinReportDelay(uint256)",
+        "UpdatedMaxReportDelay(uint256)",
+        "UpdatedProfitFactor(uint256)",
+        "UpdatedDebtThreshold(uint256)",
+        "UpdatedMinProfit(uint256)",
+        "UpdatedMinCredit(uint256)",
+        "UpdatedBufferRatio(uint256)",
+        "UpdatedBufferTolerance(uint256)",
+    )
+]
+# Strategy.BASIS_PRECISION
+BASIS_PRECISION = 10000
+# Vault 0.4.3 StrategyParams
+STRATEGY_PARAMS = ["(" + ",".join(["uint256"] * 9) + ")"]
+ACTIVATION, LAST_REPORT, TOTAL_DEBT = 1, 5, 6
+
+
+def stateCalls(strategy, vault, callCostInWei):
+    # Everything the triggers read that can change from block to block
+    return [
+        Call(vault, "strategies(address)", [strategy], STRATEGY_PARAMS),
+        Call(vault, "debtOutstanding(address)", [strategy], ["uint256"]),
+        Call(vault, "creditAvailable(address)", [strategy], ["uint256"]),
+        Call(strategy, "estimatedTotalAssets()", [], ["uint256"]),
+        Call(strategy, "balanceOfWant()", [], ["uint256"]),
+        Call(strategy, "ethToWant(uint256)", [callCostInWei], ["uint256"]),
+    ]
+
+
+STATE_FIELDS = [
+    "strategyParams",
+    "debtOutstanding",
+    "creditAvailable",
+    "estimatedTotalAssets",
+    "balanceOfWant",
+    "callCost",
+]
+
+
+def baseHarvestTrigger(params, state, timestamp):
+    # BaseStrategy.harvestTrigger (yearn-vaults 0.4.3)
+    strategyParams = state["strategyParams"]
+    if strategyParams[ACTIVATION] == 0:
+        return False
+    sinceReport = timestamp - strategyParams[LAST_REPORT]
+    if sinceReport < params["minReportDelay"]:
+        return False
+    if sinceReport >= params["maxReportDelay"]:
+        return True
+    if state["debtOutstanding"] > params["debtThreshold"]:
+        return True
+    total = state["estimatedTotalAssets"]
+    totalDebt = strategyParams[TOTAL_DEBT]
+    if total + params["debtThreshold"] < totalDebt:
+        return True
+    profit = total - totalDebt if total > totalDebt else 0
+    return (
+        params["profitFactor"] * state["callCost"] < state["creditAvailable"] + profit
+    )
+
+
+def harvestTrigger(params, state, timestamp):
+    # Strategy.harvestTrigger
+    totalDebt = state["strategyParams"][TOTAL_DEBT]
+    total = state["estimatedTotalAssets"]
+    pendingInterest = total - totalDebt if totalDebt < total else 0
+    return (
+        baseHarvestTrigger(params, state, timestamp)
+        or pendingInterest > params["minProfit"]
+        or state["creditAvailable"] > params["minCredit"]
+    )
+
+
+def tendTrigger(params, state):
+    # Strategy.tendTrigger,the base one is always false
+    idle = state["balanceOfWant"]
+    target = state["estimatedTotalAssets"] * params["bufferRatio"] // BASIS_PRECISION
+    band = target * params["bufferTolerance"] // BASIS_PRECISION
+    return idle > target + max(band, params["minCredit"]) or target > idle + band
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * pct // 100)]
+
+
+class Keeper:
+    """
+    Watches many strategies and harvests or tends them when their triggers fire.
+    Triggers are evaluated locally from cached params and one Multicall batch
+    per block. Cached params are dropped when their setter's event is logged.
+    """
+
+    def __init__(
+        self,
+        w3,
+        strategies,
+        account,
+        multicall=MULTICALL3,
+        maxGasPrice=None,
+        harvestGas=HARVEST_GAS,
+        batchSize=DEFAULT_BATCH_SIZE,
+    ):
+        self.w3 = w3
+        self.strategies = [to_checksum_address(s) for s in strategies]
+        self.account = account
+        self.multicall = multicall
+        self.maxGasPrice = maxGasPrice
+        self.harvestGas = harvestGas
+        # Each strategy takes len(STATE_FIELDS) calls,raise this to keep many in one batch
+        self.batchSize = batchSize
+        self.params = {}
+        self.pending = {}
+        self.nonce = None
+        self.gasPrice = None
+        self.gasPriceBlock = None
+        self.lastBlock = None
+        self.latencies = []
+        self.sent = []
+
+    def refreshParams(self, block):
+        if self.lastBlock is not None and self.params:
+            logs = self.w3.eth.get_logs(
+                {
+                    "fromBlock": self.lastBlock + 1,
+                    "toBlock": block,
+                    "address": self.strategies,
+                    "topics": [PARAM_EVENTS],
+                }
+            )
+            for log in logs:
+                self.params.pop(to_checksum_address(log["address"]), None)
+        missing = [s for s in self.strategies if s not in self.params]
+        if missing:
+            calls = [Call(s, sig, [], ret) for s in missing for _, sig, ret in PARAMS]
+            results = Multicall(self.w3, self.multicall, self.batchSize, block).execute(
+                calls
+            )
+            for i, strategy in enumerate(missing):
+                values = results[i * len(PARAMS) : (i + 1) * len(PARAMS)]
+                self.params[strategy] = dict(zip([p[0] for p in PARAMS], values))
+
+    def readState(self, block):
+        # One batch for every strategy plus the block timestamp
+        callCostInWei = self.harvestGas * self.currentGasPrice(block)
+        calls = [Call(self.multicall, "getCurrentBlockTimestamp()", [], ["uint256"])]
+        for strategy in self.strategies:
+            calls += stateCalls(strategy, self.params[strategy]["vault"], callCostInWei)
+        results = Multicall(self.w3, self.multicall, self.batchSize, block).execute(
+            calls
+        )
+        width = len(STATE_FIELDS)
+        states = {}
+        for i, strategy in enumerate(self.strategies):
+            values = results[1 + i * width : 1 + (i + 1) * width]
+            # A strategy that reverts (e.g. not added to its vault) is skipped
+            if None not in values:
+                states[strategy] = dict(zip(STATE_FIELDS, values))
+        return results[0], states
+
+    def evaluate(self, block):
+        # [(strategy, "harvest" | "tend")] due at `block`
+        self.refreshParams(block)
+        timestamp, states = self.readState(block)
+        self.lastBlock = block
+        actions = []
+        for strategy, state in states.items():
+            if strategy in self.pending:
+                continue
+            params = self.params[strategy]
+            if harvestTrigger(params, state, timestamp):
+                actions.append((strategy, "harvest"))
+            elif tendTrigger(params, state):
+                actions.append((strategy, "tend"))
+        return actions
+
+    def currentGasPrice(self, block):
+        # Fetched once per block,the triggers and the txs sent for it use the same price
+        if self.gasPriceBlock != block:
+            self.gasPrice = self.w3.eth.gas_price
+            self.gasPriceBlock = block
+        if self.maxGasPrice is not None:
+            return min(self.gasPrice, self.maxGasPrice)
+        return self.gasPrice
+
+    def nextNonce(self):
+        if self.nonce is None:
+            self.nonce = self.w3.eth.get_transaction_count(
+                self.account.address, "pending"
+            )
+        nonce = self.nonce
+        self.nonce += 1
+        return nonce
+
+    def _send(self, strategy, action, nonce, gasPrice):
+        tx = {
+            "from": self.account.address,
+            "to": strategy,
+            "data": function_signature_to_4byte_selector(action + "()"),
+            "nonce": nonce,
+            "gasPrice": gasPrice,
+            "chainId": self.w3.eth.chain_id,
+        }
+        tx["gas"] = self.w3.eth.estimate_gas(tx) * 12 // 10
+        signed = self.account.sign_transaction(tx)
+        return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+    def send(self, strategy, action, block):
+        gasPrice = self.currentGasPrice(block)
+        nonce = self.nextNonce()
+        try:
+            txHash = self._send(strategy, action, nonce, gasPrice)
+        except Exception as e:
+            if "nonce" not in str(e).lower():
+                # Resync on the next send so a failed tx doesn't leave a nonce gap
+                self.nonce = None
+                raise
+            # Someone else used this account,resync and retry once
+            self.nonce = None
+            nonce = self.nextNonce()
+            txHash = self._send(strategy, action, nonce, gasPrice)
+        self.pending[strategy] = {
+            "action": action,
+            # Every hash sent for this nonce,any of them may be the one that gets mined
+            "hashes": [txHash],
+            "nonce": nonce,
+            "gasPrice": gasPrice,
+            "block": block,
+        }
+        self.sent.append((block, strategy, action))
+        print(f"{block} {action} {strategy} nonce {nonce} tx {self.w3.to_hex(txHash)}")
+
+    def checkPending(self, block):
+        # Nonces under the account's mined tx count are settled,whichever tx took them
+        mined = self.w3.eth.get_transaction_count(self.account.address, "latest")
+        for strategy, tx in list(self.pending.items()):
+            if tx["nonce"] < mined:
+                print(f"{block} {tx['action']} {strategy} {self.settledStatus(tx)}")
+                del self.pending[strategy]
+            elif block - tx["block"] >= REPLACE_AFTER:
+                self.replace(strategy, tx, block)
+
+    def settledStatus(self, tx):
+        for txHash in tx["hashes"]:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(txHash)
+            except TransactionNotFound:
+                continue
+            if receipt is not None:
+                return "ok" if receipt["status"] == 1 else "reverted"
+        # Mined under a hash we didn't send,e.g. another process using the account
+        return "replaced"
+
+    def replace(self, strategy, tx, block):
+        # Stuck,resend with the same nonce and a higher gas price,capped at maxGasPrice
+        gasPrice = tx["gasPrice"] * GAS_BUMP // 100
+        if self.maxGasPrice is not None:
+            gasPrice = min(gasPrice, self.maxGasPrice)
+        # Whatever happens it is looked at again after another REPLACE_AFTER blocks
+        tx["block"] = block
+        if gasPrice <= tx["gasPrice"]:
+            # Already at maxGasPrice,wait for the network price to come down
+            return
+        try:
+            txHash = self._send(strategy, tx["action"], tx["nonce"], gasPrice)
+        except Exception as e:
+            # e.g. mined meanwhile or underpriced,the next check settles or retries it
+            print(f"{block} {tx['action']} {strategy} replacement failed: {e}")
+            return
+        tx["hashes"].append(txHash)
+        tx["gasPrice"] = gasPrice
+
+    def step(self, block):
+        if self.pending:
+            self.checkPending(block)
+        start = time.perf_counter()
+        actions = self.evaluate(block)
+        self.latencies.append(time.perf_counter() - start)
+        for strategy, action in actions:
+            try:
+                self.send(strategy, action, block)
+            except Exception as e:
+                # e.g. the harvest would revert,try again next block
+                print(f"{block} {action} {strategy} failed: {e}")
+        return actions
+
+    def stats(self):
+        # Per block evaluation latency in ms
+        ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "blocks": len(ms),
+            "p50": percentile(ms, 50),
+            "p95": percentile(ms, 95),
+            "max": max(ms),
+        }
+
+    def run(self, pollInterval=1.0, blocks=None):
+        # Evaluates every new block,`blocks` limits how many (None runs forever)
+        while blocks is None or len(self.latencies) < blocks:
+            block = self.w3.eth.block_number
+            if block == self.lastBlock:
+                time.sleep(pollInterval)
+                continue
+            self.step(block)
+        print(self.stats())
+
+
+def main():
+    # STRATEGIES comma separated,KEEPER_ACCOUNT brownie account id,MAX_GAS_PRICE in gwei
+    profileFromEnv(web3)
+    strategies = os.environ["STRATEGIES"].split(",")
+    account = Account.from_key(
+        accounts.load(os.environ.get("KEEPER_ACCOUNT", "keeper")).private_key
+    )
+    maxGasPrice = os.environ.get("MAX_GAS_PRICE")
+    keeper = Keeper(
+        web3,
+        strategies,
+        account,
+        maxGasPrice=int(float(maxGasPrice) * 1e9) if maxGasPrice else None,
+    )
+    keeper.run()
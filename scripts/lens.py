@@ -0,0 +1,82 @@
+import os
+
+from brownie import StrategyLens, accounts, network, web3
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+from scripts.rpcProfile import profileFromEnv
+
+# Field order of StrategyLens.PoolState
+POOL_STATE_FIELDS = [
+    "pool",
+    "pps",
+    "totalSupplied",
+    "borrowed",
+    "liquidity",
+    "balance",
+    "utilization",
+    "withdrawable",
+    "stuck",
+]
+POOL_STATE_TYPE = (
+    "(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,bool)"
+)
+
+
+def toColumns(states):
+    # List of PoolState tuples -> {field: [values per pool]}
+    columns = {field: [] for field in POOL_STATE_FIELDS}
+    for state in states:
+        for field, value in zip(POOL_STATE_FIELDS, state):
+            columns[field].append(value)
+    columns["pool"] = [to_checksum_address(pool) for pool in columns["pool"]]
+    return columns
+
+
+def fetchPoolStates(w3, lens, strategy, block="latest"):
+    # One eth_call for the whole pool set of a strategy
+    data = function_signature_to_4byte_selector("poolStates(address)") + encode(
+        ["address"], [strategy]
+    )
+    raw = w3.eth.call({"to": to_checksum_address(lens), "data": data}, block)
+    (states,) = decode([POOL_STATE_TYPE + "[]"], bytes(raw))
+    return toColumns(states)
+
+
+def fetchPoolStatesMany(w3, lens, strategies, block="latest"):
+    # One eth_call for many strategies,returns {strategy: columns}
+    data = function_signature_to_4byte_selector("poolStatesMany(address[])") + encode(
+        ["address[]"], [strategies]
+    )
+    raw = w3.eth.call({"to": to_checksum_address(lens), "data": data}, block)
+    (states,) = decode([POOL_STATE_TYPE + "[][]"], bytes(raw))
+    return {
+        strategy: toColumns(strategyStates)
+        for strategy, strategyStates in zip(strategies, states)
+    }
+
+
+def lensAddress():
+    # LENS if set,otherwise a throwaway lens,which is only deployed on development and fork networks
+    if os.environ.get("LENS"):
+        return os.environ["LENS"]
+    active = network.show_active()
+    assert active == "development" or active.endswith(
+        "-fork"
+    ), f"LENS must be a deployed StrategyLens on {active}"
+    return StrategyLens.deploy({"from": accounts[0]}).address
+
+
+def main():
+    # STRATEGY to inspect,LENS deployed lens (required outside development and fork networks)
+    profileFromEnv(web3)
+    strategy = os.environ["STRATEGY"]
+    lens = lensAddress()
+    columns = fetchPoolStates(web3, lens, strategy)
+    for i, pool in enumerate(columns["pool"]):
+        print(
+            f"{pool} util {columns['utilization'][i] / 1e16:.2f}% "
+            f"balance {columns['balance'][i] / 1e18} "
+            f"withdrawable {columns['withdrawable'][i] / 1e18} "
+            f"liquidity {columns['liquidity'][i] / 1e18}"
+        )
@@ -1,66 +1,132 @@
-from brownie import Contract, accounts, interface, Strategy, chain
+import os
 
+from brownie import Contract, Strategy, accounts, chain, web3
+from eth_account import Account
 
-def main():
-    oldStrat = Contract("0x1922Fde0C9f09cD1AEAe20C6021a2c18a9CBD589")
-    vault = Contract(oldStrat.vault())
-    gov = accounts.at(vault.governance(), force=True)
-    assets = oldStrat.estimatedTotalAssets()
-    poolConf = [
-        ["0x9cDED654472788a143C2285A6b2a580392510688", 1102],  # WFTM-YFI
-        ["0xDf79EA5d777F28cAb9fD42ACda6208a228c71B59", 1095],  # WFTM-LINK
-        ["0xF2D3AE45F8775bA0a729dF47210164F921Edc306", 1082],  # WFTM-LINK
-        ["0x37F6Cf24bA9E781344Ae4aC8923d9A0A3910bc64", 1076],  # WFTM-SUSHI
-        ["0x0c60dbD5b78d1488F9f71163E598d90f8EDE55E7", 1064],  # WFTM-WOOFY
-        ["0x4e4a8AE836cBE9576113706e166ae1194A7113E6", 1053],  # WFTM-MIM
-        ["0x00Fb23C7169E0378a63D9cFE50Ef40f944653c69", 1035],  # WFTM-SUSHI
-        ["0xB566727F4edF30bA13939E304d828e30d4063C59", 960],  # WFTM-MIM
-        ["0xD05f23002f6d09Cf7b643B69F171cc2A3EAcd0b3", 769],  # WFTM-BOO
-        ["0x5dd76071F7b5F4599d4F2B7c08641843B746ace9", 764],  # WFTM-TAROT
-    ]
-    newStrat = Strategy.deploy(vault, poolConf, {"from": gov})
-    for pool in poolConf:
-        pToken = interface.IERC20(pool[0])
-        oldStrat.sweep(pToken, {"from": gov})
-        # send small dust back or migrate doesnt work
-        pToken.transfer(oldStrat, 100, {"from": gov})
-        pToken.transfer(newStrat, pToken.balanceOf(gov), {"from": gov})
-    vault.migrateStrategy(oldStrat, newStrat, {"from": gov})
-    print(assets / 1e18)
-    print(newStrat.estimatedTotalAssets() / 1e18)
-    # Make sure harvest works
-    newStrat.harvest({"from": gov})
-    # Make sure rebalancing works
-    for i in range(2):
-        debugStratData(newStrat, "Before")
-        newStrat.harvest({"from": gov})
-        newStrat.rebalance(newStrat.estimatedTotalAssets() / 10, {"from": gov})
-        newStrat.harvest({"from": gov})
+from scripts.multicall import Call, Multicall
+from scripts.rpcProfile import profileFromEnv
+from scripts.txPipeline import TxPipeline, step
+
+DEFAULT_STATE = os.environ.get("MIGRATION_STATE", "migration.json")
+# bTokens sent back to the old strategy,migrate doesnt work with an empty pool
+DUST = 100
+
+
+def strategyPools(multicall, strategy):
+    # Strategy.pools read with one batch for the length and one for the entries
+    (total,) = multicall.execute([Call(strategy, "getTotalPools()", [], ["uint256"])])
+    return multicall.execute(
+        [Call(strategy, "pools(uint256)", [i], ["address"]) for i in range(total)]
+    )
 
-        debugStratData(newStrat, "After")
 
-    assets = newStrat.estimatedTotalAssets()
-    sleepAndHarvest(5, newStrat, gov)
-    sleepAndHarvest(5, newStrat, gov)
-    newassets = newStrat.estimatedTotalAssets()
-    diff = newassets - assets
-    print(diff / 1e18)
-    print(diff / 10 / 1e18)
+def planMigration(multicall, vault, oldStrategy, newStrategy, pools, sender):
+    """
+    Every tx of the migration as a list of stages. Txs within a stage don't depend
+    on each other and can all be in flight at once: sweep every pool, hand the
+    bTokens to the new strategy leaving DUST behind, migrateStrategy, harvest.
+    Balances are read up front in one batch so every amount is fixed in the plan.
+    """
+    calls = []
+    for pool in pools:
+        calls.append(Call(pool, "balanceOf(address)", [oldStrategy], ["uint256"]))
+        calls.append(Call(pool, "balanceOf(address)", [sender], ["uint256"]))
+    results = multicall.execute(calls)
+    sweeps, transfers = [], []
+    for i, pool in enumerate(pools):
+        held, own = results[2 * i : 2 * i + 2]
+        if not held or held <= DUST:
+            continue
+        sweeps.append(step(f"sweep {pool}", oldStrategy, "sweep(address)", [pool]))
+        transfers.append(
+            step(
+                f"dust {pool}", pool, "transfer(address,uint256)", [oldStrategy, DUST],
+            )
+        )
+        transfers.append(
+            step(
+                f"transfer {pool}",
+                pool,
+                "transfer(address,uint256)",
+                [newStrategy, held + (own or 0) - DUST],
+            )
+        )
+    migrate = step(
+        "migrateStrategy",
+        vault,
+        "migrateStrategy(address,address)",
+        [oldStrategy, newStrategy],
+    )
+    harvest = step("harvest", newStrategy, "harvest()", [])
+    return [stage for stage in (sweeps, transfers, [migrate], [harvest]) if stage]
 
 
-def sleepAndHarvest(times, strat, gov):
-    for i in range(times):
-        debugStratData(strat, "Before harvest" + str(i))
-        chain.sleep(17280)
-        chain.mine(1)
-        strat.harvest({"from": gov})
-        debugStratData(strat, "After harvest" + str(i))
+def simulate(stages, sender, oldStrategy, newStrategy):
+    """
+    Runs the plan on the local chain between a snapshot and a revert and returns
+    estimatedTotalAssets of the old strategy before and the new one after each
+    of migrateStrategy and the first harvest, plus gas used. Needs a fork network.
+    """
+    old, new = Strategy.at(oldStrategy), Strategy.at(newStrategy)
+    sender = accounts.at(sender, force=True)
+    report = {"before": old.estimatedTotalAssets(), "gasUsed": 0}
+    chain.snapshot()
+    try:
+        for stage in stages:
+            for tx in stage:
+                receipt = sender.transfer(tx["to"], 0, data=tx["data"], silent=True)
+                report["gasUsed"] += receipt.gas_used
+                if tx["name"] in ("migrateStrategy", "harvest"):
+                    report[tx["name"]] = new.estimatedTotalAssets()
+    finally:
+        chain.revert()
+    return report
+
+
+def main():
+    # OLD_STRATEGY to migrate from,MIGRATION_ACCOUNT brownie account id (vault governance),
+    # MIGRATION_STATE file to resume from,DRY_RUN=1 on a fork to only simulate
+    profileFromEnv(web3)
+    oldStrategy = Contract(os.environ["OLD_STRATEGY"])
+    vault = Contract(oldStrategy.vault())
+    multicall = Multicall(web3)
+    pools = strategyPools(multicall, oldStrategy.address)
 
+    if os.environ.get("DRY_RUN"):
+        gov = accounts.at(vault.governance(), force=True)
+        newStrategy = Strategy.deploy(vault, pools, {"from": gov})
+        stages = planMigration(
+            multicall,
+            vault.address,
+            oldStrategy.address,
+            newStrategy.address,
+            pools,
+            gov.address,
+        )
+        report = simulate(stages, gov.address, oldStrategy.address, newStrategy.address)
+        print(
+            f"{sum(len(s) for s in stages)} txs in {len(stages)} stages,{report['gasUsed']} gas"
+        )
+        print(f"Total assets before {report['before'] / 1e18}")
+        print(f"After migrateStrategy {report['migrateStrategy'] / 1e18}")
+        print(f"After harvest {report['harvest'] / 1e18}")
+        return
 
-# Used to debug strategy balance data
-def debugStratData(strategy, msg):
-    print(msg)
-    print("Total assets " + str(strategy.estimatedTotalAssets() / 1e18))
-    print("ftm Balance " + str(strategy.balanceOfWant() / 1e18))
-    print("Stake balance " + str(strategy.balanceOfStake() / 1e18))
-    print("Pending reward " + str(strategy.pendingInterest() / 1e18))
+    gov = accounts.load(os.environ.get("MIGRATION_ACCOUNT", "gov"))
+    migration = TxPipeline(web3, Account.from_key(gov.private_key), DEFAULT_STATE)
+    if "newStrategy" not in migration.state:
+        migration.state["newStrategy"] = Strategy.deploy(
+            vault, pools, {"from": gov}
+        ).address
+        migration.save()
+    migration.plan(
+        planMigration(
+            multicall,
+            vault.address,
+            oldStrategy.address,
+            migration.state["newStrategy"],
+            pools,
+            gov.address,
+        )
+    )
+    migration.run()
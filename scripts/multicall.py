@@ -0,0 +1,123 @@
+import json
+import os
+from collections import namedtuple
+
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+# Multicall3 is deployed at the same address on every EVM chain, including Fantom
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+TRY_AGGREGATE = "tryAggregate(bool,(address,bytes)[])"
+DEFAULT_BATCH_SIZE = 200
+
+# A single read, e.g. Call(pool, "totalSupply()", [], ["uint256"])
+Call = namedtuple("Call", ["target", "signature", "args", "returns"])
+
+
+def argTypes(signature):
+    # "getLendingPool(address)" -> ["address"]
+    inner = signature[signature.index("(") + 1 : signature.rindex(")")]
+    return [t for t in inner.split(",") if t]
+
+
+def encodeCall(call):
+    selector = function_signature_to_4byte_selector(call.signature)
+    return selector + encode(argTypes(call.signature), list(call.args))
+
+
+def decodeResult(call, success, returnData):
+    if not success or len(returnData) == 0:
+        return None
+    values = [
+        to_checksum_address(v) if t == "address" else v
+        for t, v in zip(call.returns, decode(call.returns, returnData))
+    ]
+    # Unwrap single return values so results read like brownie calls
+    return values[0] if len(values) == 1 else values
+
+
+class Multicall:
+    """
+    Packs view calls into Multicall3 tryAggregate batches.
+    Every batch executed by one instance is pinned to the same block, so
+    results from different batches are consistent with each other.
+    """
+
+    def __init__(
+        self, w3, address=MULTICALL3, batchSize=DEFAULT_BATCH_SIZE, block=None
+    ):
+        assert batchSize > 0, "batchSize must be positive"
+        self.w3 = w3
+        self.address = to_checksum_address(address)
+        self.batchSize = batchSize
+        self.block = block
+        self.requests = 0
+
+    def pinBlock(self):
+        if self.block is None:
+            self.block = self.w3.eth.block_number
+            self.requests += 1
+        return self.block
+
+    def _aggregate(self, calls):
+        data = function_signature_to_4byte_selector(TRY_AGGREGATE) + encode(
+            ["bool", "(address,bytes)[]"],
+            [False, [(to_checksum_address(c.target), encodeCall(c)) for c in calls]],
+        )
+        raw = self.w3.eth.call({"to": self.address, "data": data}, self.pinBlock())
+        self.requests += 1
+        (results,) = decode(["(bool,bytes)[]"], bytes(raw))
+        return [decodeResult(c, ok, ret) for c, (ok, ret) in zip(calls, results)]
+
+    def execute(self, calls):
+        # Returns decoded results in call order, None for reverted calls
+        results = []
+        for i in range(0, len(calls), self.batchSize):
+            results.extend(self._aggregate(calls[i : i + self.batchSize]))
+        return results
+
+
+class CachedMulticall:
+    """
+    Multicall wrapper that remembers results of reads that never change
+    (symbol, decimals, a pool's collateral...) in a JSON file. Only calls
+    missing from the cache, plus every call in `mutable`, reach the chain.
+    """
+
+    def __init__(self, multicall, path=None, mutable=()):
+        self.multicall = multicall
+        self.path = path
+        self.mutable = set(mutable)
+        self.cache = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.cache = json.load(f)
+
+    def key(self, call):
+        return f"{call.target.lower()}:{call.signature}:{json.dumps(list(call.args))}"
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.cache, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def execute(self, calls):
+        results = [None] * len(calls)
+        missing = []
+        for i, call in enumerate(calls):
+            key = self.key(call)
+            if call.signature not in self.mutable and key in self.cache:
+                results[i] = self.cache[key]
+            else:
+                missing.append(i)
+        fetched = self.multicall.execute([calls[i] for i in missing])
+        for i, result in zip(missing, fetched):
+            results[i] = result
+            # Reverts aren't cached so they get retried next time
+            if calls[i].signature not in self.mutable and result is not None:
+                self.cache[self.key(calls[i])] = result
+        if fetched:
+            self.save()
+        return results
@@ -0,0 +1,53 @@
+import os
+
+from brownie import Contract, Strategy, web3
+
+from scripts.lens import fetchPoolStates, lensAddress
+from scripts.rpcProfile import profileFromEnv
+from scripts.simulator import diffPools, swapAndPop
+
+
+def planAllocs(columns, newPools):
+    """
+    What changeAllocs(newPools) will touch, from lens columns of the current
+    pools. Kept pools aren't redeemed or re-approved. Removed pools that can't be
+    fully redeemed stay listed until a later changeAllocs. `pools` is the list
+    order afterwards, removals swap the last pool into their slot.
+    """
+    current = [pool.lower() for pool in columns["pool"]]
+    removed, added = diffPools(current, [pool.lower() for pool in newPools])
+    stuck = []
+    for pool in removed:
+        i = current.index(pool)
+        if columns["withdrawable"][i] < columns["balance"][i]:
+            stuck.append(pool)
+    pools = list(current)
+    for pool in reversed(current):
+        if pool in removed and pool not in stuck:
+            swapAndPop(pools, pool)
+    pools += added
+    return {
+        "kept": [pool for pool in current if pool not in removed],
+        "added": added,
+        "removed": removed,
+        "stuck": stuck,
+        "pools": pools,
+        "redeemed": sum(
+            columns["withdrawable"][current.index(pool)] for pool in removed
+        ),
+    }
+
+
+def main():
+    # STRATEGY to plan for,POOLS comma separated new pool list,GOV to estimate gas from
+    # (defaults to the vault governance),LENS deployed lens (required outside development and fork networks)
+    profileFromEnv(web3)
+    strategy = Strategy.at(os.environ["STRATEGY"])
+    newPools = os.environ["POOLS"].split(",")
+    lens = lensAddress()
+    plan = planAllocs(fetchPoolStates(web3, lens, strategy.address), newPools)
+    for key in ("kept", "added", "removed", "stuck"):
+        print(f"{key} {len(plan[key])}: {', '.join(plan[key])}")
+    print(f"Redeems {plan['redeemed'] / 1e18} want")
+    gov = os.environ.get("GOV") or Contract(strategy.vault()).governance()
+    print(f"Gas {strategy.changeAllocs.estimate_gas(newPools, {'from': gov})}")
@@ -0,0 +1,42 @@
+import os
+
+from brownie import Strategy, web3
+
+from scripts.lens import fetchPoolStates, lensAddress
+from scripts.rpcProfile import profileFromEnv
+from scripts.simulator import predictUtilization, waterFill
+
+
+def planDeposit(columns, amount):
+    # Split of `amount` over the pools in lens columns,with the utilization each ends up at.
+    # Stuck pools get nothing,like in _depositSplit
+    amounts = waterFill(
+        columns["totalSupplied"],
+        columns["borrowed"],
+        amount,
+        columns["pps"],
+        columns["stuck"],
+    )
+    utilization = predictUtilization(
+        columns["totalSupplied"], columns["borrowed"], amounts
+    )
+    return amounts, utilization
+
+
+def main():
+    # STRATEGY to plan for,AMOUNT in want wei (defaults to its idle want),LENS deployed lens
+    # (required outside development and fork networks)
+    profileFromEnv(web3)
+    strategy = Strategy.at(os.environ["STRATEGY"])
+    amount = int(os.environ.get("AMOUNT") or strategy.balanceOfWant())
+    lens = lensAddress()
+    columns = fetchPoolStates(web3, lens, strategy.address)
+    amounts, utilization = planDeposit(columns, amount)
+    for i, pool in enumerate(columns["pool"]):
+        print(
+            f"{pool} deposit {amounts[i] / 1e18} "
+            f"util {columns['utilization'][i] / 1e16:.2f}% -> {utilization[i] / 1e16:.2f}%"
+        )
+    # The contract works from the same snapshot,so this should match exactly
+    onChain = list(strategy.depositSplit(amount))
+    print(f"Matches strategy.depositSplit: {onChain == amounts}")
@@ -0,0 +1,167 @@
+import json
+import os
+
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+
+from scripts.multicall import Call
+
+DEFAULT_PATH = os.environ.get("POOL_INDEX", "poolIndex.json")
+# Block range per eth_getLogs request when following factory events
+LOG_CHUNK = 2000
+LENDING_POOL_INITIALIZED = (
+    "0x"
+    + keccak(
+        text="LendingPoolInitialized(address,address,address,address,address,address,uint256)"
+    ).hex()
+)
+LENDING_POOL_INFO = ["bool", "uint24", "address", "address", "address"]
+
+
+def fetchPairs(multicall, factory, start, end):
+    # Metadata for factory pools [start, end),one multicall round per hop
+    pairs = multicall.execute(
+        [
+            Call(factory, "allLendingPools(uint256)", [i], ["address"])
+            for i in range(start, end)
+        ]
+    )
+    tokens = multicall.execute(
+        [
+            Call(pair, sig, [], ["address"])
+            for pair in pairs
+            for sig in ("token0()", "token1()")
+        ]
+    )
+    infos = multicall.execute(
+        [
+            Call(factory, "getLendingPool(address)", [pair], LENDING_POOL_INFO)
+            for pair in pairs
+        ]
+    )
+    records = []
+    for i, (pair, info) in enumerate(zip(pairs, infos)):
+        token0, token1 = tokens[2 * i], tokens[2 * i + 1]
+        if pair is None or info is None or token0 is None or token1 is None:
+            continue
+        records.append(
+            {
+                "index": start + i,
+                "pair": pair,
+                "token0": token0,
+                "token1": token1,
+                "collateral": info[2],
+                "borrowable0": info[3],
+                "borrowable1": info[4],
+            }
+        )
+    return records
+
+
+def topicAddress(topic):
+    return to_checksum_address(bytes(topic)[-20:])
+
+
+def decodeInitialized(log):
+    # LendingPoolInitialized(pair indexed, token0 indexed, token1 indexed, collateral, borrowable0, borrowable1, id)
+    collateral, borrowable0, borrowable1, lendingPoolId = decode(
+        ["address", "address", "address", "uint256"], bytes(log["data"])
+    )
+    # The factory numbers pools from 1 (it stores the length after the push),
+    # records are keyed by the 0-based allLendingPools index like fetchPairs
+    return {
+        "index": lendingPoolId - 1,
+        "pair": topicAddress(log["topics"][1]),
+        "token0": topicAddress(log["topics"][2]),
+        "token1": topicAddress(log["topics"][3]),
+        "collateral": to_checksum_address(collateral),
+        "borrowable0": to_checksum_address(borrowable0),
+        "borrowable1": to_checksum_address(borrowable1),
+    }
+
+
+class PoolIndex:
+    """
+    Local store of the pools a Tarot factory has created.
+    `watermark` is the number of factory indexes already processed, so an
+    update only fetches pools created since the last run. `block` is the last
+    block the index is synced to, follow() continues from there.
+    """
+
+    def __init__(self, factory, path=DEFAULT_PATH):
+        self.factory = to_checksum_address(factory)
+        self.path = path
+        self.watermark = 0
+        self.block = None
+        self.pools = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            assert data["factory"] == self.factory, f"{path} indexes another factory"
+            self.watermark = data["watermark"]
+            self.block = data["block"]
+            self.pools = {record["index"]: record for record in data["pools"]}
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "factory": self.factory,
+            "watermark": self.watermark,
+            "block": self.block,
+            "pools": [self.pools[i] for i in sorted(self.pools)],
+        }
+        # Write then rename so an interrupted run never leaves a broken index
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def add(self, records):
+        for record in records:
+            self.pools[record["index"]] = record
+            self.watermark = max(self.watermark, record["index"] + 1)
+
+    def update(self, multicall):
+        # One call when nothing is new,three more batches for any number of new pools
+        (length,) = multicall.execute(
+            [Call(self.factory, "allLendingPoolsLength()", [], ["uint256"])]
+        )
+        if length > self.watermark:
+            self.add(fetchPairs(multicall, self.factory, self.watermark, length))
+            self.watermark = length
+        self.block = multicall.pinBlock()
+        self.save()
+        return self
+
+    def follow(self, w3, toBlock=None, fromBlock=None, chunk=LOG_CHUNK):
+        # Picks up new pools from factory events,saving after every chunk so it can resume
+        if toBlock is None:
+            toBlock = w3.eth.block_number
+        if fromBlock is None:
+            fromBlock = 0 if self.block is None else self.block + 1
+        for start in range(fromBlock, toBlock + 1, chunk):
+            end = min(start + chunk - 1, toBlock)
+            logs = w3.eth.get_logs(
+                {
+                    "address": self.factory,
+                    "fromBlock": start,
+                    "toBlock": end,
+                    "topics": [LENDING_POOL_INITIALIZED],
+                }
+            )
+            self.add([decodeInitialized(log) for log in logs])
+            self.block = end
+            self.save()
+        return self
+
+    def lendingPools(self, token):
+        # Borrowables that lend `token`,in factory order
+        token = token.lower()
+        pools = []
+        for i in sorted(self.pools):
+            record = self.pools[i]
+            if record["token0"].lower() == token:
+                pools.append(record["borrowable0"])
+            elif record["token1"].lower() == token:
+                pools.append(record["borrowable1"])
+        return pools
@@ -0,0 +1,178 @@
+import json
+import os
+
+from brownie import web3
+from eth_utils import keccak, to_checksum_address
+
+from scripts.rpcProfile import profileFromEnv
+
+DEFAULT_PATH = os.environ.get("POSITION_INDEX", "positionIndex.json")
+# Block range of the first eth_getLogs request,later ones adapt to how many logs come back
+LOG_CHUNK = 2000
+MAX_CHUNK = 100_000
+# Logs per request the chunk size aims for
+TARGET_LOGS = 1000
+EVENTS = {
+    "0x" + keccak(text=signature).hex(): signature.split("(")[0]
+    for signature in (
+        "PoolDeposit(address,uint256,uint256)",
+        "PoolWithdraw(address,uint256,uint256)",
+        "PoolAdded(address)",
+        "PoolRemoved(address)",
+        "PoolStuck(address)",
+    )
+}
+
+
+def topicHex(topic):
+    return "0x" + bytes(topic).hex()
+
+
+def decodeLogs(logs):
+    """
+    Strategy pool events of one eth_getLogs response as
+    (name, pool, amount, bTokens) in log order. Amount events are two words of
+    data, so they are sliced out directly instead of going through the ABI
+    decoder one log at a time.
+    """
+    events = []
+    for log in logs:
+        name = EVENTS.get(topicHex(log["topics"][0]))
+        if name is None:
+            continue
+        pool = to_checksum_address(bytes(log["topics"][1])[-20:])
+        data = bytes(log["data"])
+        amount = int.from_bytes(data[:32], "big") if data else 0
+        bTokens = int.from_bytes(data[32:64], "big") if data else 0
+        events.append((name, pool, amount, bTokens))
+    return events
+
+
+def emptyPosition():
+    return {
+        "listed": False,
+        "stuck": False,
+        "bTokens": 0,
+        "deposited": 0,
+        "withdrawn": 0,
+        "deposits": 0,
+        "withdrawals": 0,
+    }
+
+
+class PositionIndex:
+    """
+    Per-pool position history of one strategy rebuilt from its pool events.
+    `block` is the last block applied, follow() continues from there and saves
+    after every chunk so an interrupted run resumes. `chunk` is the block range
+    the last request settled on. bTokens moved without an event (sweep,
+    migration) are not seen.
+    """
+
+    def __init__(self, strategy, path=DEFAULT_PATH):
+        self.strategy = to_checksum_address(strategy)
+        self.path = path
+        self.block = None
+        self.chunk = LOG_CHUNK
+        self.positions = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            assert data["strategy"] == self.strategy, f"{path} indexes another strategy"
+            self.block = data["block"]
+            self.chunk = data["chunk"]
+            self.positions = data["positions"]
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "strategy": self.strategy,
+            "block": self.block,
+            "chunk": self.chunk,
+            "positions": self.positions,
+        }
+        # Write then rename so an interrupted run never leaves a broken index
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+    def apply(self, events):
+        for name, pool, amount, bTokens in events:
+            position = self.positions.setdefault(pool, emptyPosition())
+            if name == "PoolDeposit":
+                position["bTokens"] += bTokens
+                position["deposited"] += amount
+                position["deposits"] += 1
+            elif name == "PoolWithdraw":
+                position["bTokens"] -= bTokens
+                position["withdrawn"] += amount
+                position["withdrawals"] += 1
+            elif name == "PoolAdded":
+                position["listed"], position["stuck"] = True, False
+            elif name == "PoolRemoved":
+                position["listed"], position["stuck"] = False, False
+            elif name == "PoolStuck":
+                position["stuck"] = True
+
+    def _getLogs(self, w3, start, end):
+        return w3.eth.get_logs(
+            {
+                "address": self.strategy,
+                "fromBlock": start,
+                "toBlock": end,
+                "topics": [list(EVENTS)],
+            }
+        )
+
+    def follow(self, w3, toBlock=None, fromBlock=None):
+        """
+        Applies pool events up to `toBlock`. The range of each request doubles
+        while responses stay small and halves when they get large or the node
+        refuses the range, so sparse history goes by in a few requests without
+        busy stretches hitting the node's result limit.
+        """
+        if toBlock is None:
+            toBlock = w3.eth.block_number
+        if fromBlock is None:
+            fromBlock = 0 if self.block is None else self.block + 1
+        start = fromBlock
+        while start <= toBlock:
+            end = min(start + self.chunk - 1, toBlock)
+            try:
+                logs = self._getLogs(w3, start, end)
+            except Exception:
+                # Too many results or too wide a range,retry a narrower one
+                if self.chunk == 1:
+                    raise
+                self.chunk = max(self.chunk // 2, 1)
+                continue
+            self.apply(decodeLogs(logs))
+            self.block = end
+            if len(logs) > TARGET_LOGS:
+                self.chunk = max(self.chunk // 2, 1)
+            elif len(logs) < TARGET_LOGS // 4:
+                self.chunk = min(self.chunk * 2, MAX_CHUNK)
+            self.save()
+            start = end + 1
+        return self
+
+
+def main():
+    # STRATEGY to index,START_BLOCK to begin a new index from (its deployment block),
+    # POSITION_INDEX file the index is kept in
+    profileFromEnv(web3)
+    index = PositionIndex(os.environ["STRATEGY"])
+    fromBlock = (
+        None if index.block is not None else int(os.environ.get("START_BLOCK", 0))
+    )
+    index.follow(web3, fromBlock=fromBlock)
+    print(f"Synced to block {index.block}")
+    for pool, position in index.positions.items():
+        state = "listed" if position["listed"] else "removed"
+        if position["stuck"]:
+            state = "stuck"
+        print(
+            f"{pool} {state} {position['bTokens'] / 1e18} bTokens,"
+            f"in {position['deposited'] / 1e18} out {position['withdrawn'] / 1e18}"
+        )
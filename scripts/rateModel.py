@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+from brownie import web3
+
+from scripts.allocator import BASIS_PRECISION, largestRemainder
+from scripts.getAllFTMLendingPools import updateIndex, wftm
+from scripts.multicall import Call, Multicall
+from scripts.rpcProfile import profileFromEnv
+
+# Mirrors BorrowableInterestRateModel in Tarot/Impermax borrowables,rates are per second
+KINK_MULTIPLIER = 5
+KINK_BORROW_RATE_MAX = 792.744799594e-9  # 2500% per year
+KINK_BORROW_RATE_MIN = 0.31709792e-9  # 1% per year
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+RATE_PARAMS = [
+    ("totalBorrows", "totalBorrows()"),
+    ("totalBalance", "totalBalance()"),
+    ("borrowRate", "borrowRate()"),
+    ("kinkBorrowRate", "kinkBorrowRate()"),
+    ("kinkUtilizationRate", "kinkUtilizationRate()"),
+    ("reserveFactor", "reserveFactor()"),
+    ("adjustSpeed", "adjustSpeed()"),
+    ("rateUpdateTimestamp", "rateUpdateTimestamp()"),
+]
+
+
+def adjustKink(borrowRate, kinkBorrowRate, adjustSpeed, elapsed):
+    # kinkBorrowRate drifts toward the current borrowRate by adjustSpeed per second
+    borrowRate, kinkBorrowRate = np.broadcast_arrays(
+        np.asarray(borrowRate, dtype=np.float64),
+        np.asarray(kinkBorrowRate, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift = (borrowRate - kinkBorrowRate) / kinkBorrowRate * adjustSpeed * elapsed
+    factor = np.where(drift < 0, np.maximum(1 + drift, 0), 1 + drift)
+    return np.clip(kinkBorrowRate * factor, KINK_BORROW_RATE_MIN, KINK_BORROW_RATE_MAX)
+
+
+def borrowRateAt(utilization, kinkUtilization, kinkBorrowRate):
+    # Linear up to the kink,then KINK_MULTIPLIER times steeper up to 100%
+    utilization = np.asarray(utilization, dtype=np.float64)
+    kinkUtilization = np.asarray(kinkUtilization, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        below = kinkBorrowRate * utilization / kinkUtilization
+        over = (utilization - kinkUtilization) / (1 - kinkUtilization)
+    above = ((KINK_MULTIPLIER - 1) * over + 1) * kinkBorrowRate
+    return np.where(utilization <= kinkUtilization, below, above)
+
+
+def supplyRateAt(utilization, borrowRate, reserveFactor):
+    return borrowRate * utilization * (1 - np.asarray(reserveFactor, dtype=np.float64))
+
+
+def projectApr(borrowed, supplied, params, deposits):
+    """
+    Supply APR of each pool after depositing each candidate amount.
+    `borrowed`/`supplied` are (pools,) in want, `params` holds (pools,) arrays of
+    kinkUtilization, kinkBorrowRate and reserveFactor as fractions and per second
+    rates, `deposits` is (sizes,). Returns (pools, sizes).
+    """
+    borrowed = np.asarray(borrowed, dtype=np.float64)[:, None]
+    supplied = np.asarray(supplied, dtype=np.float64)[:, None]
+    deposits = np.asarray(deposits, dtype=np.float64)[None, :]
+    total = supplied + deposits
+    with np.errstate(divide="ignore", invalid="ignore"):
+        utilization = np.where(total > 0, borrowed / total, 0.0)
+    kinkUtilization = np.asarray(params["kinkUtilization"])[:, None]
+    kinkBorrowRate = np.asarray(params["kinkBorrowRate"])[:, None]
+    reserveFactor = np.asarray(params["reserveFactor"])[:, None]
+    borrowRate = borrowRateAt(utilization, kinkUtilization, kinkBorrowRate)
+    return supplyRateAt(utilization, borrowRate, reserveFactor) * SECONDS_PER_YEAR
+
+
+def rankPlacements(borrowed, supplied, params, deposits):
+    # Pool indexes ordered by post-deposit APR for each deposit size,shape (sizes, pools)
+    apr = projectApr(borrowed, supplied, params, deposits)
+    return np.argsort(-apr.T, axis=-1, kind="stable")
+
+
+def splitByYield(borrowed, supplied, params, amount, steps=100):
+    """
+    Greedy split of `amount` into `steps` chunks, each going to the pool where it
+    adds the most to our yearly interest. Returns (amounts, basis points).
+    """
+    borrowed = np.asarray(borrowed, dtype=np.float64)
+    supplied = np.asarray(supplied, dtype=np.float64).copy()
+    amounts = np.zeros_like(supplied)
+    chunk = amount / steps
+    for _ in range(steps):
+        # What the chunk adds to our interest,after the rate drop it causes on what we already lent
+        apr = projectApr(borrowed, supplied, params, [0, chunk])
+        gain = apr[:, 1] * (amounts + chunk) - apr[:, 0] * amounts
+        best = np.argmax(gain)
+        amounts[best] += chunk
+        supplied[best] += chunk
+    return amounts, largestRemainder(amounts / amount * BASIS_PRECISION)
+
+
+def fetchRateParams(multicall, pools, now=None):
+    """
+    Reads the rate model state of every pool in one batch. Amounts come back in
+    want and rates as fractions per second. With `now`, kinkBorrowRate is moved
+    forward to that timestamp like the next accrual would.
+    """
+    calls = [
+        Call(pool, sig, [], ["uint256"]) for pool in pools for _, sig in RATE_PARAMS
+    ]
+    results = multicall.execute(calls)
+    raw = {
+        name: np.array(
+            [results[i * len(RATE_PARAMS) + j] or 0 for i in range(len(pools))],
+            dtype=np.float64,
+        )
+        for j, (name, _) in enumerate(RATE_PARAMS)
+    }
+    # Everything but the timestamp is scaled by 1e18
+    scaled = {name: raw[name] / 1e18 for name in raw if name != "rateUpdateTimestamp"}
+    kinkBorrowRate = scaled["kinkBorrowRate"]
+    if now is not None:
+        kinkBorrowRate = adjustKink(
+            scaled["borrowRate"],
+            kinkBorrowRate,
+            scaled["adjustSpeed"],
+            now - raw["rateUpdateTimestamp"],
+        )
+    return (
+        scaled["totalBorrows"],
+        scaled["totalBalance"] + scaled["totalBorrows"],
+        {
+            "kinkUtilization": scaled["kinkUtilizationRate"],
+            "kinkBorrowRate": kinkBorrowRate,
+            "reserveFactor": scaled["reserveFactor"],
+        },
+    )
+
+
+def main():
+    # AMOUNT in want to place,prints projected APRs and the yield maximizing split
+    profileFromEnv(web3)
+    amount = float(os.environ.get("AMOUNT", 100_000))
+    pools = updateIndex(web3).lendingPools(wftm)
+    multicall = Multicall(web3)
+    now = web3.eth.get_block(multicall.pinBlock())["timestamp"]
+    borrowed, supplied, params = fetchRateParams(multicall, pools, now)
+    sizes = [0, amount / 10, amount]
+    apr = projectApr(borrowed, supplied, params, sizes)
+    amounts, bps = splitByYield(borrowed, supplied, params, amount)
+    for i in np.argsort(-apr[:, 0]):
+        print(
+            f"{pools[i]} APR {' / '.join(f'{a * 100:.2f}%' for a in apr[i])} "
+            f"at +{' / +'.join(str(s) for s in sizes)} split {bps[i]}bp"
+        )
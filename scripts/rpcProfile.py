@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from eth_abi import decode
+from eth_utils import function_signature_to_4byte_selector
+from web3.middleware import Web3Middleware
+
+from scripts.multicall import MULTICALL3, TRY_AGGREGATE
+
+# Upper bounds in ms of the latency histogram buckets,the last one is open
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+TRY_AGGREGATE_SELECTOR = function_signature_to_4byte_selector(TRY_AGGREGATE)
+# Duplicate eth_calls listed in the report,most repeated first
+TOP_DUPLICATES = 20
+# Read by the scripts,reported by name instead of selector
+SIGNATURES = [
+    TRY_AGGREGATE,
+    "allLendingPools(uint256)",
+    "allLendingPoolsLength()",
+    "balanceOf(address)",
+    "balanceOfWant()",
+    "collateral()",
+    "creditAvailable(address)",
+    "debtOutstanding(address)",
+    "decimals()",
+    "estimatedTotalAssets()",
+    "ethToWant(uint256)",
+    "exchangeRateLast()",
+    "getCurrentBlockTimestamp()",
+    "getLendingPool(address)",
+    "getReserves()",
+    "getTotalPools()",
+    "pools(uint256)",
+    "strategies(address)",
+    "symbol()",
+    "token0()",
+    "token1()",
+    "totalSupply()",
+    "underlying()",
+]
+
+
+def size(payload):
+    # Request/response size as it would go over the wire
+    return len(json.dumps(payload, default=str))
+
+
+class RpcProfile:
+    """
+    Counts JSON-RPC requests by method and eth_calls by contract and selector,
+    with latency histograms and bytes in each direction. Calls inside a
+    Multicall3 tryAggregate are counted against the contract they target.
+    Identical eth_calls for the same block are tracked as duplicates.
+    """
+
+    def __init__(self, signatures=SIGNATURES):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.methods = Counter()
+        self.latency = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.totalMs = Counter()
+        self.maxMs = Counter()
+        self.bytesSent = Counter()
+        self.bytesReceived = Counter()
+        self.contracts = Counter()
+        self.aggregated = Counter()
+        self.calls = Counter()
+        # Last block number the node told us about,stands in for "latest"
+        self.latestBlock = None
+        self.names = {
+            "0x" + function_signature_to_4byte_selector(s).hex(): s for s in signatures
+        }
+
+    def name(self, selector):
+        return self.names.get(selector, selector)
+
+    def _block(self, tag):
+        if tag in (None, "latest", "pending") and self.latestBlock is not None:
+            return self.latestBlock
+        return int(tag, 16) if isinstance(tag, str) and tag.startswith("0x") else tag
+
+    def _call(self, params):
+        tx = params[0]
+        to = tx.get("to", "").lower()
+        data = tx.get("data", tx.get("input", "0x"))
+        selector = data[:10]
+        self.contracts[(to, self.name(selector))] += 1
+        block = self._block(params[1] if len(params) > 1 else "latest")
+        self.calls[(block, to, data)] += 1
+        if (
+            to == MULTICALL3.lower()
+            and bytes.fromhex(data[2:10]) == TRY_AGGREGATE_SELECTOR
+        ):
+            _, inner = decode(["bool", "(address,bytes)[]"], bytes.fromhex(data[10:]))
+            for target, callData in inner:
+                self.aggregated[
+                    (target.lower(), self.name("0x" + callData[:4].hex()))
+                ] += 1
+
+    def record(self, method, params, response, elapsed):
+        ms = elapsed * 1000
+        with self.lock:
+            self.methods[method] += 1
+            bucket = next(
+                (i for i, bound in enumerate(LATENCY_BUCKETS) if ms <= bound),
+                len(LATENCY_BUCKETS),
+            )
+            self.latency[method][bucket] += 1
+            self.totalMs[method] += ms
+            self.maxMs[method] = max(self.maxMs[method], ms)
+            self.bytesSent[method] += size(params)
+            self.bytesReceived[method] += size(response)
+            if method == "eth_blockNumber" and "result" in response:
+                self.latestBlock = int(response["result"], 16)
+            elif method == "eth_call":
+                self._call(params)
+
+    def report(self):
+        with self.lock:
+            duplicates = [
+                {"block": block, "to": to, "selector": self.name(data[:10]), "count": n}
+                for (block, to, data), n in self.calls.most_common(TOP_DUPLICATES)
+                if n > 1
+            ]
+            return {
+                "seconds": time.time() - self.started,
+                "requests": sum(self.methods.values()),
+                "methods": {
+                    method: {
+                        "count": count,
+                        "totalMs": self.totalMs[method],
+                        "maxMs": self.maxMs[method],
+                        "bytesSent": self.bytesSent[method],
+                        "bytesReceived": self.bytesReceived[method],
+                        "latencyMs": dict(
+                            zip(
+                                [f"<={b}" for b in LATENCY_BUCKETS]
+                                + [f">{LATENCY_BUCKETS[-1]}"],
+                                self.latency[method],
+                            )
+                        ),
+                    }
+                    for method, count in self.methods.most_common()
+                },
+                "contracts": [
+                    {"to": to, "selector": selector, "count": n}
+                    for (to, selector), n in self.contracts.most_common()
+                ],
+                "aggregated": [
+                    {"to": to, "selector": selector, "count": n}
+                    for (to, selector), n in self.aggregated.most_common()
+                ],
+                "duplicateCalls": duplicates,
+            }
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class ProfileMiddleware(Web3Middleware):
+    # Times every request on its way to the provider and hands it to an RpcProfile
+    profile = None
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            start = time.perf_counter()
+            response = make_request(method, params)
+            self.profile.record(method, params, response, time.perf_counter() - start)
+            return response
+
+        return middleware
+
+    def wrap_make_batch_request(self, make_batch_request):
+        def middleware(requests):
+            start = time.perf_counter()
+            responses = make_batch_request(requests)
+            # A batch's latency is split evenly over its requests
+            elapsed = (time.perf_counter() - start) / max(len(requests), 1)
+            if isinstance(responses, list):
+                for (method, params), response in zip(requests, responses):
+                    self.profile.record(method, params, response, elapsed)
+            return responses
+
+        return middleware
+
+
+def enableProfile(w3, path=None, signatures=SIGNATURES):
+    """
+    Profiles every request `w3` makes from here on. With `path` the report is
+    written there when the interpreter exits. Returns the RpcProfile.
+    """
+    profile = RpcProfile(signatures)
+    middleware = type("ProfileMiddleware", (ProfileMiddleware,), {"profile": profile})
+    w3.middleware_onion.add(middleware, "rpcProfile")
+    if path is not None:
+        atexit.register(profile.write, path)
+    return profile
+
+
+def profileFromEnv(w3, signatures=SIGNATURES):
+    # RPC_PROFILE=<report.json> turns profiling on for any script
+    path = os.environ.get("RPC_PROFILE")
+    if path:
+        return enableProfile(w3, path, signatures)
@@ -0,0 +1,443 @@
+import copy
+
+# Mirrors the constants in contracts/Strategy.sol
+TAROT_MIN_TARGET_UTIL = 7 * 10 ** 17  # 70%
+TAROT_MAX_TARGET_UTIL = 8 * 10 ** 17  # 80%
+UTIL_PRECISION = 10 ** 18
+BASIS_PRECISION = 10000
+ONE = 10 ** 18
+MAX_UINT = 2 ** 256 - 1
+
+
+class Revert(Exception):
+    # Raised wherever the contract would revert (SafeMath, INSUFFICIENT_CASH..)
+    pass
+
+
+def sub(a, b):
+    # SafeMath sub
+    if b > a:
+        raise Revert("SafeMath: subtraction overflow")
+    return a - b
+
+
+def div(a, b):
+    # SafeMath div
+    if b == 0:
+        raise Revert("SafeMath: division by zero")
+    return a // b
+
+
+def waterFill(totalSupplied, borrowed, amount, pps=None, stuck=None):
+    """
+    Mirrors Strategy._depositSplit: the most utilized pools are topped up to one
+    common utilization level, pools already at or below it get nothing and
+    `stuck` ones are left out. Amounts are in want and come back in the order
+    of the inputs.
+    """
+    pps = pps or [ONE] * len(totalSupplied)
+    stuck = stuck or [False] * len(totalSupplied)
+    utils = [div(b * UTIL_PRECISION, s) for s, b in zip(totalSupplied, borrowed)]
+    # Stable sort,same order as the contract's insertion sort
+    order = sorted(
+        (i for i in range(len(utils)) if not stuck[i]),
+        key=lambda i: UTIL_PRECISION - utils[i],
+    )
+
+    sumSupplied, sumBorrowed, level, active = amount, 0, 0, 0
+    while active < len(order):
+        sumSupplied += totalSupplied[order[active]]
+        sumBorrowed += borrowed[order[active]]
+        level = sumBorrowed * UTIL_PRECISION // sumSupplied
+        active += 1
+        if active == len(order) or level >= utils[order[active]]:
+            break
+
+    amounts = [0] * len(utils)
+    remaining = amount
+    for i in order[:active] if level > 0 else []:
+        target = borrowed[i] * UTIL_PRECISION // level
+        if target <= totalSupplied[i]:
+            continue
+        chunk = min(target - totalSupplied[i], remaining)
+        # Too small to mint a single bToken
+        if chunk * ONE // pps[i] == 0:
+            continue
+        amounts[i] = chunk
+        remaining -= chunk
+    if order:
+        amounts[order[0]] += remaining
+    return amounts
+
+
+def predictUtilization(totalSupplied, borrowed, amounts):
+    # Per pool utilization once `amounts` are deposited
+    return [
+        div(b * UTIL_PRECISION, s + a)
+        for s, b, a in zip(totalSupplied, borrowed, amounts)
+    ]
+
+
+def diffPools(oldPools, newPools):
+    # (removed, added) in list order,like Strategy.changeAllocs walks them
+    return (
+        [pool for pool in oldPools if pool not in newPools],
+        [pool for pool in dict.fromkeys(newPools) if pool not in oldPools],
+    )
+
+
+def swapAndPop(pools, pool):
+    # Strategy._removePool,the last pool takes the removed one's slot
+    i = pools.index(pool)
+    pools[i] = pools[-1]
+    pools.pop()
+
+
+class LendingPool:
+    """
+    In-memory Tarot borrowable. `cash` is the want held by the pool, `borrowed`
+    is what borrowers owe and `balance` is the strategy's bToken balance, which
+    is included in `totalSupply`. Reserves are not modelled, so the exchange
+    rate is simply (cash + borrowed) / totalSupply.
+    """
+
+    def __init__(self, address, totalSupply, cash, borrowed, balance=0):
+        self.address = address
+        self.totalSupply = totalSupply
+        self.cash = cash
+        self.borrowed = borrowed
+        self.balance = balance
+        self.exchangeRateLast = ONE
+        self.exchangeRate()
+
+    def exchangeRate(self):
+        if self.totalSupply > 0:
+            self.exchangeRateLast = (
+                (self.cash + self.borrowed) * ONE // self.totalSupply
+            )
+        return self.exchangeRateLast
+
+    def accrue(self, interest):
+        # Borrowers owe more,the rate only updates on the next exchangeRate()
+        self.borrowed += interest
+
+    def mint(self, amount):
+        mintTokens = div(amount * ONE, self.exchangeRate())
+        self.cash += amount
+        self.totalSupply += mintTokens
+        self.balance += mintTokens
+        return mintTokens
+
+    def redeem(self, redeemTokens):
+        redeemAmount = redeemTokens * self.exchangeRate() // ONE
+        if redeemAmount > self.cash:
+            raise Revert("Tarot: INSUFFICIENT_CASH")
+        self.balance = sub(self.balance, redeemTokens)
+        self.totalSupply -= redeemTokens
+        self.cash -= redeemAmount
+        return redeemAmount
+
+
+class StrategySim:
+    """
+    Integer-exact model of Strategy.sol routing and accounting. Method names
+    follow the contract so traces can be compared call for call.
+    """
+
+    def __init__(
+        self,
+        pools,
+        want=0,
+        totalDebt=0,
+        splitDeposits=False,
+        bufferRatio=0,
+        minCredit=0,
+        bufferTolerance=0,
+    ):
+        self.pools = list(pools)
+        self.want = want
+        self.totalDebt = totalDebt
+        self.splitDeposits = splitDeposits
+        self.bufferRatio = bufferRatio
+        self.minCredit = minCredit
+        self.bufferTolerance = bufferTolerance
+        # Pools changeAllocs dropped but couldn't empty
+        self.stuck = set()
+
+    def fork(self):
+        # Independent copy for what-if runs
+        return copy.deepcopy(self)
+
+    def wantTobToken(self, pool, requiredWant):
+        if requiredWant == 0:
+            return requiredWant
+        return div(requiredWant * ONE, pool.exchangeRateLast)
+
+    def bTokenToWant(self, pool, bBal):
+        if bBal == 0:
+            return bBal
+        return bBal * pool.exchangeRateLast // ONE
+
+    def balanceInPool(self, pool):
+        return self.bTokenToWant(pool, pool.balance)
+
+    def getTotalSuppliedInPool(self, pool):
+        return self.bTokenToWant(pool, pool.totalSupply)
+
+    def getBorrowedInPair(self, pool):
+        return sub(self.getTotalSuppliedInPool(pool), pool.cash)
+
+    def balanceOfStake(self):
+        return sum(self.balanceInPool(pool) for pool in self.pools)
+
+    def estimatedTotalAssets(self):
+        return self.want + self.balanceOfStake()
+
+    def bufferTarget(self):
+        return self.estimatedTotalAssets() * self.bufferRatio // BASIS_PRECISION
+
+    def bufferBand(self, target):
+        return target * self.bufferTolerance // BASIS_PRECISION
+
+    def tendTrigger(self):
+        target = self.bufferTarget()
+        band = self.bufferBand(target)
+        return (
+            self.want > target + max(band, self.minCredit) or target > self.want + band
+        )
+
+    def pendingInterest(self):
+        lendBal = self.estimatedTotalAssets()
+        return lendBal - self.totalDebt if self.totalDebt < lendBal else 0
+
+    def lendPairUtilization(self, pool, assetsToDeposit=0):
+        totalAssets = self.getTotalSuppliedInPool(pool)
+        totalBorrowAmount = self.getBorrowedInPair(pool)
+        return div(totalBorrowAmount * UTIL_PRECISION, totalAssets)
+
+    def highestInterestPair(self, assetsToDeposit):
+        highestUtilization = 0
+        highestPair = None
+        for pool in self.pools:
+            if pool in self.stuck:
+                continue
+            utilization = self.lendPairUtilization(pool, assetsToDeposit)
+            if (
+                utilization > highestUtilization
+                and (
+                    utilization > TAROT_MAX_TARGET_UTIL
+                    or highestUtilization < TAROT_MIN_TARGET_UTIL
+                )
+            ) or (
+                TAROT_MIN_TARGET_UTIL < utilization < TAROT_MAX_TARGET_UTIL
+                and TAROT_MIN_TARGET_UTIL < highestUtilization < TAROT_MAX_TARGET_UTIL
+            ):
+                highestUtilization = utilization
+                highestPair = pool
+        return highestPair
+
+    def lowestInterestPair(self, minLiquidShares):
+        # The contract never lowers lowestUtilization after a match, so this
+        # ends up picking the last pool that passes the liquidity checks
+        lowestUtilization = UTIL_PRECISION
+        lowestPair = None
+        for pool in self.pools:
+            utilization = self.lendPairUtilization(pool, 0)
+            if (
+                (
+                    utilization < lowestUtilization
+                    and (
+                        lowestUtilization > TAROT_MAX_TARGET_UTIL
+                        or utilization < TAROT_MIN_TARGET_UTIL
+                    )
+                )
+                or (
+                    TAROT_MIN_TARGET_UTIL < utilization < TAROT_MAX_TARGET_UTIL
+                    and TAROT_MIN_TARGET_UTIL
+                    < lowestUtilization
+                    < TAROT_MAX_TARGET_UTIL
+                )
+            ) and (pool.cash >= minLiquidShares and self.balanceInPool(pool) > 0):
+                lowestPair = pool
+        return lowestPair
+
+    def depositToPool(self, pool, amount):
+        if amount > 0:
+            if pool is None:
+                raise Revert("deposit to address(0)")
+            self.want = sub(self.want, amount)
+            pool.mint(amount)
+
+    def updateExchangeRates(self):
+        for pool in self.pools:
+            pool.exchangeRate()
+
+    def adjustToLiq(self, pool):
+        return min(pool.balance, self.wantTobToken(pool, pool.cash))
+
+    def _redeem(self, pool, pAmount):
+        returned = pool.redeem(pAmount)
+        self.want += returned
+        return returned
+
+    def withdrawFrom(self, pool):
+        pAmount = self.adjustToLiq(pool)
+        if pAmount > 0:
+            return self._redeem(pool, pAmount)
+        return 0
+
+    def withdrawable(self, pool):
+        return min(self.balanceInPool(pool), pool.cash)
+
+    def withdrawFromPool(self, pool, amount):
+        amount = min(amount, self.withdrawable(pool))
+        if amount == 0:
+            return 0
+        pps = pool.exchangeRateLast
+        # Round up so one redeem covers bToken rounding,unless that exceeds cash
+        pAmount = div(amount * ONE + sub(pps, 1), pps)
+        if self.bTokenToWant(pool, pAmount) > pool.cash:
+            pAmount = self.wantTobToken(pool, pool.cash)
+        pAmount = min(pAmount, pool.balance)
+        if pAmount > 0:
+            return self._redeem(pool, pAmount)
+        return 0
+
+    def withdrawKey(self, pool, amount):
+        available = self.withdrawable(pool)
+        if available == 0:
+            return MAX_UINT
+        if available >= amount:
+            return self.lendPairUtilization(pool)
+        return MAX_UINT - available
+
+    def withdrawOrder(self, amount):
+        # Stable sort,same order as the contract's insertion sort
+        keys = [self.withdrawKey(pool, amount) for pool in self.pools]
+        return sorted(range(len(self.pools)), key=lambda i: keys[i])
+
+    def withdrawOptimal(self, amount):
+        if amount == 0:
+            return
+        remaining = amount
+        for i in self.withdrawOrder(amount):
+            if remaining == 0:
+                break
+            returned = self.withdrawFromPool(self.pools[i], remaining)
+            remaining = remaining - returned if returned < remaining else 0
+
+    def depositSplit(self, amount):
+        return waterFill(
+            [self.getTotalSuppliedInPool(pool) for pool in self.pools],
+            [self.getBorrowedInPair(pool) for pool in self.pools],
+            amount,
+            [pool.exchangeRateLast for pool in self.pools],
+            [pool in self.stuck for pool in self.pools],
+        )
+
+    def deposit(self, amount):
+        if self.splitDeposits:
+            for pool, poolAmount in zip(self.pools, self.depositSplit(amount)):
+                self.depositToPool(pool, poolAmount)
+            return
+        highestPair = self.highestInterestPair(amount)
+        if highestPair is not None:
+            self.depositToPool(highestPair, amount)
+
+    def withdrawAll(self):
+        for pool in self.pools:
+            self.withdrawFrom(pool)
+
+    def withdraw(self, amount):
+        self.updateExchangeRates()
+        self.withdrawOptimal(amount)
+
+    def liquidatePosition(self, amountNeeded):
+        if amountNeeded > self.want:
+            self.withdraw(min(self.balanceOfStake(), amountNeeded - self.want))
+        liquidated = min(self.want, amountNeeded)
+        loss = amountNeeded - liquidated if amountNeeded > liquidated else 0
+        return liquidated, loss
+
+    def returnDebtOutstanding(self, debtOutstanding):
+        if debtOutstanding > 0:
+            amountFreed, loss = self.liquidatePosition(debtOutstanding)
+            return min(amountFreed, debtOutstanding), loss
+        return 0, 0
+
+    def prepareReturn(self, debtOutstanding):
+        debtPayment, loss = self.returnDebtOutstanding(debtOutstanding)
+        self.updateExchangeRates()
+        profit = self.pendingInterest()
+        requiredWantBal = profit + debtPayment
+        if self.want < requiredWantBal:
+            self.withdraw(requiredWantBal - self.want)
+        return profit, loss, debtPayment
+
+    def removePool(self, pool):
+        swapAndPop(self.pools, pool)
+        self.stuck.discard(pool)
+
+    def retryStuck(self):
+        for pool in reversed(list(self.pools)):
+            if pool not in self.stuck:
+                continue
+            self.withdrawFrom(pool)
+            if pool.balance == 0:
+                self.removePool(pool)
+
+    def adjustPosition(self, debtOutstanding):
+        self.retryStuck()
+        if debtOutstanding >= self.want:
+            return
+        idle = self.want - debtOutstanding
+        target = self.bufferTarget()
+        if idle > target:
+            self.deposit(idle - target)
+        elif target - idle > self.bufferBand(target):
+            self.withdraw(target - idle)
+
+    def harvest(self, debtOutstanding=0, credit=0):
+        """
+        One BaseStrategy.harvest(): prepareReturn, a simplified vault.report
+        that pulls profit + debtPayment and sends `credit`, then adjustPosition.
+        Returns (profit, loss, debtPayment).
+        """
+        profit, loss, debtPayment = self.prepareReturn(debtOutstanding)
+        # The vault can only pull what the strategy holds
+        paid = min(self.want, profit + debtPayment)
+        self.want -= paid
+        self.totalDebt = max(self.totalDebt - debtPayment - loss, 0) + credit
+        self.want += credit
+        self.adjustPosition(max(debtOutstanding - debtPayment, 0))
+        return profit, loss, debtPayment
+
+    def changeAllocs(self, newPools):
+        # Only removed pools are redeemed,ones that can't be emptied stay listed
+        freed = 0
+        for pool in reversed(list(self.pools)):
+            if pool in newPools:
+                continue
+            freed += self.withdrawFrom(pool)
+            if pool.balance == 0:
+                self.removePool(pool)
+            else:
+                self.stuck.add(pool)
+        self.stuck -= set(newPools)
+        # Repeats are skipped like the contract's _addPool
+        for pool in newPools:
+            if pool not in self.pools:
+                self.pools.append(pool)
+        # Only the freed want is deposited,and only what the buffer doesn't need
+        target = self.bufferTarget()
+        if freed > 0 and self.want > target:
+            self.deposit(min(freed, self.want - target))
+
+    def rebalance(self, amountToRebalance):
+        self.withdraw(amountToRebalance)
+        self.depositAboveBuffer()
+
+    def depositAboveBuffer(self):
+        target = self.bufferTarget()
+        if self.want > target:
+            self.deposit(self.want - target)
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from scripts.multicall import argTypes
+
+
+def encodeStep(signature, args):
+    return Web3.to_hex(
+        function_signature_to_4byte_selector(signature)
+        + encode(argTypes(signature), args)
+    )
+
+
+def step(name, target, signature, args):
+    return {
+        "name": name,
+        "to": to_checksum_address(target),
+        "signature": signature,
+        "data": encodeStep(signature, args),
+    }
+
+
+class TxPipeline:
+    """
+    Sends a plan of txs stage by stage. The txs of a stage are signed with
+    consecutive explicit nonces and broadcast together, then the stage waits for
+    all of their receipts. The plan and every signed tx are kept in a state file,
+    so an interrupted run resumes where it stopped instead of starting over.
+    """
+
+    def __init__(self, w3, account, path, pollInterval=1.0, gasPrice=None):
+        self.w3 = w3
+        self.account = account
+        self.path = path
+        self.pollInterval = pollInterval
+        # Fixed gas price in wei,the node's current price when None
+        self.gasPrice = gasPrice
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def save(self):
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+    def plan(self, stages):
+        # A plan already in the state file wins,it was built from the chain as it was then
+        if "stages" not in self.state:
+            self.state["stages"] = stages
+            self.save()
+        return self.state["stages"]
+
+    def _sign(self, tx, nonce, gasPrice):
+        raw = {
+            "from": self.account.address,
+            "to": tx["to"],
+            "data": tx["data"],
+            "nonce": nonce,
+            "gasPrice": gasPrice,
+            "chainId": self.w3.eth.chain_id,
+        }
+        raw["gas"] = self.w3.eth.estimate_gas(raw) * 12 // 10
+        signed = self.account.sign_transaction(raw)
+        tx.update(
+            nonce=nonce,
+            hash=self.w3.to_hex(signed.hash),
+            raw=self.w3.to_hex(signed.raw_transaction),
+        )
+
+    def _broadcast(self, tx):
+        try:
+            self.w3.eth.send_raw_transaction(tx["raw"])
+        except Exception as e:
+            # Rebroadcast on resume of a tx the node already has
+            if "known" not in str(e).lower():
+                raise
+
+    def _receipt(self, tx):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx["hash"])
+        except TransactionNotFound:
+            return None
+
+    def sendStage(self, stage):
+        # Signs whatever has no live signed tx yet and (re)broadcasts everything unmined
+        confirmed = self.w3.eth.get_transaction_count(self.account.address)
+        unmined = []
+        for tx in stage:
+            if tx.get("status") == 1:
+                continue
+            if "hash" in tx:
+                if tx.get("status") is None and self._receipt(tx) is not None:
+                    # Mined while we were away,waitStage records it
+                    continue
+                if tx.get("status") == 0 or tx["nonce"] < confirmed:
+                    # Reverted,or its nonce went to some other tx,sign it again
+                    for key in ("hash", "raw", "nonce", "status"):
+                        tx.pop(key, None)
+            unmined.append(tx)
+        # New nonces go after any signed but possibly never broadcast tx
+        nonce = max(
+            [self.w3.eth.get_transaction_count(self.account.address, "pending")]
+            + [tx["nonce"] + 1 for tx in unmined if "hash" in tx]
+        )
+        gasPrice = self.gasPrice or self.w3.eth.gas_price
+        for tx in unmined:
+            if "hash" not in tx:
+                self._sign(tx, nonce, gasPrice)
+                nonce += 1
+                self.save()
+            self._broadcast(tx)
+
+    def waitStage(self, stage, timeout=600):
+        deadline = time.time() + timeout
+        waiting = [tx for tx in stage if tx.get("status") != 1]
+        while waiting:
+            for tx in list(waiting):
+                receipt = self._receipt(tx)
+                if receipt is None:
+                    continue
+                tx["status"] = receipt["status"]
+                self.save()
+                waiting.remove(tx)
+                if receipt["status"] != 1:
+                    raise RuntimeError(f"{tx['name']} reverted in {tx['hash']}")
+            if waiting:
+                if time.time() > deadline:
+                    raise TimeoutError(f"{len(waiting)} txs unmined after {timeout}s")
+                time.sleep(self.pollInterval)
+
+    def run(self):
+        # Each stage only starts once everything before it is mined
+        for n, stage in enumerate(self.state["stages"]):
+            if all(tx.get("status") == 1 for tx in stage):
+                continue
+            self.sendStage(stage)
+            self.waitStage(stage)
+            print(f"stage {n}: {len(stage)} txs mined")
+        return self.state["stages"]
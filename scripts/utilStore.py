@@ -0,0 +1,202 @@
+import json
+import os
+
+import numpy as np
+from brownie import web3
+
+from scripts.allocator import BASIS_PRECISION, MIN_UTIL_CUTOFF, allocate
+from scripts.getAllFTMLendingPools import updateIndex, wftm
+from scripts.multicall import Call, Multicall
+from scripts.rpcProfile import profileFromEnv
+
+DEFAULT_ROOT = os.environ.get("UTIL_STORE", "utilStore")
+
+# One append-only file per column per pool, rows are samples in block order
+COLUMNS = {
+    "block": np.uint64,
+    # Percent,like allocator.utilizationFrom
+    "utilization": np.float64,
+    # In want,not wei
+    "supply": np.float64,
+    "liquidity": np.float64,
+    # exchangeRateLast / 1e18
+    "pps": np.float64,
+}
+
+
+class UtilStore:
+    """
+    Columnar store of per-pool samples under `root`. Each pool gets a directory
+    with one raw file per column; appends write to the end of every file and
+    reads memory-map them, so a range query only touches the rows it returns.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.indexPath = os.path.join(root, "pools.json")
+        self.pools = []
+        if os.path.exists(self.indexPath):
+            with open(self.indexPath) as f:
+                self.pools = json.load(f)
+        self.lengths = {pool: self._repair(pool) for pool in self.pools}
+        self.last = {
+            pool: int(self.column(pool, "block")[-1])
+            for pool in self.pools
+            if self.lengths[pool]
+        }
+
+    def _path(self, pool, column):
+        return os.path.join(self.root, pool, column)
+
+    def _repair(self, pool):
+        # An append cut short leaves some columns longer,drop the partial row
+        rows = min(
+            os.path.getsize(self._path(pool, column)) // np.dtype(dtype).itemsize
+            for column, dtype in COLUMNS.items()
+        )
+        for column, dtype in COLUMNS.items():
+            path = self._path(pool, column)
+            if os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+        return rows
+
+    def _addPool(self, pool):
+        os.makedirs(os.path.join(self.root, pool), exist_ok=True)
+        for column in COLUMNS:
+            open(self._path(pool, column), "ab").close()
+        self.pools.append(pool)
+        self.lengths[pool] = 0
+        with open(self.indexPath + ".tmp", "w") as f:
+            json.dump(self.pools, f)
+        os.replace(self.indexPath + ".tmp", self.indexPath)
+
+    def lastBlock(self, pool):
+        return self.last.get(pool)
+
+    def append(self, block, rows):
+        # rows: {pool: {column: value}},samples at or before a pool's last block are skipped
+        for pool, values in rows.items():
+            if pool not in self.lengths:
+                self._addPool(pool)
+            last = self.lastBlock(pool)
+            if last is not None and block <= last:
+                continue
+            values = dict(values, block=block)
+            for column, dtype in COLUMNS.items():
+                with open(self._path(pool, column), "ab") as f:
+                    f.write(np.asarray([values[column]], dtype=dtype).tobytes())
+            self.lengths[pool] += 1
+            self.last[pool] = block
+
+    def column(self, pool, column):
+        rows = self.lengths.get(pool, 0)
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[column])
+        return np.memmap(
+            self._path(pool, column), dtype=COLUMNS[column], mode="r", shape=(rows,)
+        )
+
+    def query(self, pool, fromBlock=0, toBlock=None, columns=None):
+        # {column: array} for samples with fromBlock <= block <= toBlock
+        blocks = self.column(pool, "block")
+        start = np.searchsorted(blocks, fromBlock, side="left")
+        end = (
+            len(blocks)
+            if toBlock is None
+            else np.searchsorted(blocks, toBlock, side="right")
+        )
+        return {
+            column: np.asarray(self.column(pool, column)[start:end])
+            for column in (columns or COLUMNS)
+        }
+
+
+def summarize(store, pools, fromBlock=0, toBlock=None):
+    """
+    Per pool averages over a block range: utilization weighted by how many blocks
+    each sample stood for, and realized pps growth from first to last sample.
+    Pools without samples in the range come back as nan.
+    """
+    utilization = np.full(len(pools), np.nan)
+    ppsGrowth = np.full(len(pools), np.nan)
+    for i, pool in enumerate(pools):
+        rows = store.query(pool, fromBlock, toBlock, ["block", "utilization", "pps"])
+        if len(rows["block"]) == 0:
+            continue
+        end = rows["block"][-1] + 1 if toBlock is None else toBlock + 1
+        held = np.diff(np.append(rows["block"], end)).astype(np.float64)
+        utilization[i] = np.average(rows["utilization"], weights=held)
+        ppsGrowth[i] = rows["pps"][-1] / rows["pps"][0] - 1
+    return utilization, ppsGrowth
+
+
+def allocateFromHistory(
+    store,
+    pools,
+    fromBlock=0,
+    toBlock=None,
+    cutoff=MIN_UTIL_CUTOFF,
+    precision=BASIS_PRECISION,
+):
+    # allocator.allocate on time-averaged utilization instead of a single snapshot
+    utilization, _ = summarize(store, pools, fromBlock, toBlock)
+    return allocate(np.nan_to_num(utilization), cutoff, precision)
+
+
+def sample(multicall, pools, want):
+    # One batch of totalSupply/liquidity/exchangeRateLast reads at the multicall's block
+    calls = []
+    for pool in pools:
+        calls.append(Call(pool, "totalSupply()", [], ["uint256"]))
+        calls.append(Call(want, "balanceOf(address)", [pool], ["uint256"]))
+        calls.append(Call(pool, "exchangeRateLast()", [], ["uint256"]))
+    results = multicall.execute(calls)
+    rows = {}
+    for i, pool in enumerate(pools):
+        totalSupply, liquidity, pps = results[3 * i : 3 * i + 3]
+        if not totalSupply or liquidity is None or pps is None:
+            continue
+        supply = totalSupply * pps / 1e36
+        rows[pool] = {
+            "utilization": (supply - liquidity / 1e18) / supply * 100,
+            "supply": supply,
+            "liquidity": liquidity / 1e18,
+            "pps": pps / 1e18,
+        }
+    return rows
+
+
+def record(w3, store, pools, want, toBlock=None, step=1, fromBlock=None):
+    """
+    Samples every `step` blocks up to toBlock,continuing after the newest sample
+    already in the store. Past blocks need an archive node.
+    """
+    if toBlock is None:
+        toBlock = w3.eth.block_number
+    if fromBlock is None:
+        lastBlocks = [store.lastBlock(pool) for pool in pools]
+        if any(block is None for block in lastBlocks):
+            fromBlock = toBlock
+        else:
+            fromBlock = min(lastBlocks) + step
+    for block in range(fromBlock, toBlock + 1, step):
+        store.append(block, sample(Multicall(w3, block=block), pools, want))
+    return store
+
+
+def main():
+    # UTIL_STORE directory,STEP blocks between samples,FROM_BLOCK to backfill from
+    profileFromEnv(web3)
+    store = UtilStore(DEFAULT_ROOT)
+    pools = updateIndex(web3).lendingPools(wftm)
+    fromBlock = os.environ.get("FROM_BLOCK")
+    record(
+        web3,
+        store,
+        pools,
+        wftm,
+        step=int(os.environ.get("STEP", 1)),
+        fromBlock=int(fromBlock) if fromBlock else None,
+    )
+    print(f"{len(store.pools)} pools,{sum(store.lengths.values())} samples")
@@ -1,5 +1,17 @@
 import pytest
-from brownie import config
+from brownie import chain, config, network, web3
+
+from scripts.multicall import MULTICALL3
+from scripts.rpcProfile import profileFromEnv
+
+# Strategy._initializeStrat reads WETH from this hardcoded Spookyswap router
+SPOOKY_ROUTER = "0xF491e7B69E4244ad4002BC14e878a34207E38c29"
+# 20% APR in interest per second, scaled by 1e18
+MOCK_BORROW_RATE = 6_341_958_396
+# Params using this currency run against mock contracts,pool confs are then
+# indexes into the mockPools fixture
+MOCK = "mock"
+MOCK_POOL_COUNT = 7
 
 fixtures = "currency", "whale", "allocConf", "allocChangeConf"
 params = [
@@ -22,78 +34,140 @@ params = [
             ["0xD05f23002f6d09Cf7b643B69F171cc2A3EAcd0b3"],  # FTM-BOO LP
         ],
         id="FTM LP TarrotLender",
+        marks=pytest.mark.require_network("ftm-main-fork"),
+    ),
+    pytest.param(
+        MOCK,
+        MOCK,
+        [0, 1],
+        [4, 3, 0, 6, 2, 5, 1],
+        id="Mock TarrotLender",
+        marks=pytest.mark.require_network("development"),
     ),
 ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session", autouse=True)
+def rpcProfile():
+    # RPC_PROFILE=<report.json> profiles every request the tests make
+    yield profileFromEnv(web3)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def shared_setup(request):
+    # Deployments are module scoped,each module starts from and leaves a clean chain
+    if network.is_connected():
+        request.getfixturevalue("module_isolation")
+
+
+@pytest.fixture(autouse=True)
+def isolation(request):
+    # Each test reverts to the state the module's deployments left.
+    # Script tests against MockRpc also run without a chain
+    if network.is_connected():
+        request.getfixturevalue("fn_isolation")
+
+
+@pytest.fixture(scope="module")
 def andre(accounts):
     # Andre, giver of tokens, and maker of yield
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def gov(accounts):
     # yearn multis... I mean YFI governance. I swear!
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def guardian(accounts):
     # YFI Whale, probably
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def strategist(accounts):
     # You! Our new Strategist!
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def keeper(accounts):
     # This is our trusty bot!
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def bob(accounts):
     yield accounts[5]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def alice(accounts):
     yield accounts[6]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def rewards(gov):
     yield gov  # TODO: Add rewards contract
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def currency(request, interface):
-    # this one is 3EPS
-    yield interface.ERC20(request.param)
+    if request.param == MOCK:
+        yield request.getfixturevalue("mockWant")
+    else:
+        # this one is 3EPS
+        yield interface.ERC20(request.param)
+
+
+@pytest.fixture(scope="module")
+def whale(request, accounts, currency):
+    if request.param == MOCK:
+        acc = accounts[7]
+        currency.mint(acc, 10_000_000 * 1e18, {"from": acc})
+    else:
+        acc = accounts.at(request.param, force=True)
+    yield acc
 
 
 @pytest.fixture
-def whale(request, accounts):
-    acc = accounts.at(request.param, force=True)
-    yield acc
+def funded(gov, whale, currency, vault, strategy):
+    # Strategy at 100% debt ratio with 100 want deposited,harvested and left to accrue 12 hours
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(100 * 1e18, {"from": whale})
+    strategy.harvest({"from": gov})
+    chain.sleep(12 * 60 * 60)
+    chain.mine(1)
+    yield strategy
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def mockPools(deployMockPools):
+    yield deployMockPools(MOCK_POOL_COUNT)
+
+
+def resolvePools(request):
+    # Mock params list indexes into mockPools instead of addresses
+    if all(isinstance(pool, int) for pool in request.param):
+        mockPools = request.getfixturevalue("mockPools")
+        return [mockPools[i].address for i in request.param]
+    return request.param
+
+
+@pytest.fixture(scope="module")
 def allocConf(request):
-    yield request.param
+    yield resolvePools(request)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def allocChangeConf(request):
-    yield request.param
+    yield resolvePools(request)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def vault(pm, gov, rewards, guardian, currency):
     Vault = pm(config["dependencies"][0]).Vault
     vault = gov.deploy(Vault)
@@ -103,8 +177,61 @@ def vault(pm, gov, rewards, guardian, currency):
     yield vault
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def strategy(strategist, keeper, vault, Strategy, allocConf):
     strategy = strategist.deploy(Strategy, vault, allocConf)
     strategy.setKeeper(keeper)
     yield strategy
+
+
+@pytest.fixture
+def mockRpc():
+    # Local stand-in JSON-RPC node for the script tests
+    from mockrpc import MockRpc
+
+    rpc = MockRpc().start()
+    yield rpc
+    rpc.stop()
+
+
+def setCode(address, code):
+    # Local chains expose this under different names
+    for method in ("anvil_setCode", "hardhat_setCode", "evm_setAccountCode"):
+        if "error" not in web3.provider.make_request(method, [address, code]):
+            return
+    raise RuntimeError("Local chain does not support setting account code")
+
+
+@pytest.fixture(scope="module")
+def mockWant(gov, MockERC20, MockRouter):
+    # Mock wFTM,also used as the router's WETH so ethToWant is 1:1
+    want = gov.deploy(MockERC20, "Wrapped Fantom", "WFTM")
+    router = gov.deploy(MockRouter)
+    setCode(SPOOKY_ROUTER, web3.to_hex(web3.eth.get_code(router.address)))
+    MockRouter.at(SPOOKY_ROUTER).setWETH(want, {"from": gov})
+    yield want
+
+
+@pytest.fixture(scope="module")
+def deployMockPools(andre, mockWant, MockLendingPool):
+    # Deploys `count` mock lending pools with 60-90% utilization from an outside lender
+    def deploy(count, supply=100_000 * 1e18):
+        pools = []
+        for i in range(count):
+            pool = andre.deploy(MockLendingPool, mockWant, MOCK_BORROW_RATE)
+            mockWant.mint(pool, supply, {"from": andre})
+            pool.mint(andre, {"from": andre})
+            pool.borrow(andre, supply * (60 + (i * 7) % 31) // 100, {"from": andre})
+            pools.append(pool)
+        return pools
+
+    yield deploy
+
+
+@pytest.fixture(scope="module")
+def multicall(gov, MockMulticall):
+    # Multicall3 isn't deployed on local chains,put ours at its address
+    setCode(
+        MULTICALL3, web3.to_hex(web3.eth.get_code(gov.deploy(MockMulticall).address))
+    )
+    yield MULTICALL3
@@ -0,0 +1,262 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, keccak
+
+from scripts.multicall import MULTICALL3, TRY_AGGREGATE, argTypes
+
+# Stand-in JSON-RPC node used by the script tests.
+# It answers eth_call for registered view functions, unpacks Multicall3
+# tryAggregate batches and counts every request it receives. Raw legacy txs
+# are accepted into a mempool, where a higher priced tx replaces one with the
+# same nonce, and mined by mine() in nonce order.
+
+
+class MockRpc:
+    def __init__(self, blockNumber=1000, chainId=250, delay=0, failures=0):
+        self.blockNumber = blockNumber
+        self.chainId = chainId
+        self.gasPrice = 10 ** 9
+        # Returned by eth_getLogs when in the requested block range and address set
+        self.logs = []
+        # eth_getLogs fails like a node's result limit when more logs would come back
+        self.maxLogs = None
+        # Simulated node latency and number of leading requests answered with a 503
+        self.delay = delay
+        self.failures = failures
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.handlers = {}
+        self.requests = 0
+        self.methods = Counter()
+        self.callBlocks = []
+        # Sent txs by hash and the hashes that reverted when mined
+        self.txs = {}
+        self.reverts = set()
+        self.receipts = {}
+        # Mine whatever is pending whenever a receipt is asked for
+        self.autoMine = False
+        self.lock = threading.Lock()
+        self.server = None
+
+    def register(self, target, signature, returns, fn):
+        # fn receives the decoded arguments and returns the value(s) to encode
+        selector = function_signature_to_4byte_selector(signature)
+        self.handlers[(target.lower(), selector)] = (signature, returns, fn)
+
+    def value(self, target, signature, returns, value):
+        self.register(target, signature, returns, lambda *args: value)
+
+    def _call(self, target, data):
+        handler = self.handlers.get((target.lower(), bytes(data[:4])))
+        if handler is None:
+            raise LookupError(f"no handler for {target} {bytes(data[:4]).hex()}")
+        signature, returns, fn = handler
+        result = fn(*decode(argTypes(signature), bytes(data[4:])))
+        if len(returns) == 1:
+            result = [result]
+        return encode(returns, list(result))
+
+    def _aggregate(self, data):
+        _, calls = decode(["bool", "(address,bytes)[]"], bytes(data[4:]))
+        results = []
+        for target, callData in calls:
+            try:
+                results.append((True, self._call(target, callData)))
+            except Exception:
+                results.append((False, b""))
+        return encode(["(bool,bytes)[]"], [results])
+
+    def _ethCall(self, tx, block):
+        data = bytes.fromhex(tx.get("data", tx.get("input", "0x"))[2:])
+        self.callBlocks.append(block)
+        if tx["to"].lower() == MULTICALL3.lower() and data[
+            :4
+        ] == function_signature_to_4byte_selector(TRY_AGGREGATE):
+            return self._aggregate(data)
+        return self._call(tx["to"], data)
+
+    def log(self, address, topics, blockNumber, data="0x"):
+        self.logs.append(
+            {
+                "address": address,
+                "topics": topics,
+                "data": data,
+                "blockNumber": hex(blockNumber),
+                "blockHash": "0x" + "00" * 32,
+                "transactionHash": "0x" + "00" * 32,
+                "transactionIndex": "0x0",
+                "logIndex": hex(len(self.logs)),
+                "removed": False,
+            }
+        )
+
+    def _getLogs(self, query):
+        fromBlock = int(query.get("fromBlock", "0x0"), 16)
+        toBlock = int(query.get("toBlock", hex(self.blockNumber)), 16)
+        addresses = query.get("address") or []
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {a.lower() for a in addresses}
+        topic0 = (query.get("topics") or [None])[0]
+        if isinstance(topic0, str):
+            topic0 = [topic0]
+        logs = [
+            log
+            for log in self.logs
+            if fromBlock <= int(log["blockNumber"], 16) <= toBlock
+            and (not addresses or log["address"].lower() in addresses)
+            and (not topic0 or log["topics"][0] in topic0)
+        ]
+        if self.maxLogs is not None and len(logs) > self.maxLogs:
+            raise ValueError(f"query returned more than {self.maxLogs} results")
+        return logs
+
+    def _sendRaw(self, raw):
+        raw = bytes.fromhex(raw[2:])
+        txHash = "0x" + keccak(raw).hex()
+        if txHash in self.txs:
+            raise ValueError("already known")
+        nonce, gasPrice, gas, to, value, data = rlp.decode(raw)[:6]
+        sender = Account.recover_transaction(raw)
+        nonce = int.from_bytes(nonce, "big")
+        gasPrice = int.from_bytes(gasPrice, "big")
+        if nonce < self._nonce(sender, "latest"):
+            raise ValueError("nonce too low")
+        # A pending tx with the same nonce is replaced if outbid by 10%
+        for oldHash, old in list(self.txs.items()):
+            if (
+                old["from"] == sender
+                and old["nonce"] == nonce
+                and oldHash not in self.receipts
+            ):
+                if gasPrice * 10 < old["gasPrice"] * 11:
+                    raise ValueError("replacement transaction underpriced")
+                del self.txs[oldHash]
+        self.txs[txHash] = {
+            "from": sender,
+            "nonce": nonce,
+            "gasPrice": gasPrice,
+            "to": "0x" + to.hex(),
+            "data": "0x" + data.hex(),
+        }
+        return txHash
+
+    def _nonce(self, sender, block):
+        # Mined txs for "latest",plus ones waiting in the mempool for "pending"
+        return sum(
+            1
+            for txHash, tx in self.txs.items()
+            if tx["from"].lower() == sender.lower()
+            and (block == "pending" or txHash in self.receipts)
+        )
+
+    def mine(self):
+        # Mines every sent tx in one block
+        self.blockNumber += 1
+        for txHash, tx in sorted(self.txs.items(), key=lambda t: t[1]["nonce"]):
+            if txHash not in self.receipts:
+                self.receipts[txHash] = {
+                    "transactionHash": txHash,
+                    "transactionIndex": "0x0",
+                    "blockHash": "0x" + "00" * 32,
+                    "blockNumber": hex(self.blockNumber),
+                    "from": tx["from"],
+                    "to": tx["to"],
+                    "gasUsed": "0x5208",
+                    "cumulativeGasUsed": "0x5208",
+                    "contractAddress": None,
+                    "logs": [],
+                    "status": "0x0" if txHash in self.reverts else "0x1",
+                }
+
+    def handle(self, request):
+        method = request["method"]
+        params = request.get("params", [])
+        with self.lock:
+            self.methods[method] += 1
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            if method == "eth_chainId":
+                response["result"] = hex(self.chainId)
+            elif method == "net_version":
+                response["result"] = str(self.chainId)
+            elif method == "eth_blockNumber":
+                response["result"] = hex(self.blockNumber)
+            elif method == "eth_gasPrice":
+                response["result"] = hex(self.gasPrice)
+            elif method == "eth_getTransactionCount":
+                response["result"] = hex(self._nonce(*params))
+            elif method == "eth_estimateGas":
+                response["result"] = hex(100_000)
+            elif method == "eth_sendRawTransaction":
+                response["result"] = self._sendRaw(params[0])
+            elif method == "eth_getTransactionReceipt":
+                if self.autoMine:
+                    self.mine()
+                response["result"] = self.receipts.get(params[0])
+            elif method == "eth_getLogs":
+                response["result"] = self._getLogs(params[0])
+            elif method == "eth_call":
+                block = params[1] if len(params) > 1 else "latest"
+                response["result"] = "0x" + self._ethCall(params[0], block).hex()
+            else:
+                raise LookupError(f"unsupported method {method}")
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+        return response
+
+    def start(self):
+        rpc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with rpc.lock:
+                    rpc.requests += 1
+                    rpc.inFlight += 1
+                    rpc.maxInFlight = max(rpc.maxInFlight, rpc.inFlight)
+                    fail = rpc.failures > 0
+                    if fail:
+                        rpc.failures -= 1
+                try:
+                    time.sleep(rpc.delay)
+                    if fail:
+                        self.send_response(503)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    if isinstance(body, list):
+                        result = [rpc.handle(req) for req in body]
+                    else:
+                        result = rpc.handle(body)
+                finally:
+                    with rpc.lock:
+                        rpc.inFlight -= 1
+                payload = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,63 @@
+import numpy as np
+
+from scripts.allocator import (
+    BASIS_PRECISION,
+    allocate,
+    allocateFrom,
+    largestRemainder,
+    sweepCutoffs,
+)
+
+
+def test_allocations_sum_to_precision():
+    rng = np.random.default_rng(1)
+    utilization = rng.uniform(0, 100, size=(500, 2000))
+
+    allocs = allocate(utilization)
+
+    assert allocs.shape == utilization.shape
+    assert (allocs.sum(axis=1) == BASIS_PRECISION).all()
+
+
+def test_cutoff_pools_get_nothing():
+    utilization = np.array([90.0, 10.0, 50.0, 19.99])
+
+    allocs = allocate(utilization, cutoff=20)
+
+    assert allocs[1] == 0 and allocs[3] == 0
+    # Excluded pools do not dilute the others
+    assert allocs[0] == 6429 and allocs[2] == 3571
+
+
+def test_largest_remainder_rounding():
+    # Three equal pools: the leftover point goes to the first one only
+    assert largestRemainder(np.full(3, BASIS_PRECISION / 3)).tolist() == [
+        3334,
+        3333,
+        3333,
+    ]
+    # The largest fractional part wins the leftover point
+    assert largestRemainder([2000.4, 3000.7, 4998.9]).tolist() == [2000, 3001, 4999]
+
+
+def test_no_eligible_pools():
+    assert allocate([5.0, 10.0]).tolist() == [0, 0]
+
+
+def test_allocate_from_supply_and_liquidity():
+    supply = np.array([100.0, 100.0, 0.0])
+    liquidity = np.array([20.0, 60.0, 0.0])
+
+    assert allocateFrom(supply, liquidity).tolist() == [6667, 3333, 0]
+
+
+def test_sweep_cutoffs():
+    utilization = np.array([85.0, 65.0, 30.0])
+    cutoffs = [0, 50, 70, 90]
+
+    allocs = sweepCutoffs(utilization, cutoffs)
+
+    assert allocs.shape == (4, 3)
+    assert allocs[0].tolist() == allocate(utilization, 0).tolist()
+    assert allocs[2].tolist() == [BASIS_PRECISION, 0, 0]
+    assert allocs[3].tolist() == [0, 0, 0]
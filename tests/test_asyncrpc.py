@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from scripts.asyncrpc import AsyncRpc
+
+
+async def serveWs(rpc, actions, connections):
+    # Websocket front for MockRpc,`actions` says what to do with the next requests
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connections.append(ws)
+        async for msg in ws:
+            action = actions.pop(0) if actions else "answer"
+            if action == "drop":
+                continue
+            if action == "close":
+                await ws.close()
+                break
+            await ws.send_str(json.dumps(rpc.handle(json.loads(msg.data))))
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"ws://127.0.0.1:{runner.addresses[0][1]}/"
+
+
+def test_websocket_times_out_and_reconnects(mockRpc):
+    connections = []
+    # The first request is never answered,the second one's connection drops
+    actions = ["drop", "answer", "close"]
+
+    async def run():
+        runner, url = await serveWs(mockRpc, actions, connections)
+        try:
+            async with AsyncRpc(url, timeout=1, backoff=0) as rpc:
+                block = await rpc.request("eth_blockNumber", [])
+                start = asyncio.get_running_loop().time()
+                chainId = await rpc.request("eth_chainId", [])
+                # Failed as soon as the connection dropped,not after the timeout
+                assert asyncio.get_running_loop().time() - start < rpc.timeout
+                blocks = await asyncio.gather(
+                    *(rpc.request("eth_blockNumber", []) for _ in range(10))
+                )
+                return block, chainId, blocks, rpc.requests, rpc.pending
+        finally:
+            await runner.cleanup()
+
+    block, chainId, blocks, requests, pending = asyncio.run(run())
+
+    assert block == hex(mockRpc.blockNumber) and chainId == hex(mockRpc.chainId)
+    assert blocks == [hex(mockRpc.blockNumber)] * 10
+    # Each failed request was sent once more,the dropped connection reopened
+    assert requests == 2 + 2 + 10
+    assert len(connections) == 2
+    assert pending == {}
@@ -0,0 +1,115 @@
+import pytest
+from brownie import web3
+from eth_utils import to_checksum_address
+
+import conftest as config
+from scripts.lens import fetchPoolStates
+from scripts.planAllocs import planAllocs
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_change_allocs_only_touches_changed_pools(
+    currency, funded, gov, whale, interface, StrategyLens, allocConf, allocChangeConf
+):
+    strategy = funded
+    lens = gov.deploy(StrategyLens)
+    held = {pool: interface.ERC20(pool).balanceOf(strategy) for pool in allocConf}
+    added = [pool for pool in allocChangeConf if pool not in allocConf]
+
+    # Adding pools leaves the current ones alone
+    plan = planAllocs(
+        fetchPoolStates(web3, lens.address, strategy.address), allocConf + added,
+    )
+    assert plan["removed"] == [] and len(plan["added"]) == len(added)
+    strategy.changeAllocs(allocConf + added, {"from": gov})
+    for pool in allocConf:
+        assert interface.ERC20(pool).balanceOf(strategy) == held[pool]
+    for pool in added:
+        assert currency.allowance(strategy, pool) == 2 ** 256 - 1
+
+    # Dropping them redeems and revokes exactly what the planner listed
+    plan = planAllocs(fetchPoolStates(web3, lens.address, strategy.address), added)
+    assert len(plan["removed"]) == len(allocConf) and plan["stuck"] == []
+    # Only the redeemed want is deposited,idle want already there stays put
+    idle = strategy.balanceOfWant() + 10 * 1e18
+    currency.transfer(strategy, 10 * 1e18, {"from": whale})
+    strategy.changeAllocs(added, {"from": gov})
+    for pool in allocConf:
+        assert interface.ERC20(pool).balanceOf(strategy) == 0
+        assert currency.allowance(strategy, pool) == 0
+    assert listed(strategy) == [to_checksum_address(p) for p in plan["pools"]]
+    assert strategy.balanceOfWant() == idle
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_pool_registry(
+    currency, Strategy, vault, gov, strategist, whale, allocConf, allocChangeConf
+):
+    # A strategy of its own so the vault hasn't added it yet
+    strategy = strategist.deploy(Strategy, vault, allocConf)
+    added = [pool for pool in allocChangeConf if pool not in allocConf]
+    # Duplicates are only listed once
+    strategy.setAllocManual(allocConf + added + added, {"from": gov})
+    pools = listed(strategy)
+    assert pools == allocConf + added
+    for i, pool in enumerate(pools):
+        assert strategy.isPool(pool)
+        assert strategy.poolInfo(pool) == (i, True, False)
+
+    # Dropping the first pool moves the last one into its slot
+    strategy.setAllocManual(pools[1:], {"from": gov})
+    assert not strategy.isPool(pools[0])
+    assert strategy.poolInfo(pools[0]) == (0, False, False)
+    assert currency.allowance(strategy, pools[0]) == 0
+    assert listed(strategy) == [pools[-1]] + pools[1:-1]
+    for i, pool in enumerate(listed(strategy)):
+        assert strategy.poolInfo(pool)[0] == i
+
+    # Funded pools can't be dropped without moving the funds
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(100 * 1e18, {"from": whale})
+    strategy.harvest({"from": gov})
+    with pytest.reverts("!empty"):
+        strategy.setAllocManual([pools[0]], {"from": gov})
+    with pytest.reverts("!pool"):
+        strategy.moveFromPool(pools[1], 1e18, pools[0], {"from": gov})
+
+
+def listed(strategy):
+    return [strategy.pools(i) for i in range(strategy.getTotalPools())]
+
+
+@pytest.mark.require_network("development")
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_stuck_pool_is_left_on_harvest(
+    currency, funded, gov, andre, MockLendingPool, allocConf, allocChangeConf
+):
+    strategy = funded
+    added = [pool for pool in allocChangeConf if pool not in allocConf]
+    drained = MockLendingPool.at(
+        max(allocConf, key=lambda pool: MockLendingPool.at(pool).balanceOf(strategy))
+    )
+    # Borrowers take all the cash of the pool our funds are in
+    cash = drained.totalBalance()
+    drained.borrow(andre, cash, {"from": andre})
+    bTokens = drained.balanceOf(strategy)
+
+    strategy.changeAllocs(added, {"from": gov})
+    assert strategy.isPool(drained) and strategy.poolInfo(drained)[2]
+    assert strategy.stuckPools() == 1
+    # Fully utilized,but nothing freed went back into it
+    assert drained.balanceOf(strategy) == bTokens
+    assert strategy.balanceOfWant() == 0
+    strategy.harvest({"from": gov})
+    assert drained.balanceOf(strategy) == bTokens and strategy.isPool(drained)
+
+    # Once the cash is back a tend redeems and removes it
+    currency.approve(drained, cash, {"from": andre})
+    drained.repay(cash, {"from": andre})
+    strategy.tend({"from": gov})
+    assert drained.balanceOf(strategy) == 0
+    assert not strategy.isPool(drained) and strategy.stuckPools() == 0
+    assert currency.allowance(strategy, drained) == 0
+    assert set(listed(strategy)) == set(added)
+    assert strategy.balanceOfWant() == 0
@@ -0,0 +1,65 @@
+import pytest
+
+import conftest as config
+from scripts.cloneStrategies import cloneAll, splitBatches
+
+
+def test_batches_fit_budget():
+    # 100k per clone plus 20k per pool on top of a 50k base
+    specs = [{"pools": [0] * (1 + i % 5)} for i in range(40)]
+    estimates = []
+
+    def estimate(batch):
+        estimates.append(len(batch))
+        return 50_000 + sum(100_000 + 20_000 * len(s["pools"]) for s in batch)
+
+    batches = splitBatches(specs, 1_000_000, estimate)
+
+    assert [s for batch in batches for s in batch] == specs
+    assert all(estimate(batch) <= 1_000_000 for batch in batches)
+    # Every batch but the last is as long as it can be
+    for batch, following in zip(batches, batches[1:]):
+        assert estimate(batch + following[:1]) > 1_000_000
+    with pytest.raises(ValueError):
+        splitBatches(specs, 100_000, estimate)
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_clone_strategies_in_one_tx(
+    accounts,
+    Strategy,
+    strategy,
+    vault,
+    strategist,
+    currency,
+    whale,
+    allocConf,
+    allocChangeConf,
+):
+    specs = [
+        {
+            "vault": vault.address,
+            "strategist": accounts[i].address,
+            "rewards": accounts[i + 3].address,
+            "keeper": accounts[i + 6].address,
+            "pools": allocChangeConf[: i + 1],
+        }
+        for i in range(3)
+    ]
+
+    clones = [Strategy.at(clone) for clone in cloneAll(strategy, specs, strategist)]
+
+    for spec, clone in zip(specs, clones):
+        assert clone.vault() == spec["vault"]
+        assert clone.strategist() == spec["strategist"]
+        assert clone.rewards() == spec["rewards"]
+        assert clone.keeper() == spec["keeper"]
+        assert clone.getTotalPools() == len(spec["pools"])
+        assert [clone.pools(i) for i in range(len(spec["pools"]))] == spec["pools"]
+    # Clones can't clone,and mismatched arrays revert
+    with pytest.reverts("!original"):
+        clones[0].cloneStrategies([], [], [], [], [], {"from": strategist})
+    with pytest.reverts("!length"):
+        strategy.cloneStrategies(
+            [vault], [], [strategist], [strategist], [allocConf], {"from": strategist}
+        )
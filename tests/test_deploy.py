@@ -0,0 +1,58 @@
+import pytest
+from brownie import Strategy, web3
+
+import conftest as config
+from scripts.deploy import deploy
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_deploy_from_config(
+    pm,
+    gov,
+    guardian,
+    keeper,
+    rewards,
+    currency,
+    whale,
+    allocConf,
+    allocChangeConf,
+    tmp_path,
+):
+    Vault = pm(config.config["dependencies"][0]).Vault
+    conf = {
+        "want": currency.address,
+        "governance": gov.address,
+        "guardian": guardian.address,
+        "rewards": rewards.address,
+        "pools": allocConf,
+        "addStrategy": {
+            "debtRatio": 9800,
+            "minDebtPerHarvest": 0,
+            "maxDebtPerHarvest": 2 ** 256 - 1,
+            "performanceFee": 1000,
+        },
+        "depositLimit": 1000 * 10 ** 18,
+        "managementFee": 0,
+        "keeper": keeper.address,
+        "vaultGovernance": guardian.address,
+    }
+    path = str(tmp_path / "deployState.json")
+    start = web3.eth.get_transaction_count(gov.address)
+
+    vault, strategy = deploy(conf, gov, path, Vault, pollInterval=0.1)
+
+    vault, strategy = Vault.at(vault), Strategy.at(strategy)
+    assert vault.strategies(strategy).dict()["debtRatio"] == 9800
+    assert vault.depositLimit() == 1000 * 10 ** 18
+    assert vault.managementFee() == 0
+    assert strategy.keeper() == keeper
+    assert vault.pendingGovernance() == guardian
+    # Vault,initialize and strategy,4 setup calls sent together,then the handover
+    assert web3.eth.get_transaction_count(gov.address) - start == 3 + 4 + 1
+
+    # Rerunning a finished deploy sends nothing
+    assert deploy(conf, gov, path, Vault, pollInterval=0.1) == (
+        vault.address,
+        strategy.address,
+    )
+    assert web3.eth.get_transaction_count(gov.address) - start == 3 + 4 + 1
@@ -0,0 +1,51 @@
+import pytest
+from brownie import web3
+
+import conftest as config
+from scripts.lens import fetchPoolStates
+from scripts.planDeposit import planDeposit
+
+ONE = 10 ** 18
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_split_deposit_matches_planner(
+    gov, whale, currency, vault, strategy, StrategyLens, allocChangeConf
+):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    strategy.setAllocManual(allocChangeConf, {"from": gov})
+    tx = strategy.updateSplitDeposits(True, {"from": gov})
+    assert tx.events["UpdatedSplitDeposits"]["splitDeposits"]
+    lens = gov.deploy(StrategyLens)
+    amount = 50_000 * 1e18
+    vault.deposit(amount, {"from": whale})
+
+    columns = fetchPoolStates(web3, lens.address, strategy.address)
+    amounts, utilization = planDeposit(columns, amount)
+    assert list(strategy.depositSplit(amount)) == amounts
+
+    strategy.harvest({"from": gov})
+
+    after = fetchPoolStates(web3, lens.address, strategy.address)
+    assert strategy.balanceOfWant() == 0
+    assert sum(after["balance"]) == pytest.approx(amount, rel=1e-6)
+    # Only the pools the planner picked received anything
+    for i, planned in enumerate(amounts):
+        assert (after["balance"][i] > 0) == (planned > 0)
+        assert after["utilization"][i] == pytest.approx(utilization[i], rel=1e-6)
+
+
+def test_planner_skips_stuck_pools():
+    columns = {
+        "totalSupplied": [1000 * ONE, 1000 * ONE, 1000 * ONE],
+        "borrowed": [950 * ONE, 900 * ONE, 800 * ONE],
+        "pps": [ONE] * 3,
+        "stuck": [True, False, False],
+    }
+
+    amounts, utilization = planDeposit(columns, 100 * ONE)
+
+    # The most utilized pool is stuck,the split starts at the next one
+    assert amounts[0] == 0 and sum(amounts) == 100 * ONE
+    assert utilization[0] == 95 * 10 ** 16
@@ -0,0 +1,129 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from brownie import chain
+
+# Gas used by the strategy hot paths as the number of pools grows.
+# Run with `brownie test tests/test_gas_benchmark.py --network development`.
+# Runs fail if any path costs more than GAS_TOLERANCE over the committed baseline
+# file,or if the baseline has no number for it.
+# Set UPDATE_GAS_BASELINE=1 to record new numbers.
+# Outside tests/ so black's include pattern doesn't pick it up
+BASELINE = Path(__file__).parent.parent / "benchmarks" / "gas_baseline.json"
+POOL_COUNTS = [1, 2, 5, 10, 20, 30, 40, 50]
+TOLERANCE = float(os.environ.get("GAS_TOLERANCE", "0.05"))
+UPDATE_BASELINE = os.environ.get("UPDATE_GAS_BASELINE") == "1"
+deposit_amount = 10_000 * 1e18
+# Clones per cloneStrategies call when comparing against one cloneStrategy per clone
+CLONE_BATCH = 5
+
+
+@pytest.fixture(scope="module")
+def poolCount(request):
+    yield request.param
+
+
+@pytest.fixture(scope="module")
+def currency(mockWant):
+    yield mockWant
+
+
+@pytest.fixture(scope="module")
+def allocConf(poolCount, deployMockPools):
+    yield [pool.address for pool in deployMockPools(poolCount)]
+
+
+def checkBaseline(poolCount, gas):
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    key = str(poolCount)
+    print(f"{poolCount} pools : {gas}")
+    if UPDATE_BASELINE:
+        baseline[key] = gas
+        BASELINE.parent.mkdir(exist_ok=True)
+        BASELINE.write_text(json.dumps(baseline, indent=4, sort_keys=True) + "\n")
+        return
+    missing = [name for name in gas if name not in baseline.get(key, {})]
+    assert not missing, (
+        f"No gas baseline for {missing} with {poolCount} pools,"
+        " run with UPDATE_GAS_BASELINE=1 to record it"
+    )
+    regressions = {
+        name: (baseline[key][name], used)
+        for name, used in gas.items()
+        if used > baseline[key][name] * (1 + TOLERANCE)
+    }
+    assert not regressions, f"Gas regressions with {poolCount} pools : {regressions}"
+
+
+@pytest.mark.require_network("development")
+@pytest.mark.parametrize("poolCount", POOL_COUNTS, indirect=True)
+def test_gas_by_pool_count(
+    poolCount,
+    gov,
+    bob,
+    strategist,
+    currency,
+    vault,
+    strategy,
+    allocConf,
+    deployMockPools,
+    interface,
+):
+    currency.mint(bob, deposit_amount, {"from": bob})
+    currency.approve(vault, 2 ** 256 - 1, {"from": bob})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(deposit_amount, {"from": bob})
+    gas = {}
+
+    gas["harvest_deposit"] = strategy.harvest({"from": gov}).gas_used
+    chain.sleep(6 * 60 * 60)
+    chain.mine(1)
+    gas["harvest"] = strategy.harvest({"from": gov}).gas_used
+    gas["rebalance"] = strategy.rebalance(
+        strategy.balanceOfStake() // 10, {"from": gov}
+    ).gas_used
+    gas["withdrawFromLending"] = strategy.withdrawFromLending(
+        strategy.balanceOfStake() // 10, {"from": gov}
+    ).gas_used
+    strategy.harvest({"from": gov})
+    gas["vault_withdraw"] = vault.withdraw(
+        vault.balanceOf(bob) // 10, {"from": bob}
+    ).gas_used
+    # The same small withdrawal without and with a 10% idle buffer
+    gas["vault_withdraw_small"] = vault.withdraw(
+        vault.balanceOf(bob) // 100, {"from": bob}
+    ).gas_used
+    strategy.updateBufferRatio(1_000, {"from": gov})
+    strategy.harvest({"from": gov})
+    gas["vault_withdraw_buffered"] = vault.withdraw(
+        vault.balanceOf(bob) // 100, {"from": bob}
+    ).gas_used
+    assert gas["vault_withdraw_buffered"] < gas["vault_withdraw_small"]
+    strategy.updateBufferRatio(0, {"from": gov})
+    # Swap the pool holding the funds for a new one
+    held = max(allocConf, key=lambda pool: interface.ERC20(pool).balanceOf(strategy))
+    added = deployMockPools(1)[0].address
+    gas["changeAllocs"] = strategy.changeAllocs(
+        [pool for pool in allocConf if pool != held] + [added], {"from": gov}
+    ).gas_used
+    assert not strategy.isPool(held) and strategy.isPool(added)
+    # Per clone,alone and in a batch
+    gas["clone"] = strategy.cloneStrategy["address,address[]"](
+        vault, allocConf, {"from": strategist}
+    ).gas_used
+    roles = [[strategist] * CLONE_BATCH] * 3
+    gas["clone_batched"] = (
+        strategy.cloneStrategies(
+            [vault] * CLONE_BATCH,
+            *roles,
+            [allocConf] * CLONE_BATCH,
+            {"from": strategist},
+        ).gas_used
+        // CLONE_BATCH
+    )
+    # Batching saves at least the base cost of a tx per clone
+    assert gas["clone_batched"] < gas["clone"] - 21_000
+
+    checkBaseline(poolCount, gas)
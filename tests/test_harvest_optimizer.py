@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+
+from scripts.harvestOptimizer import (
+    INTERVALS,
+    aprFromGrowth,
+    fitHarvestGas,
+    loadGasBaseline,
+    optimize,
+)
+from scripts.keeper import HARVEST_GAS
+from scripts.rateModel import SECONDS_PER_YEAR
+
+DAY = 24 * 3600
+
+
+def test_interval_matches_closed_form():
+    # Idle drag inflow*T/2*apr against gas Y*c/T is smallest at sqrt(2*Y*c / (inflow*apr))
+    assets = np.array([1e6, 2e5, 5e4])
+    apr = np.array([0.1, 0.25, 0.05])
+    inflow = np.array([1000, 300, 50]) / DAY
+    harvestCost = np.array([5.0, 2.0, 0.5])
+
+    result = optimize(assets, apr, inflow, harvestCost)
+
+    expected = np.sqrt(2 * SECONDS_PER_YEAR * harvestCost / (inflow * apr))
+    # Within one grid step
+    assert result["interval"] == pytest.approx(expected, rel=0.02)
+    assert result["minProfit"] == pytest.approx(
+        assets * apr * result["interval"] / SECONDS_PER_YEAR
+    )
+    assert result["minCredit"] == pytest.approx(inflow * result["interval"])
+    assert np.all(result["netApr"] < apr)
+
+
+def test_interval_grid_edges():
+    result = optimize([1e6, 1e6], [0.1, 0.1], [0, 1], [1.0, 0])
+    # Nothing to deploy means waiting as long as possible,free harvests mean never waiting
+    assert result["interval"][0] == INTERVALS[-1] and result["minCredit"][0] == 0
+    assert result["interval"][1] == INTERVALS[0]
+    assert optimize([0], [0.1], [1], [1.0])["netApr"][0] == 0
+
+
+def test_harvest_gas_fit():
+    baseline = {
+        str(count): {"harvest": 200_000 + 45_000 * count, "rebalance": 1}
+        for count in (1, 2, 5, 10)
+    }
+    base, perPool = fitHarvestGas(baseline)
+    assert base == pytest.approx(200_000) and perPool == pytest.approx(45_000)
+    assert fitHarvestGas({"5": {"harvest": 1}}) == (HARVEST_GAS, 0)
+
+
+def test_missing_gas_baseline_falls_back(tmp_path, capsys):
+    path = tmp_path / "gas_baseline.json"
+    assert loadGasBaseline(path) == {}
+    assert "WARNING" in capsys.readouterr().out
+    assert fitHarvestGas(loadGasBaseline(path)) == (HARVEST_GAS, 0)
+    path.write_text(json.dumps({"1": {"harvest": 5}}))
+    assert loadGasBaseline(path) == {"1": {"harvest": 5}}
+
+
+def test_apr_from_pps_growth():
+    # 10% in half a year compounds to 21% a year
+    growth = np.array([0.1, 0.0, np.nan])
+    apr = aprFromGrowth(growth, SECONDS_PER_YEAR / 2)
+    assert apr[:2] == pytest.approx([0.21, 0.0])
+    assert np.isnan(apr[2])
@@ -0,0 +1,277 @@
+import pytest
+from brownie import web3
+from eth_account import Account
+from web3 import Web3
+
+import conftest as config
+from scripts.keeper import (
+    PARAM_EVENTS,
+    REPLACE_AFTER,
+    Keeper,
+    harvestTrigger,
+    tendTrigger,
+)
+from scripts.multicall import MULTICALL3
+
+vaultAddr = "0x000000000000000000000000000000000000c0c0"
+ONE = 10 ** 18
+
+
+def fakeStrategy(i):
+    return Web3.to_checksum_address("0x" + f"{0xD000 + i:040x}")
+
+
+def makeParams(**overrides):
+    params = {
+        "vault": vaultAddr,
+        "minReportDelay": 0,
+        "maxReportDelay": 6300,
+        "profitFactor": 1500,
+        "debtThreshold": 1_000_000 * ONE,
+        "minProfit": 10 * ONE,
+        "minCredit": 10 * ONE,
+        "bufferRatio": 0,
+        "bufferTolerance": 0,
+    }
+    params.update(overrides)
+    return params
+
+
+def makeState(lastReport=1500, totalDebt=100 * ONE, activation=1, **overrides):
+    state = {
+        "strategyParams": (
+            0,
+            activation,
+            3000,
+            0,
+            2 ** 256 - 1,
+            lastReport,
+            totalDebt,
+            0,
+            0,
+        ),
+        "debtOutstanding": 0,
+        "creditAvailable": 0,
+        "estimatedTotalAssets": totalDebt,
+        "balanceOfWant": 0,
+        "callCost": ONE,
+    }
+    state.update(overrides)
+    return state
+
+
+def test_harvest_trigger_mirrors_contract():
+    params = makeParams()
+
+    assert not harvestTrigger(params, makeState(), 2000)
+    # maxReportDelay passed
+    assert harvestTrigger(params, makeState(), 1500 + 6300)
+    # pendingInterest over minProfit
+    assert harvestTrigger(params, makeState(estimatedTotalAssets=111 * ONE), 2000)
+    # creditAvailable over minCredit
+    assert harvestTrigger(params, makeState(creditAvailable=11 * ONE), 2000)
+    # Strategy ORs its own checks past the base activation check
+    assert harvestTrigger(
+        params, makeState(activation=0, estimatedTotalAssets=111 * ONE), 1500 + 6300
+    )
+    assert not harvestTrigger(params, makeState(activation=0), 1500 + 6300)
+
+
+def test_tend_trigger_on_idle_want():
+    assert not tendTrigger(makeParams(), makeState(balanceOfWant=10 * ONE))
+    assert tendTrigger(makeParams(), makeState(balanceOfWant=10 * ONE + 1))
+
+
+def test_tend_trigger_on_buffer_gap():
+    # 20% of 100 is kept idle,within 25% of that either way is fine
+    params = makeParams(bufferRatio=2000, bufferTolerance=2500, minCredit=0)
+    assert not tendTrigger(params, makeState(balanceOfWant=20 * ONE))
+    assert not tendTrigger(params, makeState(balanceOfWant=25 * ONE))
+    assert tendTrigger(params, makeState(balanceOfWant=25 * ONE + 1))
+    assert not tendTrigger(params, makeState(balanceOfWant=15 * ONE))
+    assert tendTrigger(params, makeState(balanceOfWant=15 * ONE - 1))
+    # Excess under minCredit isn't worth a deposit,a short buffer still is
+    params["minCredit"] = 10 * ONE
+    assert not tendTrigger(params, makeState(balanceOfWant=30 * ONE))
+    assert tendTrigger(params, makeState(balanceOfWant=15 * ONE - 1))
+
+
+def setupStrategies(rpc, count):
+    # Every strategy has 5 want of pending interest,under the default minProfit
+    params = {fakeStrategy(i): makeParams() for i in range(count)}
+    for strategy in params:
+        for name in params[strategy]:
+            if name == "vault":
+                continue
+            rpc.register(
+                strategy,
+                f"{name}()",
+                ["uint256"],
+                lambda name=name, strategy=strategy: params[strategy][name],
+            )
+        rpc.value(strategy, "vault()", ["address"], vaultAddr)
+        rpc.value(strategy, "estimatedTotalAssets()", ["uint256"], 105 * ONE)
+        rpc.value(strategy, "balanceOfWant()", ["uint256"], 0)
+        rpc.value(strategy, "ethToWant(uint256)", ["uint256"], ONE)
+    state = makeState()
+    rpc.value(
+        vaultAddr,
+        "strategies(address)",
+        ["(" + ",".join(["uint256"] * 9) + ")"],
+        state["strategyParams"],
+    )
+    rpc.value(vaultAddr, "debtOutstanding(address)", ["uint256"], 0)
+    rpc.value(vaultAddr, "creditAvailable(address)", ["uint256"], 0)
+    rpc.value(MULTICALL3, "getCurrentBlockTimestamp()", ["uint256"], 2000)
+    return params
+
+
+def test_keeper_reads_one_batch_per_block(mockRpc):
+    params = setupStrategies(mockRpc, 20)
+    strategies = list(params)
+    keeper = Keeper(Web3(Web3.HTTPProvider(mockRpc.url)), strategies, None)
+
+    assert keeper.evaluate(1000) == []
+    # Params are loaded once,then each block is a single batch
+    assert mockRpc.methods["eth_call"] == 2
+    assert keeper.evaluate(1001) == []
+    assert keeper.evaluate(1002) == []
+    assert mockRpc.methods["eth_call"] == 4
+
+    # Lowering minProfit emits UpdatedMinProfit,only that strategy is reloaded
+    params[strategies[3]]["minProfit"] = ONE
+    mockRpc.log(strategies[3], [PARAM_EVENTS[4]], 1003)
+    assert keeper.evaluate(1003) == [(strategies[3], "harvest")]
+    assert mockRpc.methods["eth_call"] == 6
+    assert keeper.params[strategies[3]]["minProfit"] == ONE
+    assert mockRpc.methods["eth_getLogs"] == 3
+
+
+def test_keeper_refreshes_gas_price_each_block(mockRpc):
+    params = setupStrategies(mockRpc, 2)
+    strategy = list(params)[0]
+    params[strategy]["minProfit"] = ONE
+    keeper = Keeper(Web3(Web3.HTTPProvider(mockRpc.url)), list(params), None)
+
+    keeper.evaluate(1000)
+    mockRpc.gasPrice = 2 * 10 ** 9
+    # The same block reuses its price,the next one picks up the change
+    keeper.evaluate(1000)
+    assert keeper.gasPrice == 10 ** 9
+    keeper.evaluate(1001)
+    assert keeper.gasPrice == 2 * 10 ** 9
+    assert mockRpc.methods["eth_gasPrice"] == 2
+
+    # A send prices its tx at the block's price without fetching it again
+    keeper.account = Account.create()
+    keeper.send(strategy, "harvest", 1001)
+    assert keeper.pending[strategy]["gasPrice"] == 2 * 10 ** 9
+    assert mockRpc.methods["eth_gasPrice"] == 2
+
+
+def test_keeper_replaces_stuck_txs(mockRpc):
+    params = setupStrategies(mockRpc, 2)
+    strategy = list(params)[0]
+    params[strategy]["minProfit"] = ONE
+    account = Account.create()
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    # 25% bumps from 1 gwei reach the cap on the second replacement
+    keeper = Keeper(w3, list(params), account, maxGasPrice=15 * 10 ** 8)
+
+    assert keeper.step(1000) == [(strategy, "harvest")]
+    keeper.step(1000 + REPLACE_AFTER - 1)
+    tx = keeper.pending[strategy]
+    assert len(tx["hashes"]) == 1
+    keeper.step(1000 + REPLACE_AFTER)
+    assert len(tx["hashes"]) == 2 and tx["gasPrice"] == 125 * 10 ** 7
+    # The next bump is capped at maxGasPrice rather than skipped
+    keeper.step(1000 + 2 * REPLACE_AFTER)
+    assert len(tx["hashes"]) == 3 and tx["gasPrice"] == 15 * 10 ** 8
+    # At the cap it waits for the next window
+    keeper.step(1000 + 3 * REPLACE_AFTER)
+    assert len(tx["hashes"]) == 3 and tx["block"] == 1000 + 3 * REPLACE_AFTER
+    # Only the last replacement is left in the mempool
+    assert [(t["nonce"], t["gasPrice"]) for t in mockRpc.txs.values()] == [
+        (0, 15 * 10 ** 8)
+    ]
+
+    # A failing resend is retried later instead of stopping the keeper
+    def failingSend(*args):
+        raise ValueError("replacement transaction underpriced")
+
+    keeper.maxGasPrice = None
+    keeper._send = failingSend
+    keeper.step(1000 + 4 * REPLACE_AFTER)
+    assert len(tx["hashes"]) == 3 and tx["block"] == 1000 + 4 * REPLACE_AFTER
+
+    # Another process takes the nonce,once that is mined ours is settled
+    other = account.sign_transaction(
+        {
+            "nonce": 0,
+            "gasPrice": 3 * 10 ** 9,
+            "gas": 100_000,
+            "to": strategy,
+            "value": 0,
+            "data": "0x",
+            "chainId": mockRpc.chainId,
+        }
+    )
+    w3.eth.send_raw_transaction(other.raw_transaction)
+    mockRpc.mine()
+    keeper.checkPending(1000 + 4 * REPLACE_AFTER + 1)
+    assert not keeper.pending
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_keeper_harvests_clones(
+    accounts,
+    chain,
+    gov,
+    strategist,
+    whale,
+    currency,
+    vault,
+    strategy,
+    allocConf,
+    allocChangeConf,
+    multicall,
+    Strategy,
+):
+    clones = [strategy] + [
+        Strategy.at(
+            strategy.cloneStrategy["address,address[]"](
+                vault, allocConf, {"from": strategist}
+            ).return_value
+        )
+        for _ in range(2)
+    ]
+    bot = accounts.add()
+    gov.transfer(bot, 10 * 1e18)
+    for clone in clones:
+        vault.addStrategy(clone, 3000, 0, 2 ** 256 - 1, 0, {"from": gov})
+        clone.setKeeper(bot, {"from": clone.strategist()})
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.deposit(3000 * 1e18, {"from": whale})
+
+    keeper = Keeper(
+        web3, clones, Account.from_key(bot.private_key), multicall=multicall
+    )
+    actions = keeper.step(web3.eth.block_number)
+
+    # Credit is available to every clone,so each gets harvested
+    assert sorted(actions) == sorted((clone.address, "harvest") for clone in clones)
+    assert web3.eth.get_transaction_count(bot.address) == len(clones)
+    for clone in clones:
+        assert vault.strategies(clone).dict()["totalDebt"] > 0
+
+    # Raising the thresholds is picked up from the setter events
+    for clone in clones:
+        clone.updateMinProfit(2 ** 255, {"from": gov})
+        clone.updateMinCredit(2 ** 255, {"from": gov})
+    chain.mine()
+    assert keeper.step(web3.eth.block_number) == []
+    assert not keeper.pending
+    # One evaluation per step,each a couple of local batches
+    stats = keeper.stats()
+    assert stats["blocks"] == 2 and len(keeper.sent) == len(clones)
+    assert stats["p50"] <= stats["p95"] <= stats["max"] < 1000
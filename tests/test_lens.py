@@ -0,0 +1,64 @@
+import pytest
+from brownie import web3
+from web3 import Web3
+
+import conftest as config
+from scripts.lens import POOL_STATE_TYPE, fetchPoolStates
+
+lensAddr = "0x000000000000000000000000000000000000b0b0"
+strategyAddr = "0x000000000000000000000000000000000000a0a0"
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_lens_matches_strategy_views(
+    gov, whale, currency, vault, strategy, interface, StrategyLens, allocChangeConf
+):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(1000 * 1e18, {"from": whale})
+    strategy.harvest({"from": gov})
+    strategy.changeAllocs(allocChangeConf, {"from": gov})
+    lens = gov.deploy(StrategyLens)
+
+    columns = fetchPoolStates(web3, lens.address, strategy.address)
+
+    withdrawable = strategy.getWithdrawableFromPools()
+    assert len(columns["pool"]) == strategy.getTotalPools()
+    for i, pool in enumerate(columns["pool"]):
+        assert pool == strategy.pools(i)
+        assert columns["utilization"][i] == strategy.lendPairUtilization(pool, 0)
+        assert columns["withdrawable"][i] == withdrawable[i]
+        assert columns["balance"][i] == strategy.bTokenToWant(
+            pool, interface.ERC20(pool).balanceOf(strategy)
+        )
+    assert sum(columns["balance"]) == strategy.balanceOfStake()
+    assert columns["stuck"] == [strategy.poolInfo(pool)[2] for pool in columns["pool"]]
+
+
+def test_lens_columns_decode(mockRpc):
+    states = [
+        (
+            f"0x{i + 1:040x}",
+            10 ** 18 + i,
+            100 * i,
+            80 * i,
+            20 * i,
+            i,
+            8 * 10 ** 17,
+            i,
+            i % 7 == 0,
+        )
+        for i in range(30)
+    ]
+    mockRpc.value(lensAddr, "poolStates(address)", [POOL_STATE_TYPE + "[]"], states)
+
+    columns = fetchPoolStates(
+        Web3(Web3.HTTPProvider(mockRpc.url)), lensAddr, strategyAddr
+    )
+
+    # The whole pool set comes back from a single eth_call
+    assert mockRpc.methods["eth_call"] == 1
+    assert columns["pool"] == [Web3.to_checksum_address(s[0]) for s in states]
+    assert columns["pps"] == [s[1] for s in states]
+    assert columns["withdrawable"] == [s[7] for s in states]
+    assert columns["stuck"] == [s[8] for s in states]
@@ -1,6 +1,16 @@
 import pytest
+from brownie import web3
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
 
 import conftest as config
+from scripts.migrate_toNew import DUST, planMigration, simulate, strategyPools
+from scripts.multicall import Multicall
+from scripts.txPipeline import TxPipeline
+
+ONE = 10 ** 18
 
 
 def includeSmallInaccurancy(amount):
@@ -9,20 +19,19 @@ def includeSmallInaccurancy(amount):
 
 
 @pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
-@pytest.mark.require_network("ftm-main-fork")
 def test_migrate(
-    currency, Strategy, strategy, chain, vault, whale, gov, strategist, allocChangeConf
+    currency,
+    Strategy,
+    funded,
+    strategy,
+    chain,
+    vault,
+    whale,
+    gov,
+    strategist,
+    allocConf,
+    allocChangeConf,
 ):
-    debt_ratio = 10_000
-    vault.addStrategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 1_000, {"from": gov})
-
-    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
-    vault.deposit(100 * 1e18, {"from": whale})
-    strategy.harvest({"from": strategist})
-
-    chain.sleep(12 * 60 * 60)
-    chain.mine(1)
-
     strategy.harvest({"from": strategist})
 
     chain.sleep(12 * 60 * 60)
@@ -36,3 +45,116 @@ def test_migrate(
     assert strategy2.estimatedTotalAssets() >= includeSmallInaccurancy(
         totalasset_beforemig
     )
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_migration_pipeline(
+    currency,
+    Strategy,
+    strategy,
+    chain,
+    vault,
+    whale,
+    gov,
+    strategist,
+    allocConf,
+    allocChangeConf,
+    multicall,
+    funded,
+    tmp_path,
+):
+    totalasset_beforemig = strategy.estimatedTotalAssets()
+
+    strategy2 = gov.deploy(Strategy, vault, allocConf)
+    reader = Multicall(web3, multicall)
+    pools = strategyPools(reader, strategy.address)
+    stages = planMigration(
+        reader, vault.address, strategy.address, strategy2.address, pools, gov.address
+    )
+    # All sweeps,then all transfers,then migrateStrategy and harvest
+    assert [len(stage) for stage in stages] == [len(pools), 2 * len(pools), 1, 1]
+
+    report = simulate(stages, gov.address, strategy.address, strategy2.address)
+    assert report["before"] == totalasset_beforemig
+    assert report["migrateStrategy"] >= includeSmallInaccurancy(totalasset_beforemig)
+    # The dry run leaves the chain untouched
+    assert vault.strategies(strategy).dict()["totalDebt"] > 0
+    assert strategy2.estimatedTotalAssets() == 0
+
+    migration = TxPipeline(
+        web3,
+        Account.from_key(gov.private_key),
+        str(tmp_path / "migration.json"),
+        pollInterval=0.1,
+    )
+    migration.plan(stages)
+    migration.run()
+    assert vault.strategies(strategy).dict()["totalDebt"] == 0
+    assert strategy2.estimatedTotalAssets() >= includeSmallInaccurancy(
+        totalasset_beforemig
+    )
+
+
+def fakeAddress(i):
+    return Web3.to_checksum_address("0x" + f"{0xE000 + i:040x}")
+
+
+def test_migration_resumes_from_state(mockRpc, tmp_path):
+    vault, oldStrategy, newStrategy = fakeAddress(0), fakeAddress(1), fakeAddress(2)
+    pools = [fakeAddress(10 + i) for i in range(4)]
+    account = Account.create()
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    for i, pool in enumerate(pools):
+        balances = {oldStrategy: (i + 1) * ONE if i else 0, account.address: 5}
+        balances = {owner.lower(): amount for owner, amount in balances.items()}
+        mockRpc.register(
+            pool,
+            "balanceOf(address)",
+            ["uint256"],
+            lambda owner, b=balances: b[owner.lower()],
+        )
+    stages = planMigration(
+        Multicall(w3), vault, oldStrategy, newStrategy, pools, account.address
+    )
+    # The empty pool is left alone,the others move together
+    assert [len(stage) for stage in stages] == [3, 6, 1, 1]
+    transfer = stages[1][1]
+    assert transfer["to"] == pools[1]
+    assert transfer["data"] == w3.to_hex(
+        function_signature_to_4byte_selector("transfer(address,uint256)")
+        + encode(["address", "uint256"], [newStrategy, 2 * ONE + 5 - DUST])
+    )
+
+    path = str(tmp_path / "migration.json")
+    migration = TxPipeline(w3, account, path, pollInterval=0)
+    migration.plan(stages)
+    # Every sweep is in flight before any of them is mined
+    migration.sendStage(migration.state["stages"][0])
+    assert sorted(tx["nonce"] for tx in mockRpc.txs.values()) == [0, 1, 2]
+    assert not mockRpc.receipts
+    mockRpc.mine()
+    migration.waitStage(migration.state["stages"][0])
+
+    # Interrupted after two of the transfers were sent
+    sent = []
+    original = migration._broadcast
+
+    def broadcastTwo(tx):
+        if len(sent) == 2:
+            raise KeyboardInterrupt
+        sent.append(tx)
+        original(tx)
+
+    migration._broadcast = broadcastTwo
+    with pytest.raises(KeyboardInterrupt):
+        migration.sendStage(migration.state["stages"][1])
+    mockRpc.mine()
+
+    # A new run only signs what never went out and finishes the plan
+    resumed = TxPipeline(w3, account, path, pollInterval=0)
+    assert resumed.state["stages"] == migration.state["stages"]
+    mockRpc.autoMine = True
+    resumed.run()
+    nonces = sorted(tx["nonce"] for tx in mockRpc.txs.values())
+    assert nonces == list(range(3 + 6 + 1 + 1))
+    assert all(tx["status"] == 1 for stage in resumed.state["stages"] for tx in stage)
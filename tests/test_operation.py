@@ -8,7 +8,6 @@ import conftest as config
 
 
 @pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
-@pytest.mark.require_network("ftm-main-fork")
 def test_operation(currency, strategy, vault, whale, gov, bob, alice, allocChangeConf):
     # Amount configs
     test_budget = 888000 * 1e18
@@ -93,9 +92,7 @@ def sleepAndHarvest(times, strat, gov):
 def debugStratData(strategy, msg):
     print(msg)
     print("Total assets " + str(strategy.estimatedTotalAssets()))
-    print(
-        str(strategy.bTokenToWant("0x5dd76071F7b5F4599d4F2B7c08641843B746ace9", 1e18))
-    )
+    print(str(strategy.bTokenToWant(strategy.pools(0), 1e18)))
     print("ftm Balance " + str(strategy.balanceOfWant()))
     print("Stake balance " + str(strategy.balanceOfStake()))
     print("Pending reward " + str(strategy.pendingInterest()))
@@ -0,0 +1,74 @@
+from eth_abi import encode
+from web3 import Web3
+
+from scripts.getAllFTMLendingPools import tarotFactory, wftm
+from scripts.multicall import Multicall
+from scripts.poolIndex import LENDING_POOL_INITIALIZED, PoolIndex
+from test_scanner import fakePair, fakePool, otherToken, setupFactory
+
+
+def lendable(count):
+    return [fakePool(i) for i in range(count) if i % 3 != 2]
+
+
+def test_update_only_fetches_new_pools(mockRpc, tmp_path):
+    path = str(tmp_path / "poolIndex.json")
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    setupFactory(mockRpc, 30)
+
+    index = PoolIndex(tarotFactory, path).update(Multicall(w3, batchSize=500))
+    assert index.lendingPools(wftm) == lendable(30)
+    # Length, pairs, tokens and lending pools
+    assert mockRpc.methods["eth_call"] == 4
+
+    # Nothing new,a routine run is a single call
+    index = PoolIndex(tarotFactory, path).update(Multicall(w3, batchSize=500))
+    assert mockRpc.methods["eth_call"] == 5
+
+    setupFactory(mockRpc, 36)
+    index = PoolIndex(tarotFactory, path).update(Multicall(w3, batchSize=500))
+    assert index.watermark == 36
+    assert index.lendingPools(wftm) == lendable(36)
+    assert mockRpc.methods["eth_call"] == 9
+
+
+def test_follow_factory_events_in_chunks(mockRpc, tmp_path):
+    path = str(tmp_path / "poolIndex.json")
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    for i in range(5):
+        token0 = wftm if i % 2 == 0 else otherToken
+        token1 = otherToken if i % 2 == 0 else wftm
+        mockRpc.log(
+            tarotFactory,
+            [
+                LENDING_POOL_INITIALIZED,
+                "0x" + encode(["address"], [fakePair(i)]).hex(),
+                "0x" + encode(["address"], [token0]).hex(),
+                "0x" + encode(["address"], [token1]).hex(),
+            ],
+            100 + 250 * i,
+            "0x"
+            + encode(
+                ["address", "address", "address", "uint256"],
+                [otherToken, fakePool(i), fakePool(i), i + 1],
+            ).hex(),
+        )
+
+    index = PoolIndex(tarotFactory, path).follow(
+        w3, toBlock=999, fromBlock=0, chunk=400
+    )
+    assert mockRpc.methods["eth_getLogs"] == 3
+    assert index.block == 999 and index.watermark == 4
+    assert index.lendingPools(wftm) == [fakePool(i) for i in range(4)]
+
+    # Resumes after the saved block
+    index = PoolIndex(tarotFactory, path).follow(w3, toBlock=1200, chunk=400)
+    assert mockRpc.methods["eth_getLogs"] == 4
+    assert index.watermark == 5 and len(index.pools) == 5
+
+    # Events and factory indexes agree,an update after following fetches nothing
+    setupFactory(mockRpc, 5)
+    pools = dict(index.pools)
+    index = PoolIndex(tarotFactory, path).update(Multicall(w3, batchSize=500))
+    assert mockRpc.methods["eth_call"] == 1
+    assert index.watermark == 5 and index.pools == pools
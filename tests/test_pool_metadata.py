@@ -0,0 +1,84 @@
+from collections import Counter
+
+from web3 import Web3
+
+from scripts.getInfoOfPools import MUTABLE, resolvePools
+from scripts.multicall import CachedMulticall, Multicall
+
+wftm = "0x21be370D5312f44cB42ce377BC9b8a0cEF1A4C83"
+
+
+def addr(prefix, i):
+    return Web3.to_checksum_address("0x" + f"{prefix + i:040x}")
+
+
+def setupChain(rpc, count, tokenCount):
+    # pool -> collateral -> vault token -> pair, every pair is wftm against one of a few tokens
+    lookups = Counter()
+    for i in range(count):
+        pool, collateral, vaultToken, pair = [
+            addr(prefix, i) for prefix in (0xA000, 0xC000, 0xE000, 0xF000)
+        ]
+        rpc.value(pool, "collateral()", ["address"], collateral)
+        rpc.value(collateral, "underlying()", ["address"], vaultToken)
+        rpc.value(vaultToken, "underlying()", ["address"], pair)
+        rpc.value(pair, "token0()", ["address"], wftm)
+        rpc.value(pair, "token1()", ["address"], addr(0xD000, i % tokenCount))
+        rpc.value(
+            pair,
+            "getReserves()",
+            ["uint112", "uint112", "uint32"],
+            [(1000 + i) * 10 ** 18, (2000 + i) * 10 ** 6, 0],
+        )
+    symbols = {wftm: "WFTM"}
+    symbols.update({addr(0xD000, i): f"TKN{i}" for i in range(tokenCount)})
+    for token, name in symbols.items():
+
+        def symbol(token=token, name=name):
+            lookups[token] += 1
+            return name
+
+        rpc.register(token, "symbol()", ["string"], symbol)
+        rpc.value(token, "decimals()", ["uint8"], 18 if token == wftm else 6)
+    return [addr(0xA000, i) for i in range(count)], lookups
+
+
+def test_resolver_takes_one_round_per_hop(mockRpc, tmp_path):
+    path = str(tmp_path / "poolMetadata.json")
+    pools, lookups = setupChain(mockRpc, 40, 4)
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+
+    rows = resolvePools(
+        pools, CachedMulticall(Multicall(w3, batchSize=500), path, MUTABLE)
+    )
+
+    # collateral, vault token, pair, tokens + reserves, symbols + decimals
+    assert mockRpc.methods["eth_call"] == 5
+    assert all(count == 1 for count in lookups.values())
+    assert rows[5]["name"] == "WFTM-TKN1"
+    assert rows[5]["reserves"] == (1005, 2005)
+
+    # Second run only reads reserves,the rest comes from the cache
+    mockRpc.value(
+        rows[5]["pair"],
+        "getReserves()",
+        ["uint112", "uint112", "uint32"],
+        [7 * 10 ** 18, 10 ** 6, 0],
+    )
+    rows = resolvePools(
+        pools, CachedMulticall(Multicall(w3, batchSize=500), path, MUTABLE)
+    )
+    assert mockRpc.methods["eth_call"] == 6
+    assert rows[5]["name"] == "WFTM-TKN1"
+    assert rows[5]["reserves"] == (7, 1)
+
+
+def test_resolver_skips_pools_that_revert(mockRpc):
+    pools, _ = setupChain(mockRpc, 3, 1)
+    broken = addr(0xB000, 0)
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+
+    rows = resolvePools(pools + [broken], CachedMulticall(Multicall(w3)))
+
+    assert [row.get("name") for row in rows] == ["WFTM-TKN0"] * 3 + [None]
+    assert rows[3]["collateral"] is None
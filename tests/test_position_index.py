@@ -0,0 +1,80 @@
+import pytest
+from brownie import web3
+from eth_abi import encode
+from web3 import Web3
+
+import conftest as config
+from scripts.positionIndex import EVENTS, PositionIndex
+
+strategyAddr = "0x000000000000000000000000000000000000a0a0"
+TOPICS = {name: topic for topic, name in EVENTS.items()}
+
+
+def fakePool(i):
+    return Web3.to_checksum_address("0x" + f"{0xB000 + i:040x}")
+
+
+def emit(rpc, name, pool, block, amount=None, bTokens=None):
+    data = (
+        "0x"
+        if amount is None
+        else "0x" + encode(["uint256"] * 2, [amount, bTokens]).hex()
+    )
+    topics = [TOPICS[name], "0x" + encode(["address"], [pool]).hex()]
+    rpc.log(strategyAddr, topics, block, data)
+
+
+def test_follow_adapts_chunk_to_log_density(mockRpc, tmp_path):
+    path = str(tmp_path / "positionIndex.json")
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    mockRpc.maxLogs = 50
+    for i in range(3):
+        emit(mockRpc, "PoolAdded", fakePool(i), 10)
+    # Quiet for a long stretch,then a deposit and withdrawal every block
+    for block in range(90_000, 90_100):
+        emit(mockRpc, "PoolDeposit", fakePool(block % 3), block, 100, 90)
+        emit(mockRpc, "PoolWithdraw", fakePool(block % 3), block, 50, 40)
+    emit(mockRpc, "PoolStuck", fakePool(2), 90_100)
+
+    index = PositionIndex(strategyAddr, path).follow(w3, toBlock=90_100, fromBlock=0)
+
+    assert index.block == 90_100
+    # The quiet range went by in doubling steps,the busy one needed smaller requests
+    assert mockRpc.methods["eth_getLogs"] < 40
+    assert index.chunk < 100
+    deposits = [sum(1 for b in range(90_000, 90_100) if b % 3 == i) for i in range(3)]
+    for i in range(3):
+        position = index.positions[fakePool(i)]
+        assert position["listed"] and position["stuck"] == (i == 2)
+        assert position["deposits"] == position["withdrawals"] == deposits[i]
+        assert position["bTokens"] == 50 * deposits[i]
+        assert position["deposited"] - position["withdrawn"] == 50 * deposits[i]
+
+    # Resumes after the saved block with the chunk it settled on
+    emit(mockRpc, "PoolRemoved", fakePool(2), 90_200)
+    resumed = PositionIndex(strategyAddr, path)
+    assert (resumed.block, resumed.chunk) == (90_100, index.chunk)
+    resumed.follow(w3, toBlock=90_200)
+    assert not resumed.positions[fakePool(2)]["listed"]
+    assert resumed.positions[fakePool(0)] == index.positions[fakePool(0)]
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_index_replays_dev_chain(
+    currency, funded, gov, interface, allocConf, allocChangeConf
+):
+    strategy = funded
+    strategy.changeAllocs(allocChangeConf, {"from": gov})
+    strategy.rebalance(strategy.balanceOfStake() // 2, {"from": gov})
+    strategy.harvest({"from": gov})
+
+    index = PositionIndex(strategy.address, None).follow(
+        web3, fromBlock=strategy.tx.block_number
+    )
+
+    pools = [strategy.pools(i) for i in range(strategy.getTotalPools())]
+    for pool in set(allocConf + allocChangeConf + pools):
+        position = index.positions[pool]
+        assert position["listed"] == strategy.isPool(pool)
+        assert position["stuck"] == strategy.poolInfo(pool)[2]
+        assert position["bTokens"] == interface.ERC20(pool).balanceOf(strategy)
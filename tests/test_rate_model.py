@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from scripts.rateModel import (
+    SECONDS_PER_YEAR,
+    adjustKink,
+    borrowRateAt,
+    projectApr,
+    rankPlacements,
+    splitByYield,
+)
+
+# 20% APR at the kink
+KINK_RATE = 0.2 / SECONDS_PER_YEAR
+
+
+def borrowRateReference(utilization, kinkUtilization, kinkBorrowRate):
+    # Straight port of BorrowableInterestRateModel._calculateBorrowRate in 1e18 ints
+    u, k, rate = (
+        int(utilization * 1e18),
+        int(kinkUtilization * 1e18),
+        int(kinkBorrowRate * 1e18),
+    )
+    if u <= k:
+        return rate * u // k / 1e18
+    over = (u - k) * 10 ** 18 // (10 ** 18 - k)
+    return ((5 - 1) * over + 10 ** 18) * rate // 10 ** 18 / 1e18
+
+
+def makeParams(count):
+    return {
+        "kinkUtilization": np.full(count, 0.75),
+        "kinkBorrowRate": np.full(count, KINK_RATE),
+        "reserveFactor": np.full(count, 0.1),
+    }
+
+
+def test_borrow_rate_matches_contract_math():
+    utilization = np.linspace(0, 1, 101)
+
+    rates = borrowRateAt(utilization, 0.75, KINK_RATE)
+
+    expected = [borrowRateReference(u, 0.75, KINK_RATE) for u in utilization]
+    assert rates == pytest.approx(expected, rel=1e-9)
+    # Kink rate at the kink,5x at full utilization
+    assert borrowRateAt(0.75, 0.75, KINK_RATE) == pytest.approx(KINK_RATE)
+    assert borrowRateAt(1.0, 0.75, KINK_RATE) == pytest.approx(5 * KINK_RATE)
+
+
+def test_project_apr_over_pools_and_sizes():
+    rng = np.random.default_rng(3)
+    count = 500
+    supplied = rng.uniform(1e4, 1e6, count)
+    borrowed = supplied * rng.uniform(0.3, 0.95, count)
+    sizes = np.linspace(0, 1e5, 64)
+
+    apr = projectApr(borrowed, supplied, makeParams(count), sizes)
+
+    assert apr.shape == (count, len(sizes))
+    # Depositing more only ever lowers the rate
+    assert (np.diff(apr, axis=1) <= 0).all()
+    # Supply APR at no deposit is borrow APR x utilization x (1 - reserve factor)
+    utilization = borrowed / supplied
+    expected = borrowRateAt(utilization, 0.75, KINK_RATE) * utilization * 0.9
+    assert apr[:, 0] == pytest.approx(expected * SECONDS_PER_YEAR)
+
+
+def test_rank_changes_with_deposit_size():
+    # A small pool above the kink beats a big one until our deposit pushes it down
+    borrowed, supplied = [900.0, 76_000.0], [1000.0, 100_000.0]
+
+    order = rankPlacements(borrowed, supplied, makeParams(2), [10.0, 10_000.0])
+
+    assert order.tolist() == [[0, 1], [1, 0]]
+
+
+def test_split_by_yield_spreads_large_deposits():
+    borrowed, supplied = [900.0, 76_000.0, 10.0], [1000.0, 100_000.0, 1000.0]
+
+    amounts, bps = splitByYield(borrowed, supplied, makeParams(3), 10_000.0)
+
+    assert amounts.sum() == pytest.approx(10_000.0)
+    assert bps.sum() == 10_000
+    assert amounts[0] > 0 and amounts[1] > amounts[0] and amounts[2] == 0
+
+
+def test_kink_adjusts_toward_borrow_rate():
+    # Above the kink rate the kink moves up,below it down,clamped to the 1% floor
+    assert adjustKink(2 * KINK_RATE, KINK_RATE, 1e-6, 3600) == pytest.approx(
+        KINK_RATE * (1 + 3600e-6)
+    )
+    assert adjustKink(0, KINK_RATE, 1e-3, 3600) == pytest.approx(
+        0.01 / SECONDS_PER_YEAR, rel=1e-3
+    )
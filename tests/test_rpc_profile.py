@@ -0,0 +1,58 @@
+import json
+
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
+
+from scripts.multicall import MULTICALL3, Call, Multicall
+from scripts.rpcProfile import enableProfile
+
+
+def fakeAddress(i):
+    return Web3.to_checksum_address("0x" + f"{0xF000 + i:040x}")
+
+
+def test_profile_counts_and_flags_duplicates(mockRpc, tmp_path):
+    tokens = [fakeAddress(i) for i in range(3)]
+    for token in tokens:
+        mockRpc.value(token, "totalSupply()", ["uint256"], 1)
+        mockRpc.value(token, "decimals()", ["uint8"], 18)
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+    profile = enableProfile(w3)
+
+    block = w3.eth.block_number
+    calls = [Call(t, "totalSupply()", [], ["uint256"]) for t in tokens]
+    Multicall(w3, block=block).execute(calls)
+    # Same batch at the same block again,and one plain eth_call
+    Multicall(w3, block=block).execute(calls)
+    w3.eth.call(
+        {"to": tokens[0], "data": function_signature_to_4byte_selector("decimals()")},
+        block_identifier=block,
+    )
+    path = tmp_path / "profile.json"
+    profile.write(path)
+    report = json.loads(path.read_text())
+
+    assert report["requests"] == sum(m["count"] for m in report["methods"].values())
+    assert report["methods"]["eth_call"]["count"] == 3
+    assert sum(report["methods"]["eth_call"]["latencyMs"].values()) == 3
+    assert report["methods"]["eth_call"]["bytesReceived"] > 0
+    assert {
+        "to": MULTICALL3.lower(),
+        "selector": "tryAggregate(bool,(address,bytes)[])",
+        "count": 2,
+    } in report["contracts"]
+    assert {"to": tokens[0].lower(), "selector": "decimals()", "count": 1} in report[
+        "contracts"
+    ]
+    # Calls inside the batches are attributed to their targets
+    assert sorted(
+        (a["to"], a["selector"], a["count"]) for a in report["aggregated"]
+    ) == sorted((t.lower(), "totalSupply()", 2) for t in tokens)
+    assert report["duplicateCalls"] == [
+        {
+            "block": block,
+            "to": MULTICALL3.lower(),
+            "selector": "tryAggregate(bool,(address,bytes)[])",
+            "count": 2,
+        }
+    ]
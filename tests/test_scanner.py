@@ -0,0 +1,122 @@
+import asyncio
+import math
+
+from web3 import Web3
+
+from scripts.getAllFTMLendingPools import (
+    enumeratePools,
+    poolRow,
+    scan,
+    tarotFactory,
+    wftm,
+)
+
+otherToken = "0x04068DA6C83AFCFA0e13ba15A6696662335D5B75"
+
+
+def fakePool(i):
+    return Web3.to_checksum_address("0x" + f"{0xA000 + i:040x}")
+
+
+def fakePair(i):
+    return Web3.to_checksum_address("0x" + f"{0xB000 + i:040x}")
+
+
+def setupPools(rpc, count):
+    # Pools get different utilizations so some fall under the 60% cutoff
+    state = {}
+    for i in range(count):
+        pool = fakePool(i)
+        totalSupply = (1000 + i) * 10 ** 18
+        exchangeRate = 10 ** 18 + i * 10 ** 15
+        liquidity = totalSupply * (i % 10) // 10
+        state[pool] = (totalSupply, liquidity, exchangeRate)
+        rpc.value(pool, "totalSupply()", ["uint256"], totalSupply)
+        rpc.value(pool, "exchangeRateLast()", ["uint256"], exchangeRate)
+    rpc.register(
+        wftm,
+        "balanceOf(address)",
+        ["uint256"],
+        lambda owner: state[Web3.to_checksum_address(owner)][1],
+    )
+    return state
+
+
+def setupFactory(rpc, count):
+    pairs = [fakePair(i) for i in range(count)]
+    # Every third pair has no wftm side and must be skipped
+    for i, pair in enumerate(pairs):
+        token0, token1 = [
+            (wftm, otherToken),
+            (otherToken, wftm),
+            (otherToken, otherToken),
+        ][i % 3]
+        rpc.value(pair, "token0()", ["address"], token0)
+        rpc.value(pair, "token1()", ["address"], token1)
+    rpc.value(tarotFactory, "allLendingPoolsLength()", ["uint256"], count)
+    rpc.register(
+        tarotFactory, "allLendingPools(uint256)", ["address"], lambda i: pairs[i]
+    )
+
+    def getLendingPool(pair):
+        i = pairs.index(Web3.to_checksum_address(pair))
+        borrowable0 = fakePool(i) if i % 3 == 0 else otherToken
+        borrowable1 = fakePool(i) if i % 3 == 1 else otherToken
+        return True, i + 1, otherToken, borrowable0, borrowable1
+
+    rpc.register(
+        tarotFactory,
+        "getLendingPool(address)",
+        ["bool", "uint24", "address", "address", "address"],
+        getLendingPool,
+    )
+
+
+def expectedRows(state):
+    rows = [poolRow(pool, *values) for pool, values in state.items()]
+    rows = [row for row in rows if row is not None]
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def test_batched_scan_matches_rows(mockRpc):
+    count, batchSize = 120, 50
+    state = setupPools(mockRpc, count)
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+
+    poolData = scan(w3, list(state), batchSize=batchSize)
+
+    assert poolData == expectedRows(state)
+    # One block lookup plus one eth_call per batch of 3 reads per pool
+    assert mockRpc.methods["eth_blockNumber"] == 1
+    assert mockRpc.methods["eth_call"] == math.ceil(3 * count / batchSize)
+    # Every batch is pinned to the same block
+    assert len(set(mockRpc.callBlocks)) == 1
+
+
+def test_batched_discovery(mockRpc):
+    count = 40
+    state = setupPools(mockRpc, count)
+    setupFactory(mockRpc, count)
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+
+    poolData = scan(w3, [], batchSize=500)
+
+    lendable = {fakePool(i): state[fakePool(i)] for i in range(count) if i % 3 != 2}
+    assert poolData == expectedRows(lendable)
+    # Length, pairs, tokens, lending pools and pool reads are one batch each
+    assert mockRpc.methods["eth_call"] == 5
+
+
+def test_async_enumeration(mockRpc):
+    count, concurrency = 60, 8
+    setupPools(mockRpc, count)
+    setupFactory(mockRpc, count)
+    mockRpc.delay = 0.01
+    # The first requests fail and must be retried
+    mockRpc.failures = 3
+
+    pools = asyncio.run(enumeratePools(mockRpc.url, concurrency=concurrency))
+
+    assert pools == [fakePool(i) for i in range(count) if i % 3 != 2]
+    # Per-pool chains overlap but never exceed the in-flight cap
+    assert 1 < mockRpc.maxInFlight <= concurrency
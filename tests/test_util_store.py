@@ -0,0 +1,85 @@
+import numpy as np
+from web3 import Web3
+
+from scripts.getAllFTMLendingPools import wftm
+from scripts.utilStore import UtilStore, allocateFromHistory, record, summarize
+from test_scanner import fakePool, setupPools
+
+
+def fill(store, pools, blocks):
+    # Pool i sits at 50 + i% utilization with a pps growing 1e-4 per block
+    for block in blocks:
+        store.append(
+            block,
+            {
+                pool: {
+                    "utilization": 50.0 + i,
+                    "supply": 1000.0,
+                    "liquidity": 1000.0 * (50 - i) / 100,
+                    "pps": 1 + block * 1e-4,
+                }
+                for i, pool in enumerate(pools)
+            },
+        )
+
+
+def test_range_query_reads_only_requested_rows(tmp_path):
+    pools = [fakePool(i) for i in range(3)]
+    store = UtilStore(str(tmp_path))
+    fill(store, pools, range(100, 10_100, 10))
+
+    rows = UtilStore(str(tmp_path)).query(pools[1], 5_000, 5_095)
+
+    assert rows["block"].tolist() == list(range(5_000, 5_100, 10))
+    assert (rows["utilization"] == 51.0).all()
+    assert np.allclose(rows["pps"], 1 + rows["block"] * 1e-4)
+
+
+def test_appends_are_incremental_and_survive_a_torn_write(tmp_path):
+    pool = fakePool(0)
+    store = UtilStore(str(tmp_path))
+    fill(store, [pool], range(10))
+    # Replayed blocks are skipped
+    fill(store, [pool], range(5, 12))
+    assert store.query(pool)["block"].tolist() == list(range(12))
+
+    # Crash midway through a row: one column got the value,the others didn't
+    with open(tmp_path / pool / "block", "ab") as f:
+        f.write(np.asarray([12], dtype=np.uint64).tobytes())
+    store = UtilStore(str(tmp_path))
+    assert store.lengths[pool] == 12 and store.lastBlock(pool) == 11
+
+
+def test_summarize_weights_by_blocks_held(tmp_path):
+    pools = [fakePool(0), fakePool(1)]
+    store = UtilStore(str(tmp_path))
+    store.append(
+        0, {pools[0]: {"utilization": 90.0, "supply": 1, "liquidity": 0, "pps": 1.0}}
+    )
+    store.append(
+        90, {pools[0]: {"utilization": 60.0, "supply": 1, "liquidity": 0, "pps": 1.1}}
+    )
+
+    utilization, ppsGrowth = summarize(store, pools, 0, 99)
+
+    # 90% held for 90 blocks,60% for 10
+    assert utilization[0] == 87.0
+    assert np.isclose(ppsGrowth[0], 0.1)
+    assert np.isnan(utilization[1])
+    assert allocateFromHistory(store, pools, 0, 99).tolist() == [10000, 0]
+
+
+def test_record_samples_in_one_batch_per_block(mockRpc, tmp_path):
+    state = setupPools(mockRpc, 20)
+    pools = list(state)
+    store = UtilStore(str(tmp_path))
+    w3 = Web3(Web3.HTTPProvider(mockRpc.url))
+
+    record(w3, store, pools, wftm, toBlock=1000, fromBlock=990, step=5)
+    assert mockRpc.methods["eth_call"] == 3
+    assert mockRpc.callBlocks == [hex(990), hex(995), hex(1000)]
+
+    # Picks up after the newest sample
+    record(w3, store, pools, wftm, toBlock=1010, step=5)
+    assert mockRpc.methods["eth_call"] == 5
+    assert store.query(pools[3])["block"].tolist() == [990, 995, 1000, 1005, 1010]
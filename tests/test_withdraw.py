@@ -0,0 +1,55 @@
+from collections import Counter
+
+import pytest
+
+import conftest as config
+
+
+def redeemsByPool(tx):
+    return Counter(
+        call["to"] for call in tx.subcalls if "redeem" in call.get("function", "")
+    )
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_withdraw_redeems_once_per_pool(
+    gov, whale, currency, vault, strategy, allocChangeConf
+):
+    currency.approve(vault, 2 ** 256 - 1, {"from": whale})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    vault.deposit(10_000 * 1e18, {"from": whale})
+    strategy.harvest({"from": gov})
+    strategy.changeAllocs(allocChangeConf, {"from": gov})
+    # Spread the position over several pools
+    first = strategy.highestInterestPair(0)
+    for pool in allocChangeConf[:3]:
+        if pool != first:
+            strategy.moveFromPool(first, 2_000 * 1e18, pool, {"from": gov})
+
+    amount = strategy.balanceOfStake() * 3 // 4
+    tx = strategy.withdrawFromLending(amount, {"from": gov})
+
+    assert strategy.balanceOfWant() >= amount
+    assert max(redeemsByPool(tx).values()) == 1
+
+
+@pytest.mark.parametrize(config.fixtures, config.params, indirect=True)
+def test_buffer_stays_idle(gov, currency, funded, allocConf, allocChangeConf):
+    strategy = funded
+    with pytest.reverts("!tolerance"):
+        strategy.updateBufferTolerance(10_001, {"from": gov})
+    strategy.updateBufferRatio(1_000, {"from": gov})
+    tx = strategy.updateBufferTolerance(1_000, {"from": gov})
+    assert tx.events["UpdatedBufferTolerance"]["bufferTolerance"] == 1_000
+
+    # 10% of assets idle,a gap inside 10% of that doesn't need a tend
+    strategy.harvest({"from": gov})
+    target = strategy.bufferTarget()
+    assert strategy.balanceOfWant() == pytest.approx(target, rel=1e-3)
+    assert not strategy.tendTrigger(0)
+
+    # Rebalancing and changing pools only move what is above the buffer
+    strategy.rebalance(strategy.balanceOfStake() // 2, {"from": gov})
+    assert strategy.balanceOfWant() == pytest.approx(strategy.bufferTarget(), rel=1e-3)
+    strategy.changeAllocs(allocChangeConf, {"from": gov})
+    assert strategy.balanceOfWant() == pytest.approx(strategy.bufferTarget(), rel=1e-3)